@@ -0,0 +1,151 @@
+# src/api/batch_writer.py
+
+import queue
+import threading
+import time
+from typing import List, Optional
+
+# Marqueurs internes placés dans la file pour piloter le thread d'écriture
+_FLUSH = object()
+_STOP = object()
+
+
+class BatchWriter:
+    """
+    File bornée vidée par lots dans un thread d'arrière-plan.
+
+    `_enqueue` dépose un élément sans attendre (ou au plus `timeout` secondes) et
+    l'abandonne si la file est pleine ; le thread regroupe les éléments et appelle
+    `_write` dès que `batch_size` éléments sont prêts ou que `flush_interval` secondes
+    se sont écoulées. Les sous-classes implémentent `_write`, qui compte les éléments
+    écrits (`flushed`) ou en échec (`failed`).
+    """
+
+    thread_name = "batch-writer"
+
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # --- Côté requêtes ---
+    def _enqueue(self, item, timeout: Optional[float] = None) -> bool:
+        """Dépose un élément dans la file. Retourne False s'il a été abandonné (file pleine)."""
+        try:
+            if timeout:
+                self._queue.put(item, timeout=timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.queued += 1
+        return True
+
+    # --- Cycle de vie ---
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """
+        Force l'écriture de tous les éléments en attente et attend au plus `timeout` secondes
+        qu'elle soit terminée. Retourne False si elle ne l'est pas dans ce délai.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_synchronously()
+            return True
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Vide la file puis arrête le thread (appelé à l'arrêt de l'API)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_synchronously()
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"ATTENTION : file de {self.thread_name} toujours pleine, arrêt sans attendre son écriture.")
+            return
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": self._queue.qsize(),
+            }
+
+    # --- Côté thread d'écriture ---
+    def _run(self):
+        running = True
+        while running:
+            batch, markers = [], 0
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _FLUSH or item is _STOP:
+                    markers += 1
+                    running = item is not _STOP
+                    break
+                batch.append(item)
+            if not running:
+                # On vide tout ce qui reste avant de s'arrêter
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _FLUSH or item is _STOP:
+                        markers += 1
+                    else:
+                        batch.append(item)
+            for i in range(0, len(batch), self.batch_size):
+                self._write(batch[i:i + self.batch_size])
+            for _ in range(len(batch) + markers):
+                self._queue.task_done()
+
+    def _drain_synchronously(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _FLUSH and item is not _STOP:
+                batch.append(item)
+            self._queue.task_done()
+        for i in range(0, len(batch), self.batch_size):
+            self._write(batch[i:i + self.batch_size])
+
+    def _write(self, rows: List):
+        raise NotImplementedError
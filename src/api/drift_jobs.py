@@ -0,0 +1,261 @@
+# src/api/drift_jobs.py
+
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.database import models
+from src.database.database import SessionLocal
+from src.database.packed_features import PackedFeatureDecoder
+from src.database.feature_snapshots import load_snapshots
+from src.api.drift_sampling import resolve_parameters, sample_logs, sample_reference
+from src.api.report_storage import store_report
+from src.api.profiler import SamplingProfiler
+from src.config import settings
+
+# Statuts d'un job de rapport de dérive
+PENDING, RUNNING, SUCCEEDED, FAILED = "pending", "running", "succeeded", "failed"
+
+
+# --- Code exécuté dans les processus du pool ---
+
+def run_drift_job(job_id: int, profile_interval: Optional[float] = None):
+    """
+    Génère un rapport Evidently dans un processus du pool, en mettant à jour
+    l'avancement du job en BDD à chaque étape. Avec `profile_interval`, le job est
+    profilé par échantillonnage et ses piles sont retournées à l'API.
+    """
+    if not profile_interval:
+        _generate_report(job_id)
+        return None
+    profiler = SamplingProfiler()
+    profiler.start(duration=None, interval=profile_interval, focus=(), thread_ids=[threading.get_ident()])
+    try:
+        _generate_report(job_id)
+    finally:
+        profiler.stop()
+    return profiler.stacks()
+
+def _generate_report(job_id: int):
+    with SessionLocal() as db:
+        job = db.get(models.DriftReportJob, job_id)
+        job.status, job.started_at = RUNNING, datetime.now()
+        db.commit()
+
+        def progress(percent: int, step: str):
+            job.progress, job.step = percent, step
+            db.commit()
+
+        try:
+            html_content = build_report_html(db, job.parameters, progress)
+            progress(95, "Compression et enregistrement du rapport")
+            report = store_report(db, html_content)
+            job.report_id, job.status, job.progress, job.step = report.id, SUCCEEDED, 100, "Terminé"
+        except Exception as e:
+            print("--- ERREUR LORS DE LA GÉNÉRATION DU RAPPORT DE DÉRIVE ---")
+            traceback.print_exc()
+            print("---------------------------------------------------------")
+            db.rollback()
+            job = db.get(models.DriftReportJob, job_id)
+            job.status, job.error = FAILED, str(e)
+        job.finished_at = datetime.now()
+        db.commit()
+
+def build_report_html(db: Session, parameters: Optional[dict] = None, progress=lambda percent, step: None) -> str:
+    """
+    Échantillonne la référence et les logs de la fenêtre demandée (en SQL, voir
+    drift_sampling.py), puis retourne le HTML du rapport Evidently.
+    """
+    parameters = resolve_parameters(parameters)
+
+    progress(10, "Échantillonnage des données de référence")
+    reference_data = packed_reference_data(db, parameters) if settings.feature_storage == "packed" else None
+    if reference_data is None:
+        rows = sample_reference(db, [models.TrainingData.data], parameters)
+        reference_data = pd.DataFrame([data for (data,) in rows])
+
+    progress(30, "Échantillonnage des logs de production")
+    rows = sample_logs(db, [models.ApiLog.input_data, models.ApiLog.feature_hash], parameters)
+    if not rows:
+        raise ValueError("Aucun log de production trouvé sur la période demandée.")
+
+    # Features des logs échantillonnés : copie dans le log ou snapshot référencé
+    snapshots = load_snapshots(db, {feature_hash for data, feature_hash in rows if data is None and feature_hash})
+    records = [data if data is not None else snapshots.get(feature_hash) for data, feature_hash in rows]
+    # On convertit la chaîne JSON en dictionnaire avant de créer le DataFrame
+    current_data = pd.DataFrame([json.loads(row) if isinstance(row, str) else row for row in records if row is not None])
+    progress(50, f"Calcul du rapport Evidently ({len(reference_data)} / {len(current_data)} lignes)")
+    return render_report_html(reference_data, current_data, progress)
+
+def render_report_html(reference_data: pd.DataFrame, current_data: pd.DataFrame, progress=lambda percent, step: None) -> str:
+    """HTML du rapport Evidently de dérive entre deux échantillons, sur leurs colonnes communes."""
+    # Import ici : Evidently n'est chargé que dans les processus du pool
+    from evidently import Report
+    from evidently.presets import DataDriftPreset
+
+    common_cols = list(set(reference_data.columns) & set(current_data.columns))
+    data_drift_report = Report(metrics=[DataDriftPreset()])
+    data_drift_report_run = data_drift_report.run(reference_data=reference_data[common_cols], current_data=current_data[common_cols])
+
+    progress(85, "Export HTML")
+    return data_drift_report_run.get_html_str(as_iframe=False)
+
+def packed_reference_data(db: Session, parameters: dict) -> Optional[pd.DataFrame]:
+    """Échantillon de référence décodé depuis les vecteurs packed (None si la table n'est pas migrée)."""
+    table = models.TrainingData
+    rows = sample_reference(db, [table.manifest_id, table.features], parameters, table.features.isnot(None))
+    if not rows:
+        return None
+    groups = defaultdict(list)
+    for manifest_id, blob in rows:
+        groups[manifest_id].append(blob)
+    # Seul l'ordre des manifestes est utilisé ici (to_frame), pas celui du modèle
+    decoder = PackedFeatureDecoder([])
+    frames = []
+    for manifest_id, blobs in groups.items():
+        decoder.register(db.get(models.FeatureManifest, manifest_id))
+        frames.append(decoder.to_frame(manifest_id, blobs))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+# --- Côté API ---
+
+class DriftJobManager:
+    """
+    File de jobs de rapports de dérive, exécutés dans un pool de processus.
+
+    Les jobs sont enregistrés dans `drift_report_jobs` (statut, avancement, erreur),
+    ce qui permet de les suivre depuis n'importe quel worker de l'API. Au plus
+    `max_workers` rapports sont calculés en même temps ; les suivants attendent
+    dans la file du pool avec le statut "pending".
+    Pendant une session du `profiler` de l'API, les jobs soumis sont profilés dans
+    leur processus et leurs piles ajoutées à la session.
+
+    Chaque job est marqué avec le processus qui l'exécute (`owner`), qui renouvelle
+    son bail (`heartbeat_at`) toutes les `heartbeat_interval` secondes. Un job en
+    attente ou en cours dont le bail a plus de `lease_seconds` secondes a perdu son
+    processus (arrêt, redémarrage) et est marqué en échec par n'importe quel worker ;
+    les jobs des autres workers encore vivants ne sont jamais touchés.
+    """
+
+    def __init__(self, max_workers: int = 1, profiler: Optional[SamplingProfiler] = None,
+                 heartbeat_interval: float = 30.0, lease_seconds: float = 120.0):
+        self.max_workers = max_workers
+        self.profiler = profiler
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_seconds = lease_seconds
+        # Unique même si un pid est réutilisé (ex. pid 1 d'un conteneur redémarré)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = None
+        self._active_jobs = set()
+        self._lock = threading.Lock()
+        self._stop_heartbeat = threading.Event()
+        self._heartbeat_thread = None
+
+    def start(self):
+        """Marque en échec les jobs orphelins, puis renouvelle périodiquement le bail des jobs de ce processus."""
+        self.reap_expired_jobs()
+
+        def run():
+            while not self._stop_heartbeat.wait(self.heartbeat_interval):
+                try:
+                    self.heartbeat()
+                    self.reap_expired_jobs()
+                except Exception as e:
+                    print(f"ERREUR lors du renouvellement du bail des jobs de dérive : {e}")
+
+        self._stop_heartbeat.clear()
+        self._heartbeat_thread = threading.Thread(target=run, name="drift-jobs-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def heartbeat(self):
+        with self._lock:
+            job_ids = list(self._active_jobs)
+        if not job_ids:
+            return
+        with SessionLocal() as db:
+            db.query(models.DriftReportJob).filter(
+                models.DriftReportJob.id.in_(job_ids), models.DriftReportJob.owner == self.owner
+            ).update({"heartbeat_at": datetime.now()}, synchronize_session=False)
+            db.commit()
+
+    def reap_expired_jobs(self) -> int:
+        """Marque en échec les jobs en attente ou en cours dont le bail a expiré. Retourne leur nombre."""
+        job = models.DriftReportJob
+        expired = datetime.now() - timedelta(seconds=self.lease_seconds)
+        with SessionLocal() as db:
+            count = db.query(job).filter(
+                job.status.in_([PENDING, RUNNING]),
+                # Jobs créés avant les baux : leur date de création fait foi
+                func.coalesce(job.heartbeat_at, job.created_at) < expired,
+            ).update(
+                {"status": FAILED, "error": "Job interrompu : le processus de l'API qui l'exécutait ne répond plus.",
+                 "finished_at": datetime.now()},
+                synchronize_session=False
+            )
+            db.commit()
+        return count
+
+    def stop(self):
+        """Annule les jobs en attente et arrête les calculs en cours (l'API ne doit pas attendre)."""
+        if self._heartbeat_thread is not None:
+            self._stop_heartbeat.set()
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        if self._executor is not None:
+            processes = list((self._executor._processes or {}).values())
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            self._executor = None
+
+    def submit(self, db: Session, requested_by: Optional[str] = None, parameters: Optional[dict] = None) -> models.DriftReportJob:
+        now = datetime.now()
+        job = models.DriftReportJob(
+            status=PENDING, progress=0, step="En attente", requested_by=requested_by,
+            parameters=resolve_parameters(parameters), created_at=now, owner=self.owner, heartbeat_at=now
+        )
+        db.add(job)
+        db.commit()
+        with self._lock:
+            self._active_jobs.add(job.id)
+        profiler = self.profiler
+        session = profiler.session if profiler is not None and profiler.active and profiler.include_drift_jobs else None
+        future = self._get_executor().submit(run_drift_job, job.id, profiler.interval if session else None)
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, f, session))
+        return job
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" : les processus n'héritent ni des threads, ni des connexions BDD,
+            # ni de la boucle d'événements de l'API
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _on_done(self, job_id: int, future, profile_session: Optional[int] = None):
+        """Un processus mort (ex. mémoire insuffisante) ne doit pas laisser le job "running"."""
+        with self._lock:
+            self._active_jobs.discard(job_id)
+        if profile_session and not future.cancelled() and future.exception() is None and future.result():
+            self.profiler.merge(future.result(), profile_session, prefix="drift_job")
+        if future.cancelled() or future.exception() is not None:
+            error = "Job annulé." if future.cancelled() else f"Le processus de calcul a échoué : {future.exception()}"
+            with SessionLocal() as db:
+                # Un job déjà terminé (ou marqué en échec entre-temps) garde son statut
+                db.query(models.DriftReportJob).filter(
+                    models.DriftReportJob.id == job_id, models.DriftReportJob.status.in_([PENDING, RUNNING])
+                ).update({"status": FAILED, "error": error, "finished_at": datetime.now()}, synchronize_session=False)
+                db.commit()
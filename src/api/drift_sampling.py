@@ -0,0 +1,131 @@
+# src/api/drift_sampling.py
+
+import random
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.database import models
+from src.config import settings
+
+# - reservoir   : tirage uniforme sans remise, de chaque côté ;
+# - stratified  : référence stratifiée par TARGET (proportions des classes conservées) ;
+# - time_bucket : logs répartis uniformément entre les tranches de temps de la fenêtre.
+SAMPLING_METHODS = ["reservoir", "stratified", "time_bucket"]
+
+
+def default_parameters() -> dict:
+    """Paramètres d'un rapport de dérive lorsque la requête n'en précise pas."""
+    return {
+        "start": None,
+        "end": None,
+        "sample_size": settings.drift_report_sample_size,
+        "sampling": settings.drift_report_sampling,
+        "bucket_minutes": settings.drift_report_bucket_minutes,
+    }
+
+def resolve_parameters(requested: Optional[dict] = None) -> dict:
+    """
+    Complète les paramètres demandés avec les valeurs par défaut et tire le point
+    de départ (`offset`) de l'échantillon. Le dictionnaire est stocké avec le job :
+    un rapport peut être reproduit à l'identique tant que les tables ne changent pas.
+    """
+    parameters = default_parameters()
+    parameters.update({key: value for key, value in (requested or {}).items() if value is not None})
+    parameters.setdefault("offset", random.random())
+    for key in ("start", "end"):
+        if isinstance(parameters[key], datetime):
+            # Les horodatages des logs sont en heure locale, sans fuseau
+            value = parameters[key]
+            if value.tzinfo is not None:
+                value = value.astimezone().replace(tzinfo=None)
+            parameters[key] = value.isoformat()
+    return parameters
+
+def log_window(parameters: dict) -> list:
+    """Filtres SQL de la fenêtre `[start, end[` sur `ApiLog.request_timestamp`."""
+    filters = []
+    if parameters.get("start"):
+        filters.append(models.ApiLog.request_timestamp >= datetime.fromisoformat(parameters["start"]))
+    if parameters.get("end"):
+        filters.append(models.ApiLog.request_timestamp < datetime.fromisoformat(parameters["end"]))
+    return filters
+
+def random_key_sample(db: Session, query, key_column, size: int, offset: float) -> list:
+    """
+    Tirage uniforme sans remise de `size` lignes de `query`.
+
+    Chaque ligne porte une clé aléatoire fixée à l'insertion (`sample_key`, uniforme
+    dans [0, 1), indexée) : les `size` premières clés à partir de `offset` (en repartant
+    de 0 si besoin) forment un échantillon uniforme, lu par un parcours d'index borné
+    par LIMIT au lieu d'un tri aléatoire de toute la table.
+    """
+    rows = db.execute(query.where(key_column >= offset).order_by(key_column).limit(size)).all()
+    if len(rows) < size and offset > 0:
+        rows += db.execute(query.where(key_column < offset).order_by(key_column).limit(size - len(rows))).all()
+    return rows
+
+def stratified_quotas(counts: dict, size: int) -> dict:
+    """Répartit `size` lignes entre les classes, proportionnellement à leurs effectifs (plus forts restes)."""
+    total = sum(counts.values())
+    if total <= size:
+        return dict(counts)
+    exact = {key: size * count / total for key, count in counts.items()}
+    quotas = {key: int(value) for key, value in exact.items()}
+    remainders = sorted(exact, key=lambda key: exact[key] - quotas[key], reverse=True)
+    for key in remainders[:size - sum(quotas.values())]:
+        quotas[key] += 1
+    return quotas
+
+def bucket_cap(counts: list, size: int) -> int:
+    """
+    Plus grand nombre de lignes par tranche tel que `sum(min(n, cap)) <= size` :
+    chaque tranche fournit le même nombre de lignes, sauf celles qui en ont moins.
+    """
+    remaining, left = size, len(counts)
+    for count in sorted(counts):
+        if count * left > remaining:
+            return remaining // left
+        remaining -= count
+        left -= 1
+    return max(counts, default=0)
+
+def sample_reference(db: Session, columns: list, parameters: dict, *filters) -> list:
+    """Échantillon des données d'entraînement (colonnes `columns`) selon `parameters`."""
+    table = models.TrainingData
+    size, offset = parameters["sample_size"], parameters["offset"]
+    query = select(*columns).where(*filters)
+    if parameters["sampling"] != "stratified":
+        return random_key_sample(db, query, table.sample_key, size, offset)
+
+    counts = dict(db.execute(select(table.target, func.count()).where(*filters).group_by(table.target)).all())
+    rows = []
+    for target, quota in stratified_quotas(counts, size).items():
+        if quota:
+            rows += random_key_sample(db, query.where(table.target == target), table.sample_key, quota, offset)
+    return rows
+
+def sample_logs(db: Session, columns: list, parameters: dict) -> list:
+    """Échantillon des logs de production de la fenêtre demandée (colonnes `columns`)."""
+    log = models.ApiLog
+    size, offset = parameters["sample_size"], parameters["offset"]
+    window = log_window(parameters)
+    if parameters["sampling"] != "time_bucket":
+        return random_key_sample(db, select(*columns).where(*window), log.sample_key, size, offset)
+
+    # Même nombre de lignes par tranche : une heure chargée ne masque pas les heures creuses
+    bucket = func.floor(func.extract("epoch", log.request_timestamp) / (parameters["bucket_minutes"] * 60))
+    counts = [count for (count,) in db.execute(
+        select(func.count()).select_from(log).where(*window).group_by(bucket)
+    ).all()]
+    cap = bucket_cap(counts, size)
+    # Clé décalée de `offset` (modulo 1) : même tirage que random_key_sample, tranche par tranche
+    shifted_key = log.sample_key - offset - func.floor(log.sample_key - offset)
+    ranked = select(
+        *columns, func.row_number().over(partition_by=bucket, order_by=shifted_key).label("sample_rank")
+    ).where(*window).subquery()
+    return db.execute(
+        select(*[ranked.c[column.key] for column in columns]).where(ranked.c.sample_rank <= cap)
+    ).all()
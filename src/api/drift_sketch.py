@@ -0,0 +1,275 @@
+# src/api/drift_sketch.py
+
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database import models
+from src.database.packed_features import PackedFeatureDecoder
+
+COUNTS_DTYPE = np.dtype("<i8")
+
+
+class SketchLayout:
+    """
+    Découpage en classes de chaque feature, appris sur les données de référence.
+
+    - "quantile" : bornes aux quantiles de la référence ; classe k = ]bornes[k-1], bornes[k]]
+      (plus une classe au-delà de la dernière borne) ;
+    - "category" : une classe par valeur distincte (features binaires ou à peu de
+      modalités), plus une classe "autre" pour les valeurs jamais vues.
+    Chaque feature a en plus une classe pour les valeurs manquantes. Les compteurs de
+    toutes les features sont rangés bout à bout dans un seul vecteur int64.
+    """
+
+    def __init__(self, feature_names, kinds, edges):
+        self.feature_names = list(feature_names)
+        self.kinds = list(kinds)
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        # Classes de valeurs (len(edges) + 1) + classe des valeurs manquantes
+        self.sizes = np.array([len(e) + 2 for e in self.edges])
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+        self.n_slots = int(self.sizes.sum())
+
+    @classmethod
+    def fit(cls, feature_names, matrix: np.ndarray, bins: int = 20) -> "SketchLayout":
+        kinds, edges = [], []
+        for column in matrix.T:
+            values = column[~np.isnan(column)]
+            distinct = np.unique(values)
+            if len(distinct) <= bins:
+                kinds.append("category")
+                edges.append(distinct)
+            else:
+                kinds.append("quantile")
+                edges.append(np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])))
+        return cls(feature_names, kinds, edges)
+
+    def to_json(self) -> dict:
+        return {"feature_names": self.feature_names, "kinds": self.kinds, "edges": [e.tolist() for e in self.edges]}
+
+    @classmethod
+    def from_json(cls, payload: dict) -> "SketchLayout":
+        return cls(payload["feature_names"], payload["kinds"], payload["edges"])
+
+    def count(self, matrix: np.ndarray) -> np.ndarray:
+        """Compteurs par classe d'une matrice (n_lignes x n_features, NaN = manquant)."""
+        slots = np.empty(matrix.shape, dtype=np.int64)
+        for j, (kind, edges) in enumerate(zip(self.kinds, self.edges)):
+            column = matrix[:, j]
+            index = np.searchsorted(edges, column, side="left")
+            if kind == "category":
+                matched = index < len(edges)
+                matched[matched] = edges[index[matched]] == column[matched]
+                index[~matched] = len(edges)
+            index[np.isnan(column)] = len(edges) + 1
+            slots[:, j] = index + self.offsets[j]
+        return np.bincount(slots.ravel(), minlength=self.n_slots).astype(COUNTS_DTYPE)
+
+    def compare(self, reference: np.ndarray, current: np.ndarray, epsilon: float = 1e-4) -> dict:
+        """
+        PSI, statistique de Kolmogorov-Smirnov (sur les classes) et divergence de
+        Jensen-Shannon (base 2, entre 0 et 1) de chaque feature, calculés en une
+        seule passe vectorisée sur les compteurs de toutes les features.
+        """
+        p, q = self._proportions(reference), self._proportions(current)
+        starts = self.offsets
+
+        # PSI : proportions lissées pour éviter log(0) sur les classes vides
+        p_smooth, q_smooth = np.maximum(p, epsilon), np.maximum(q, epsilon)
+        psi = np.add.reduceat((q_smooth - p_smooth) * np.log(q_smooth / p_smooth), starts)
+
+        # KS : écart maximal entre les fonctions de répartition de chaque feature
+        diff = np.cumsum(q - p)
+        segment_start = np.repeat(diff[starts] - (q - p)[starts], self.sizes)
+        ks = np.maximum.reduceat(np.abs(diff - segment_start), starts)
+
+        m = (p + q) / 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kl_p = np.where(p > 0, p * np.log2(p / m), 0.0)
+            kl_q = np.where(q > 0, q * np.log2(q / m), 0.0)
+        js = np.add.reduceat(0.5 * (kl_p + kl_q), starts)
+        return {"psi": psi, "ks": ks, "js": js}
+
+    def _proportions(self, counts: np.ndarray) -> np.ndarray:
+        totals = np.add.reduceat(counts, self.offsets).astype(np.float64)
+        return counts / np.repeat(np.maximum(totals, 1), self.sizes)
+
+
+class DriftSketcher:
+    """
+    Histogrammes de référence et de production pour un calcul de dérive instantané.
+
+    La référence (échantillon de `training_data`) est résumée une fois par un
+    `SketchLayout` et ses compteurs. Les logs de prédiction sont ensuite comptés au fil
+    de l'eau (branché sur l'`ApiLogWriter`, les prédictions servies par le cache, sans
+    features, ne sont pas recomptées), dans des fenêtres d'une heure ; chaque
+    processus (`writer_id`) écrit périodiquement ses propres compteurs dans
+    `drift_sketch_windows`, sans conflit avec les autres workers. La dérive d'une
+    période se calcule en sommant les compteurs des fenêtres concernées.
+    """
+
+    def __init__(self, engine, feature_names, persist_interval: float = 10.0, writer_id: Optional[str] = None):
+        self.engine = engine
+        self.feature_names = list(feature_names)
+        self.persist_interval = persist_interval
+        self.writer_id = writer_id or f"{os.uname().nodename}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.reference_id: Optional[int] = None
+        self.layout: Optional[SketchLayout] = None
+        self.reference_counts: Optional[np.ndarray] = None
+        self.reference_rows = 0
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._dirty = set()
+        self._last_persist = time.monotonic()
+
+    # --- Référence ---
+    def load_reference(self, db: Session) -> bool:
+        """Charge la référence la plus récente ; retourne False s'il n'y en a pas encore."""
+        reference = db.query(models.DriftSketchReference).order_by(models.DriftSketchReference.id.desc()).first()
+        if reference is None or reference.layout["feature_names"] != self.feature_names:
+            return False
+        self._set_reference(reference)
+        return True
+
+    def build_reference(self, db: Session, sample_size: int = 10000, bins: int = 20) -> int:
+        """Calcule et enregistre une nouvelle référence à partir de `training_data`."""
+        matrix = self._reference_matrix(db, sample_size)
+        if len(matrix) == 0:
+            raise ValueError("Aucune donnée d'entraînement pour construire la référence.")
+        layout = SketchLayout.fit(self.feature_names, matrix, bins)
+        reference = models.DriftSketchReference(
+            created_at=datetime.now(),
+            n_rows=len(matrix),
+            layout=layout.to_json(),
+            counts=layout.count(matrix).tobytes(),
+        )
+        db.add(reference)
+        db.commit()
+        self._set_reference(reference)
+        return reference.id
+
+    def _set_reference(self, reference: models.DriftSketchReference):
+        with self._lock:
+            self.reference_id = reference.id
+            self.layout = SketchLayout.from_json(reference.layout)
+            self.reference_counts = np.frombuffer(reference.counts, dtype=COUNTS_DTYPE)
+            self.reference_rows = reference.n_rows
+            # Les compteurs en cours ne sont valables que pour le découpage précédent
+            self._windows, self._dirty = {}, set()
+
+    def _reference_matrix(self, db: Session, sample_size: int) -> np.ndarray:
+        packed = db.query(models.TrainingData.manifest_id, models.TrainingData.features) \
+                   .filter(models.TrainingData.features.isnot(None)).limit(sample_size).all()
+        if packed:
+            decoder = PackedFeatureDecoder(self.feature_names)
+            groups = defaultdict(list)
+            for manifest_id, blob in packed:
+                groups[manifest_id].append(blob)
+            for manifest_id in groups:
+                decoder.register(db.get(models.FeatureManifest, manifest_id))
+            return np.concatenate([decoder.decode(manifest_id, blobs) for manifest_id, blobs in groups.items()])
+        records = [data for (data,) in db.query(models.TrainingData.data).limit(sample_size)]
+        return self._to_matrix(records)
+
+    # --- Mise à jour au fil de l'eau ---
+    def observe(self, rows: List[dict]):
+        """Compte les logs écrits (appelé par l'`ApiLogWriter` après chaque insertion groupée)."""
+        if self.layout is None or not rows:
+            return
+        by_window = defaultdict(list)
+        for row in rows:
+            if row.get("input_data") is not None:
+                by_window[row["request_timestamp"].replace(minute=0, second=0, microsecond=0)].append(row["input_data"])
+        with self._lock:
+            layout = self.layout
+            for window_start, records in by_window.items():
+                counts = layout.count(self._to_matrix(records))
+                current, n_rows = self._windows.get(window_start, (np.zeros(layout.n_slots, dtype=COUNTS_DTYPE), 0))
+                self._windows[window_start] = (current + counts, n_rows + len(records))
+                self._dirty.add(window_start)
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist()
+
+    def persist(self):
+        """Écrit les compteurs modifiés de ce processus, puis oublie les fenêtres terminées."""
+        with self._lock:
+            self._last_persist = time.monotonic()
+            if self.reference_id is None or not self._dirty:
+                return
+            current_window = datetime.now().replace(minute=0, second=0, microsecond=0)
+            values = [
+                {
+                    "reference_id": self.reference_id, "window_start": window_start, "writer_id": self.writer_id,
+                    "n_rows": self._windows[window_start][1], "counts": self._windows[window_start][0].tobytes(),
+                    "updated_at": datetime.now(),
+                }
+                for window_start in sorted(self._dirty)
+            ]
+            self._dirty = set()
+            # La fenêtre précédente est gardée une heure de plus pour les logs écrits en retard
+            # (remplacer ses compteurs par un cumul partiel fausserait les totaux)
+            self._windows = {w: v for w, v in self._windows.items() if w >= current_window - timedelta(hours=1)}
+        try:
+            # Chaque processus est seul à écrire ses lignes : on remplace ses compteurs
+            statement = insert(models.DriftSketchWindow)
+            statement = statement.on_conflict_do_update(
+                index_elements=["reference_id", "window_start", "writer_id"],
+                set_={"n_rows": statement.excluded.n_rows, "counts": statement.excluded.counts,
+                      "updated_at": statement.excluded.updated_at},
+            )
+            with self.engine.begin() as connection:
+                connection.execute(statement, values)
+        except Exception as e:
+            print(f"ERREUR lors de l'enregistrement des histogrammes de dérive : {e}")
+
+    # --- Calcul de la dérive ---
+    def report(self, db: Session, start: datetime, end: datetime, psi_threshold: float = 0.2) -> dict:
+        """Dérive de chaque feature entre la référence et les logs de [start, end[ (fenêtres horaires)."""
+        if self.layout is None:
+            raise ValueError("Aucune référence de dérive n'est chargée.")
+        window_start = start.replace(minute=0, second=0, microsecond=0)
+        windows = db.query(models.DriftSketchWindow.n_rows, models.DriftSketchWindow.counts).filter(
+            models.DriftSketchWindow.reference_id == self.reference_id,
+            models.DriftSketchWindow.window_start >= window_start,
+            models.DriftSketchWindow.window_start < end,
+        ).all()
+        current_rows = sum(n_rows for n_rows, _ in windows)
+        current = np.zeros(self.layout.n_slots, dtype=COUNTS_DTYPE)
+        for _, counts in windows:
+            current += np.frombuffer(counts, dtype=COUNTS_DTYPE)
+
+        features = []
+        if current_rows:
+            metrics = self.layout.compare(self.reference_counts, current)
+            features = [
+                {"feature": name, "psi": float(psi), "ks": float(ks), "js": float(js), "drifted": bool(psi > psi_threshold)}
+                for name, psi, ks, js in zip(self.feature_names, metrics["psi"], metrics["ks"], metrics["js"])
+            ]
+            features.sort(key=lambda feature: feature["psi"], reverse=True)
+        drifted = sum(feature["drifted"] for feature in features)
+        return {
+            "reference_id": self.reference_id,
+            "reference_rows": self.reference_rows,
+            "current_rows": current_rows,
+            "window_start": window_start,
+            "window_end": end,
+            "psi_threshold": psi_threshold,
+            "drifted_features": drifted,
+            "drift_share": drifted / len(features) if features else 0.0,
+            "features": features,
+        }
+
+    def _to_matrix(self, records) -> np.ndarray:
+        # Feature absente ou None -> NaN (classe "manquant"), booléens -> 0 / 1
+        return np.array(
+            [[record.get(f) for f in self.feature_names] for record in records], dtype=np.float64
+        ).reshape(len(records), len(self.feature_names))
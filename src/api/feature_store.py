@@ -0,0 +1,218 @@
+# src/api/feature_store.py
+
+import json
+import threading
+import zlib
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Text, cast, func
+from sqlalchemy.orm import Session
+
+from src.database import models
+
+
+def data_hash_column():
+    """Empreinte MD5 du JSON des features d'un client, calculée par PostgreSQL."""
+    return func.md5(cast(models.ClientDataForTest.data, Text))
+
+
+class FeatureStore:
+    """
+    Copie en mémoire de la table `test_data`, prête pour l'inférence.
+
+    Les features de tous les clients sont rangées dans une matrice NumPy float64
+    (une ligne par client, colonnes dans l'ordre de `model.feature_names_in_`),
+    avec la même sémantique que les moteurs d'inférence : une feature absente du
+    JSON vaut 0, une valeur `None` devient NaN (puis est imputée par le modèle).
+    Un index `sk_id_curr -> ligne` permet une lecture en O(1), sans aucun accès BDD.
+    Le JSON d'origine de chaque client est gardé à côté (compressé) pour les logs :
+    ils reçoivent les mêmes features, types et clés que la lecture en BDD, donc les
+    mêmes empreintes de snapshot et les mêmes histogrammes de dérive.
+
+    Le rafraîchissement incrémental compare une empreinte MD5 du JSON de chaque
+    ligne, calculée par PostgreSQL : seules les lignes ajoutées ou modifiées sont
+    relues, les lignes supprimées sont retirées de l'index.
+    """
+
+    def __init__(self, feature_names, chunk_size: int = 5000):
+        self.feature_names = list(feature_names)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._matrix = np.empty((0, len(self.feature_names)), dtype=np.float64)
+        self._size = 0
+        self._positions = {}
+        self._hashes = {}
+        self._records = {}
+        self._free_rows = []
+        self._sorted_ids = []
+        self.loaded_at: Optional[datetime] = None
+        self._stop_refresh = threading.Event()
+        self._refresh_thread = None
+
+    # --- Chargement et rafraîchissement ---
+    def load(self, db: Session) -> int:
+        """Charge (ou recharge entièrement) toutes les lignes de `test_data`."""
+        return self.load_rows(self._query(db))
+
+    def load_rows(self, source: Iterable[Tuple[int, dict, Optional[str]]]) -> int:
+        """Charge toutes les lignes (sk_id_curr, features, empreinte) de `source` (ex. données synthétiques)."""
+        ids, chunks, rows, hashes, records = [], [], [], {}, {}
+        for sk_id_curr, data, row_hash in source:
+            ids.append(sk_id_curr)
+            rows.append(self._vectorize(data))
+            hashes[sk_id_curr] = row_hash
+            records[sk_id_curr] = _pack_record(data)
+            # Conversion par paquets pour ne pas garder tous les flottants Python en mémoire
+            if len(rows) == self.chunk_size:
+                chunks.append(np.array(rows, dtype=np.float64))
+                rows = []
+        chunks.append(np.array(rows, dtype=np.float64).reshape(len(rows), len(self.feature_names)))
+
+        matrix = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        with self._lock:
+            self._matrix = matrix
+            self._size = len(ids)
+            self._positions = {sk_id_curr: i for i, sk_id_curr in enumerate(ids)}
+            self._hashes = hashes
+            self._records = records
+            self._free_rows = []
+            self._sorted_ids = sorted(ids)
+            self.loaded_at = datetime.now()
+        return len(ids)
+
+    def refresh(self, db: Session) -> dict:
+        """Ne relit que les lignes ajoutées ou modifiées depuis le dernier chargement."""
+        current = dict(db.query(models.ClientDataForTest.sk_id_curr, data_hash_column()).all())
+        with self._lock:
+            known = dict(self._hashes)
+        changed = [sk_id_curr for sk_id_curr, row_hash in current.items() if known.get(sk_id_curr) != row_hash]
+        removed = [sk_id_curr for sk_id_curr in known if sk_id_curr not in current]
+
+        updates = {}
+        for i in range(0, len(changed), self.chunk_size):
+            chunk = changed[i:i + self.chunk_size]
+            for sk_id_curr, data, row_hash in self._query(db, models.ClientDataForTest.sk_id_curr.in_(chunk)):
+                updates[sk_id_curr] = (self._vectorize(data), row_hash, _pack_record(data))
+
+        with self._lock:
+            for sk_id_curr in removed:
+                self._free_rows.append(self._positions.pop(sk_id_curr))
+                self._hashes.pop(sk_id_curr)
+                self._records.pop(sk_id_curr)
+            for sk_id_curr, (row, row_hash, record) in updates.items():
+                position = self._positions.get(sk_id_curr)
+                if position is None:
+                    position = self._allocate_row()
+                    self._positions[sk_id_curr] = position
+                self._matrix[position] = row
+                self._hashes[sk_id_curr] = row_hash
+                self._records[sk_id_curr] = record
+            if removed or updates:
+                self._sorted_ids = sorted(self._positions)
+            self.loaded_at = datetime.now()
+        return {"updated": len(updates), "removed": len(removed), "clients": len(self._sorted_ids)}
+
+    def start_auto_refresh(self, session_factory, interval: float):
+        """Rafraîchit le store toutes les `interval` secondes dans un thread d'arrière-plan."""
+        def run():
+            while not self._stop_refresh.wait(interval):
+                try:
+                    with session_factory() as db:
+                        self.refresh(db)
+                except Exception as e:
+                    print(f"ERREUR lors du rafraîchissement du feature store : {e}")
+
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(target=run, name="feature-store-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_auto_refresh(self):
+        if self._refresh_thread is not None:
+            self._stop_refresh.set()
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    # --- Lecture ---
+    def get_row(self, client_id: int, with_record: bool = False):
+        """
+        Retourne une copie de la ligne de features du client, ou None s'il est inconnu.
+        Avec `with_record`, retourne (ligne, JSON compressé), lus ensemble (voir `to_record`).
+        """
+        with self._lock:
+            position = self._positions.get(client_id)
+            if position is None:
+                return None
+            row = self._matrix[position].copy()
+            return (row, self._records[client_id]) if with_record else row
+
+    def get_rows(self, client_ids: List[int], with_records: bool = False):
+        """
+        Retourne les ID trouvés (dans l'ordre demandé) et la matrice de leurs features,
+        plus la liste de leurs JSON compressés avec `with_records`.
+        """
+        with self._lock:
+            found = [(client_id, self._positions[client_id]) for client_id in client_ids if client_id in self._positions]
+            rows = self._matrix[[position for _, position in found]]
+            found_ids = [client_id for client_id, _ in found]
+            if with_records:
+                return found_ids, rows, [self._records[client_id] for client_id in found_ids]
+        return found_ids, rows
+
+    def row_hash(self, client_id: int) -> Optional[str]:
+        """Empreinte du JSON du client au dernier chargement, ou None s'il est inconnu."""
+        with self._lock:
+            return self._hashes.get(client_id)
+
+    def client_ids(self) -> List[int]:
+        return self._sorted_ids
+
+    @staticmethod
+    def to_record(packed_record: bytes) -> dict:
+        """JSON d'origine d'un client (pour les logs), à partir de sa version compressée."""
+        return json.loads(zlib.decompress(packed_record))
+
+    def memory_usage(self) -> dict:
+        """Empreinte mémoire approximative du store, en octets."""
+        with self._lock:
+            matrix_bytes = self._matrix.nbytes
+            # Estimation : ~100 octets par entrée de dictionnaire (clé int + valeur)
+            index_bytes = 100 * (len(self._positions) + len(self._hashes) + len(self._records)) + 8 * len(self._sorted_ids)
+            records_bytes = sum(len(record) for record in self._records.values())
+            return {
+                "clients": len(self._positions),
+                "features": len(self.feature_names),
+                "allocated_rows": self._size,
+                "matrix_bytes": matrix_bytes,
+                "index_bytes": index_bytes,
+                "records_bytes": records_bytes,
+                "total_bytes": matrix_bytes + index_bytes + records_bytes,
+                "loaded_at": self.loaded_at,
+            }
+
+    # --- Fonctions internes ---
+    def _query(self, db: Session, *filters):
+        query = db.query(models.ClientDataForTest.sk_id_curr, models.ClientDataForTest.data, data_hash_column())
+        if filters:
+            query = query.filter(*filters)
+        return query.yield_per(self.chunk_size)
+
+    def _vectorize(self, data: dict) -> list:
+        return [data.get(f, 0) for f in self.feature_names]
+
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._size == len(self._matrix):
+            # Croissance géométrique pour amortir les ajouts successifs
+            grown = np.empty((max(2 * len(self._matrix), 16), len(self.feature_names)), dtype=np.float64)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._size += 1
+        return self._size - 1
+
+
+def _pack_record(data: dict) -> bytes:
+    # Compression rapide : ~5 Ko par client au lieu de ~23 Ko de JSON, relu en ~0,3 ms
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 1)
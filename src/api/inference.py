@@ -0,0 +1,167 @@
+# src/api/inference.py
+
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from lightgbm import LGBMClassifier
+
+# Les deux moteurs exposent la même interface :
+# - predict_record(record) : probabilité de défaut pour un seul dictionnaire de features,
+#   en deux temps : prepare_record(record) (entrée du modèle) puis predict_prepared(X)
+# - build_matrix(records)  : matrice (n_clients x n_features) dans l'ordre de `feature_names_in_`
+# - predict_proba(X)       : probabilités de défaut pour une matrice construite par build_matrix
+# Sémantique commune : une feature absente du JSON vaut 0, une valeur `None` est imputée.
+
+class PipelineEngine:
+    """Moteur de référence : DataFrame pandas + Pipeline scikit-learn complet."""
+    name = "pipeline"
+
+    def __init__(self, model):
+        self.model = model
+        self.feature_names = list(model.feature_names_in_)
+
+    def predict_record(self, record: dict) -> float:
+        return self.predict_prepared(self.prepare_record(record))
+
+    def prepare_record(self, record: dict) -> pd.DataFrame:
+        client_data_df = pd.DataFrame([record])
+        return client_data_df.reindex(columns=self.feature_names, fill_value=0)
+
+    def predict_prepared(self, X: pd.DataFrame) -> float:
+        return float(self.model.predict_proba(X)[:, 1][0])
+
+    def build_matrix(self, records) -> pd.DataFrame:
+        rows = [[record.get(f, 0) for f in self.feature_names] for record in records]
+        return pd.DataFrame(rows, columns=self.feature_names)
+
+    def predict_proba(self, X) -> np.ndarray:
+        if isinstance(X, np.ndarray):
+            X = pd.DataFrame(X, columns=self.feature_names)
+        return self.model.predict_proba(X)[:, 1]
+
+
+class NumpyEngine:
+    """
+    Moteur rapide sans pandas pour un Pipeline `SimpleImputer` + `LGBMClassifier`.
+    L'ordre des features, les valeurs d'imputation et les paramètres de prédiction
+    sont calculés une seule fois au chargement ; le booster LightGBM est ensuite
+    appelé directement sur une ligne float64 pré-allouée.
+    Les probabilités sont identiques bit à bit à celles de `Pipeline.predict_proba`.
+    """
+    name = "numpy"
+
+    def __init__(self, model):
+        imputer, classifier = _unpack_pipeline(model)
+        self.model = model
+        self.feature_names = list(model.feature_names_in_)
+
+        # Le SimpleImputer supprime les colonnes sans aucune valeur observée à l'entraînement
+        statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+        if imputer.keep_empty_features:
+            kept = np.arange(len(statistics))
+        else:
+            kept = np.flatnonzero(~np.isnan(statistics))
+        self._kept_indexes = kept
+        self._kept_names = [self.feature_names[i] for i in kept]
+        self._fill_values = statistics[kept]
+
+        self._booster = classifier.booster_
+        self._predict_params = _booster_predict_params(classifier)
+        self._local = threading.local()
+
+    def _row_buffer(self) -> np.ndarray:
+        # Un buffer par thread : les endpoints synchrones tournent dans un pool de threads
+        buffer = getattr(self._local, "row", None)
+        if buffer is None:
+            buffer = np.empty((1, len(self._kept_names)), dtype=np.float64)
+            self._local.row = buffer
+        return buffer
+
+    def _impute(self, X: np.ndarray) -> np.ndarray:
+        np.copyto(X, self._fill_values, where=np.isnan(X))
+        return X
+
+    def predict_record(self, record: dict) -> float:
+        return self.predict_prepared(self.prepare_record(record))
+
+    def prepare_record(self, record: dict) -> np.ndarray:
+        """Ligne imputée, limitée aux features conservées (buffer du thread, à prédire aussitôt)."""
+        row = self._row_buffer()
+        row[0] = [record.get(f, 0) for f in self._kept_names]
+        return self._impute(row)
+
+    def predict_prepared(self, X: np.ndarray) -> float:
+        return float(self._booster.predict(X, **self._predict_params)[0])
+
+    def build_matrix(self, records) -> np.ndarray:
+        return np.array([[record.get(f, 0) for f in self.feature_names] for record in records], dtype=np.float64)
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+        X_kept = self._impute(X.take(self._kept_indexes, axis=1))
+        return self._booster.predict(X_kept, **self._predict_params)
+
+
+def _unpack_pipeline(model):
+    """Vérifie que le modèle a la forme attendue et retourne (imputer, classifier)."""
+    steps = getattr(model, "steps", None)
+    if not steps or len(steps) != 2:
+        raise ValueError("Le moteur 'numpy' attend un Pipeline à deux étapes (imputer, classifier).")
+    imputer, classifier = steps[0][1], steps[1][1]
+    if not isinstance(imputer, SimpleImputer) or imputer.add_indicator or not _is_nan(imputer.missing_values):
+        raise ValueError("Le moteur 'numpy' ne supporte qu'un SimpleImputer sans indicateur, sur les valeurs NaN.")
+    if not isinstance(classifier, LGBMClassifier) or len(classifier.classes_) != 2 or callable(classifier.objective):
+        raise ValueError("Le moteur 'numpy' ne supporte qu'un LGBMClassifier binaire avec objectif standard.")
+    return imputer, classifier
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and np.isnan(value)
+
+def _booster_predict_params(classifier) -> dict:
+    """
+    Paramètres de `Booster.predict` équivalents à ceux de `LGBMClassifier.predict_proba`,
+    lus par l'API publique de LightGBM (le nombre d'itérations par défaut, `best_iteration`,
+    est appliqué par le booster lui-même).
+    """
+    params = classifier.get_params()
+    n_jobs = next(
+        (params[alias] for alias in ("num_threads", "num_thread", "nthread", "nthreads") if params.get(alias) is not None),
+        params.get("n_jobs"),
+    )
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None:
+        n_jobs = cpu_count
+    elif n_jobs < 0:
+        n_jobs = max(cpu_count + 1 + n_jobs, 1)
+    return {"raw_score": False, "num_threads": n_jobs, "validate_features": False}
+
+ENGINES = {
+    PipelineEngine.name: PipelineEngine,
+    NumpyEngine.name: NumpyEngine,
+}
+
+def load_inference_engine(model, engine_name: str):
+    """
+    Construit le moteur d'inférence demandé.
+    Si le modèle n'est pas compatible avec le moteur rapide, on se rabat sur le Pipeline.
+    """
+    if engine_name not in ENGINES:
+        raise ValueError(f"Moteur d'inférence inconnu : '{engine_name}'. Valeurs possibles : {list(ENGINES)}")
+    try:
+        return ENGINES[engine_name](model)
+    except ValueError as e:
+        print(f"ATTENTION : moteur '{engine_name}' indisponible ({e}). Utilisation du moteur 'pipeline'.")
+        return PipelineEngine(model)
+
+def model_file_version(path: str) -> str:
+    """Version du modèle : début de l'empreinte SHA-256 du fichier (change à chaque réentraînement)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
@@ -0,0 +1,83 @@
+# src/api/log_writer.py
+
+from typing import List
+
+from sqlalchemy import insert
+
+from src.api.batch_writer import BatchWriter
+from src.database import models
+
+
+class ApiLogWriter(BatchWriter):
+    """
+    Écrit les logs de prédiction en arrière-plan, par lots.
+
+    Les endpoints déposent des dictionnaires (colonnes de `api_logs`) dans une file
+    bornée ; un thread les regroupe et les insère avec un seul `executemany` dès que
+    `batch_size` lignes sont prêtes ou que `flush_interval` secondes se sont écoulées.
+    Quand la file est pleine, la politique `full_policy` s'applique :
+    - "drop"  : le log est abandonné immédiatement (la prédiction n'attend jamais) ;
+    - "block" : on attend au plus `block_timeout` secondes avant d'abandonner ; `submit`
+      peut alors bloquer et ne doit pas être appelé depuis la boucle d'événements
+      (voir `blocking`).
+    Les `listeners` sont appelés, dans le thread d'écriture, avec chaque lot écrit
+    (ex. mise à jour des histogrammes de dérive).
+    Avec `snapshots` (FeatureSnapshotStore), `input_data` n'est pas recopié dans
+    `api_logs` : le log référence un snapshot dédupliqué de `feature_snapshots`.
+    """
+
+    thread_name = "api-log-writer"
+
+    def __init__(self, engine, max_queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, full_policy: str = "drop", block_timeout: float = 0.05,
+                 listeners=None, snapshots=None):
+        if full_policy not in ("drop", "block"):
+            raise ValueError(f"Politique de file pleine inconnue : '{full_policy}'. Valeurs possibles : ['drop', 'block']")
+        super().__init__(max_queue_size=max_queue_size, batch_size=batch_size, flush_interval=flush_interval)
+        self.engine = engine
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.listeners = list(listeners or [])
+        self.snapshots = snapshots
+
+    # --- Côté requêtes ---
+    @property
+    def blocking(self) -> bool:
+        """True si `submit` peut attendre une place dans la file (politique "block")."""
+        return self.full_policy == "block"
+
+    def submit(self, record: dict) -> bool:
+        """Dépose un log dans la file. Retourne False si le log a été abandonné."""
+        return self._enqueue(record, timeout=self.block_timeout if self.full_policy == "block" else None)
+
+    def submit_many(self, records: List[dict]) -> int:
+        """Dépose plusieurs logs et retourne le nombre de logs acceptés."""
+        return sum(self.submit(record) for record in records)
+
+    # --- Côté thread d'écriture ---
+    def _write(self, rows: List[dict]):
+        if not rows:
+            return
+        try:
+            # Une liste de paramètres => executemany côté driver, dans une seule transaction
+            new_snapshots = []
+            with self.engine.begin() as connection:
+                prepared = rows
+                if self.snapshots is not None:
+                    prepared, new_snapshots = self.snapshots.prepare(connection, rows)
+                connection.execute(insert(models.ApiLog), prepared)
+            if new_snapshots:
+                self.snapshots.remember(new_snapshots)
+            with self._lock:
+                self.flushed += len(rows)
+        except Exception as e:
+            print(f"ERREUR lors de l'écriture groupée de {len(rows)} logs : {e}")
+            with self._lock:
+                self.failed += len(rows)
+            return
+        # Les listeners reçoivent les logs avec leurs features (input_data)
+        for listener in self.listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                print(f"ERREUR dans un listener du writer de logs : {e}")
@@ -4,27 +4,204 @@ from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 # --- CORRECTION APPLIQUÉE ICI ---
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, func, null, or_, select, tuple_, type_coerce
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-import joblib
 import pandas as pd
 import numpy as np
 import time
 import json
-from typing import List
-import traceback
+import base64
+from collections import defaultdict
+from typing import List, Optional
 
 from src.database import models, schemas
-from src.api import security
-from src.database.database import get_db
+from src.api import security, report_storage
+from src.api.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry, RequestMetricsMiddleware, StageTimer
+from src.api.model_registry import LoadedModel, ModelManager, active_version, list_versions
+from src.api.log_writer import ApiLogWriter
+from src.api.feature_store import FeatureStore, data_hash_column
+from src.api.prediction_cache import PredictionCache
+from src.api.shadow_scoring import ChallengerManager, ShadowScorer
+from src.api.drift_sketch import DriftSketcher
+from src.api.drift_jobs import DriftJobManager
+from src.api.profiler import DEFAULT_FOCUS, SamplingProfiler
+from src.api.drift_sampling import SAMPLING_METHODS, log_window, resolve_parameters
+from src.database.packed_features import PackedFeatureDecoder, FEATURE_STORAGES
+from src.database.partitions import LogPartitionManager
+from src.database.feature_snapshots import FeatureSnapshotStore, snapshot_hash, snapshot_query
+from src.database.database import get_db, get_async_db, engine, async_engine, SessionLocal, AsyncSessionLocal
 from src.config import settings
-from evidently import Report
-from evidently.presets import DataDriftPreset
-import tempfile
-import os
 
-app = FastAPI(title="API de Scoring Crédit", version="1.0")
-model = joblib.load(settings.model_path)
+# Résultats de /predict réutilisés tant que les features, le modèle et le seuil sont inchangés
+prediction_cache = PredictionCache(settings.prediction_cache_ttl_seconds, settings.prediction_cache_max_size)
+
+# Modèle servi (version active du registre, sinon MODEL_PATH), rechargeable à chaud (/admin/model)
+model_manager = ModelManager(
+    settings.model_registry_dir,
+    settings.model_path,
+    settings.inference_engine,
+    warmup_predictions=settings.model_warmup_predictions,
+    listeners=[lambda previous, loaded: prediction_cache.clear()],
+)
+model_manager.reload()
+feature_names = model_manager.current.feature_names
+
+# Modèle challenger optionnel, scoré en arrière-plan sur une part du trafic de /predict
+shadow_scorer = ShadowScorer(
+    engine,
+    settings.decision_threshold,
+    sample_rate=settings.challenger_sample_rate,
+    max_queue_size=settings.challenger_queue_max_size,
+    batch_size=settings.challenger_batch_size,
+    flush_interval=settings.challenger_flush_interval_seconds,
+    reference_loader=lambda champion: model_manager.load_copy(champion, max_threads=1),
+)
+# Challenger commun aux workers (fichier CHALLENGER du registre, sinon CHALLENGER_MODEL)
+challenger_manager = ChallengerManager(
+    shadow_scorer, model_manager, settings.challenger_model, settings.challenger_sample_rate
+)
+try:
+    challenger_manager.apply()
+except Exception as e:
+    print(f"ERREUR lors du chargement du modèle challenger : {e}")
+
+# Histogrammes de dérive, mis à jour à chaque écriture groupée des logs
+drift_sketcher = DriftSketcher(engine, feature_names, settings.drift_sketch_persist_interval_seconds)
+
+# Profiler par échantillonnage, activé à la demande par un administrateur (/admin/profiler)
+profiler = SamplingProfiler()
+
+# Les rapports Evidently sont calculés dans un pool de processus, hors des workers de l'API
+drift_jobs = DriftJobManager(
+    max_workers=settings.drift_job_max_concurrency, profiler=profiler,
+    heartbeat_interval=settings.drift_job_heartbeat_seconds, lease_seconds=settings.drift_job_lease_seconds,
+)
+
+# Partitions de `api_logs` créées à l'avance, anciennes partitions archivées puis supprimées
+log_partitions = LogPartitionManager(
+    engine,
+    interval=settings.api_logs_partition_interval,
+    ahead=settings.api_logs_partitions_ahead,
+    retention_days=settings.api_logs_retention_days,
+    archive_dir=settings.api_logs_archive_dir,
+)
+
+# Les logs de prédiction sont écrits par lots, hors du chemin de la requête
+log_writer = ApiLogWriter(
+    engine,
+    max_queue_size=settings.log_queue_max_size,
+    batch_size=settings.log_flush_batch_size,
+    flush_interval=settings.log_flush_interval_seconds,
+    full_policy=settings.log_queue_full_policy,
+    block_timeout=settings.log_queue_block_timeout_seconds,
+    listeners=[drift_sketcher.observe] if settings.drift_sketch_enabled else None,
+    snapshots=FeatureSnapshotStore(settings.log_feature_snapshot_cache_size) if settings.log_feature_snapshots else None,
+)
+
+# Copie en mémoire de `test_data` (optionnelle), chargée au démarrage
+feature_store = FeatureStore(feature_names)
+
+# Décodage des features stockées en vecteurs binaires (FEATURE_STORAGE=packed)
+if settings.feature_storage not in FEATURE_STORAGES:
+    raise ValueError(f"Stockage de features inconnu : '{settings.feature_storage}'. Valeurs possibles : {FEATURE_STORAGES}")
+packed_decoder = PackedFeatureDecoder(feature_names)
+
+# --- Métriques du processus, exportées au format Prometheus par /metrics ---
+metrics_registry = MetricsRegistry()
+http_requests = metrics_registry.counter(
+    "api_http_requests_total", "Requêtes HTTP traitées, par méthode, route et statut.", ["method", "route", "status"]
+)
+http_durations = metrics_registry.histogram(
+    "api_http_request_duration_seconds", "Durée totale des requêtes HTTP.", ["method", "route"]
+)
+stage_durations = metrics_registry.histogram(
+    "api_request_stage_duration_seconds",
+    "Durée des étapes d'une requête : auth, cache_lookup, feature_fetch, frame_build, model, log_write.", ["route", "stage"]
+)
+metrics_registry.gauge(
+    "api_model_load_seconds", "Durée du chargement (et de la chauffe) de la version servie du modèle.",
+    callback=lambda: model_manager.current.load_seconds
+)
+metrics_registry.gauge(
+    "api_model_info", "Version du modèle servie par ce processus (valeur 1).", ["version"],
+    callback=lambda: {(model_manager.current.version,): 1}
+)
+
+def db_pool_connections() -> dict:
+    """Connexions des pools SQLAlchemy (moteur synchrone et asyncpg) : utilisées, libres, en débordement."""
+    values = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        values[(name, "checked_out")] = pool.checkedout()
+        values[(name, "idle")] = pool.checkedin()
+        values[(name, "overflow")] = max(pool.overflow(), 0)
+    return values
+
+metrics_registry.gauge(
+    "api_db_pool_connections", "Connexions des pools de la BDD, par moteur et état.", ["engine", "state"],
+    callback=db_pool_connections
+)
+metrics_registry.gauge(
+    "api_prediction_cache_lookups", "Consultations du cache des prédictions, par résultat.", ["result"],
+    callback=lambda: {("hit",): prediction_cache.hits, ("miss",): prediction_cache.misses}
+)
+metrics_registry.gauge(
+    "api_log_writer_logs", "Compteurs de l'écriture des logs en arrière-plan.", ["state"],
+    callback=lambda: {(state,): value for state, value in log_writer.stats().items()}
+)
+
+def stage_timer(request: Request) -> StageTimer:
+    """Chronomètre des étapes de la requête, étiqueté par sa route."""
+    return StageTimer(stage_durations, route=request.scope["route"].path)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.feature_store_enabled:
+        with SessionLocal() as db:
+            feature_store.load(db)
+        usage = feature_store.memory_usage()
+        print(f"Feature store chargé : {usage['clients']} clients, {usage['total_bytes'] / 1e6:.1f} Mo.")
+        if settings.feature_store_refresh_interval_seconds > 0:
+            feature_store.start_auto_refresh(SessionLocal, settings.feature_store_refresh_interval_seconds)
+    if settings.model_reload_poll_seconds > 0:
+        model_manager.start_watching(settings.model_reload_poll_seconds)
+    if settings.challenger_poll_seconds > 0:
+        challenger_manager.start_watching(settings.challenger_poll_seconds)
+    if settings.drift_sketch_enabled:
+        with SessionLocal() as db:
+            try:
+                if not drift_sketcher.load_reference(db):
+                    drift_sketcher.build_reference(db, settings.drift_sketch_reference_size, settings.drift_sketch_bins)
+                print(f"Référence de dérive chargée : {drift_sketcher.reference_rows} lignes.")
+            except ValueError as e:
+                print(f"ATTENTION : histogrammes de dérive indisponibles ({e}).")
+    try:
+        log_partitions.run_once()
+    except Exception as e:
+        print(f"ERREUR lors de la maintenance des partitions de api_logs : {e}")
+    if settings.api_logs_maintenance_interval_seconds > 0:
+        log_partitions.start(settings.api_logs_maintenance_interval_seconds)
+    drift_jobs.start()
+    log_writer.start()
+    shadow_scorer.start()
+    yield
+    # Les logs encore en file sont écrits avant l'arrêt du processus
+    log_writer.stop()
+    shadow_scorer.stop()
+    profiler.stop()
+    drift_sketcher.persist()
+    drift_jobs.stop()
+    feature_store.stop_auto_refresh()
+    model_manager.stop_watching()
+    challenger_manager.stop_watching()
+    log_partitions.stop()
+    await async_engine.dispose()
+
+app = FastAPI(title="API de Scoring Crédit", version="1.0", lifespan=lifespan)
 
 # --- CONFIGURATION DU MIDDLEWARE CORS ---
 # Permet à votre dashboard local de communiquer avec l'API sur Hugging Face.
@@ -34,10 +211,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Autorise toutes les méthodes (GET, POST, etc.)
     allow_headers=["*"],  # Autorise tous les en-têtes
+    expose_headers=["X-Next-Cursor", "ETag"],  # Pagination des logs, cache des rapports
 )
+if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware, requests=http_requests, durations=http_durations)
 
 # --- Dépendances (le reste du fichier est identique) ---
-async def get_current_active_user(token: str = Depends(security.oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+async def get_current_active_user(request: Request, token: str = Depends(security.oauth2_scheme)) -> models.User:
+    start = time.perf_counter()
+    try:
+        return await _authenticate_token(token)
+    finally:
+        stage_durations.observe(time.perf_counter() - start, route=request.scope["route"].path, stage="auth")
+
+async def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)) -> models.User:
+    if current_user.username not in settings.admin_usernames:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès réservé aux administrateurs.")
+    return current_user
+
+async def profiled_request():
+    """Compte la requête dans la session du profiler (arrêtée après `max_requests` requêtes)."""
+    try:
+        yield
+    finally:
+        profiler.count_request()
+
+async def _authenticate_token(token: str) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,10 +249,16 @@ async def get_current_active_user(token: str = Depends(security.oauth2_scheme),
             raise credentials_exception
     except security.JWTError:
         raise credentials_exception
-    
-    user = security.get_user(db, username=username)
-    if user is None or user.disabled:
-        raise credentials_exception
+
+    # La table `users` n'est interrogée qu'en cas d'absence dans le cache
+    cache_key = (username, payload.get("exp"))
+    user = security.identity_cache.get(cache_key)
+    if user is None:
+        async with AsyncSessionLocal() as db:
+            user = await security.get_user_async(db, username=username)
+        if user is None or user.disabled:
+            raise credentials_exception
+        security.identity_cache.set(cache_key, user, payload.get("exp"))
     return user
 
 # --- Fonctions utilitaires ---
@@ -67,6 +272,12 @@ def to_serializable(val):
         return float(val)
     return val
 
+async def register_manifests(db: AsyncSession, manifest_ids):
+    """Charge les manifestes du stockage packed pas encore connus du décodeur (une seule fois par ID)."""
+    for manifest_id in set(manifest_ids):
+        if not packed_decoder.knows(manifest_id):
+            packed_decoder.register(await db.get(models.FeatureManifest, manifest_id))
+
 # --- Endpoints ---
 @app.get("/")
 def read_root():
@@ -74,129 +285,794 @@ def read_root():
 
 @app.post("/auth", response_model=schemas.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = security.authenticate_user(db, form_data.username, form_data.password)
+    user = await security.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = security.create_access_token(data={"sub": user.username}, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/predict/{client_id}", response_model=schemas.PredictionResponse)
-def predict(
+@app.get("/auth/identity-cache", response_model=schemas.IdentityCacheStats)
+def get_identity_cache_stats(current_user: models.User = Depends(get_current_active_user)):
+    """Compteurs du cache des identités (hits / misses)."""
+    return security.identity_cache.stats()
+
+# Cette route doit être déclarée AVANT /predict/{client_id}, sinon "batch" serait
+# interprété comme un client_id.
+@app.post("/predict/batch", response_model=schemas.BatchPredictionResponse, dependencies=[Depends(profiled_request)])
+async def predict_batch(
+    request: Request,
+    payload: schemas.BatchPredictionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Score une liste d'ID clients en un seul appel au modèle.
+    Les données sont lues par paquets via `IN (...)`, assemblées dans une seule
+    matrice de features, et les logs sont écrits en une seule insertion groupée.
+    """
+    if len(payload.client_ids) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Un lot ne peut pas dépasser {settings.batch_max_size} ID clients."
+        )
+
+    start_time = time.time()
+    timer = stage_timer(request)
+    # Version lue une seule fois : un rechargement pendant la requête ne la change pas
+    active_model = model_manager.current
+    unique_ids = list(dict.fromkeys(payload.client_ids))
+
+    clients_data, packed_data = None, {}
+    if not settings.feature_store_enabled:
+        clients_data = {}
+        chunk_size = settings.batch_query_chunk_size
+        for i in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[i:i + chunk_size]
+            if settings.feature_storage == "packed":
+                rows = await db.execute(
+                    select(models.ClientDataForTest.sk_id_curr, models.ClientDataForTest.manifest_id, models.ClientDataForTest.features)
+                    .where(models.ClientDataForTest.sk_id_curr.in_(chunk))
+                )
+                packed_rows = rows.tuples().all()
+                packed_data.update((client_id, (manifest_id, blob)) for client_id, manifest_id, blob in packed_rows if blob is not None)
+                # Les lignes pas encore migrées sont lues en JSON
+                chunk = [client_id for client_id, _, blob in packed_rows if blob is None]
+                if not chunk:
+                    continue
+            rows = await db.execute(
+                select(models.ClientDataForTest.sk_id_curr, models.ClientDataForTest.data)
+                .where(models.ClientDataForTest.sk_id_curr.in_(chunk))
+            )
+            clients_data.update(rows.tuples().all())
+        await register_manifests(db, [manifest_id for manifest_id, _ in packed_data.values()])
+        timer.lap("feature_fetch")
+
+    # Le calcul (matrice, modèle, préparation des logs) ne doit pas bloquer la boucle d'événements
+    results, log_records = await run_in_threadpool(
+        _score_batch, active_model, payload.client_ids, unique_ids, clients_data, start_time, timer, packed_data
+    )
+    await _submit_logs(log_records)
+    timer.lap("log_write")
+
+    return {"results": results}
+
+def _score_batch(active_model: LoadedModel, client_ids: List[int], unique_ids: List[int], clients_data,
+                 start_time: float, timer: StageTimer, packed_data=None):
+    """Partie CPU de /predict/batch, exécutée dans le pool de threads."""
+    scorer = active_model.scorer
+    from_store = clients_data is None
+    if from_store:
+        found_ids, batch_matrix, packed_records = feature_store.get_rows(unique_ids, with_records=True)
+        timer.lap("feature_fetch")
+    elif packed_data:
+        found_ids = [client_id for client_id in unique_ids if client_id in clients_data or client_id in packed_data]
+        batch_matrix = _packed_batch_matrix(scorer, found_ids, clients_data, packed_data)
+    else:
+        found_ids = [client_id for client_id in unique_ids if client_id in clients_data]
+        batch_matrix = scorer.build_matrix([clients_data[client_id] for client_id in found_ids]) if found_ids else None
+    timer.lap("frame_build")
+
+    predictions = {}
+    if found_ids:
+        probas = scorer.predict_proba(batch_matrix)
+        predictions = {client_id: float(p) for client_id, p in zip(found_ids, probas)}
+    timer.lap("model")
+
+    # Features des logs (comptées dans l'étape "log_write")
+    if from_store:
+        clients_data = {client_id: feature_store.to_record(record) for client_id, record in zip(found_ids, packed_records)}
+    elif packed_data:
+        clients_data.update(
+            (client_id, packed_decoder.to_record(manifest_id, blob)) for client_id, (manifest_id, blob) in packed_data.items()
+        )
+
+    # Temps amorti par client, pour rester comparable aux logs de /predict
+    inference_time_ms = (time.time() - start_time) * 1000 / max(len(found_ids), 1)
+
+    results, log_records = [], []
+    request_timestamp = datetime.now()
+    for client_id in client_ids:
+        if client_id not in predictions:
+            results.append({"client_id": client_id, "error": f"Client ID {client_id} non trouvé."})
+            continue
+        prediction_proba = predictions[client_id]
+        decision = "Crédit Accordé" if prediction_proba < settings.decision_threshold else "Crédit Refusé"
+        results.append({"client_id": client_id, "prediction_probability": prediction_proba, "prediction_decision": decision})
+        log_records.append({
+            "request_timestamp": request_timestamp,
+            "client_id": client_id,
+            "input_data": {k: to_serializable(v) for k, v in clients_data[client_id].items()},
+            "prediction_proba": prediction_proba,
+            "prediction_decision": decision,
+            "inference_time_ms": inference_time_ms,
+            "http_status_code": 200,
+            "cached": False,
+            "model_version": active_model.version
+        })
+    return results, log_records
+
+def _packed_batch_matrix(scorer, found_ids: List[int], clients_data: dict, packed_data: dict) -> np.ndarray:
+    """Matrice de features : vecteurs packed décodés par manifeste, JSON pour les lignes non migrées."""
+    groups = defaultdict(list)
+    for position, client_id in enumerate(found_ids):
+        groups[packed_data[client_id][0] if client_id in packed_data else None].append(position)
+
+    batch_matrix = np.empty((len(found_ids), len(scorer.feature_names)), dtype=np.float64)
+    for manifest_id, positions in groups.items():
+        group_ids = [found_ids[position] for position in positions]
+        if manifest_id is None:
+            batch_matrix[positions] = scorer.build_matrix([clients_data[client_id] for client_id in group_ids])
+        else:
+            batch_matrix[positions] = packed_decoder.decode(manifest_id, [packed_data[client_id][1] for client_id in group_ids])
+    return batch_matrix
+
+@app.get("/predict/cache", response_model=schemas.PredictionCacheStats)
+def get_prediction_cache_stats(current_user: models.User = Depends(get_current_active_user)):
+    """Compteurs du cache des prédictions de ce processus (hits / misses)."""
+    return {**prediction_cache.stats(), "model_version": model_manager.current.version}
+
+@app.delete("/predict/cache", response_model=schemas.PredictionCacheStats)
+def clear_prediction_cache(current_user: models.User = Depends(get_current_admin_user)):
+    """Vide le cache des prédictions de ce processus."""
+    prediction_cache.clear()
+    return {**prediction_cache.stats(), "model_version": model_manager.current.version}
+
+@app.post("/predict/{client_id}", response_model=schemas.PredictionResponse, dependencies=[Depends(profiled_request)])
+async def predict(
     request: Request,
     client_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     start_time = time.time()
-    db_client = db.query(models.ClientDataForTest).filter(models.ClientDataForTest.sk_id_curr == client_id).first()
-    if not db_client:
-        raise HTTPException(status_code=404, detail=f"Client ID {client_id} non trouvé.")
-
-    client_data_df = pd.DataFrame([db_client.data])
-    client_data_df = client_data_df.reindex(columns=model.feature_names_in_, fill_value=0)
-    
-    prediction_proba = float(model.predict_proba(client_data_df)[:, 1][0])
-    decision = "Crédit Accordé" if prediction_proba < settings.decision_threshold else "Crédit Refusé"
-    inference_time_ms = (time.time() - start_time) * 1000
+    timer = stage_timer(request)
+    active_model = model_manager.current
+    cache_key_suffix = (active_model.version, settings.decision_threshold)
 
-    try:
-        input_data_serializable = {k: to_serializable(v) for k, v in db_client.data.items()}
-        
-        log_entry = models.ApiLog(
-            request_timestamp=datetime.now(),
-            client_id=client_id,
-            input_data=input_data_serializable,
-            prediction_proba=prediction_proba,
-            prediction_decision=decision,
-            inference_time_ms=inference_time_ms,
-            http_status_code=200
+    # Empreinte des features : celle du feature store, ou lue en BDD dans la même requête que
+    # les features (qui ne sont pas lues si l'entrée en cache a encore la même empreinte)
+    row = None
+    if settings.feature_store_enabled:
+        feature_hash = feature_store.row_hash(client_id) if prediction_cache.enabled else None
+    else:
+        cached_key = prediction_cache.key(client_id)
+        known_hash = cached_key[0] if cached_key is not None and cached_key[1:] == cache_key_suffix else None
+        row = await _fetch_client(db, client_id, with_hash=prediction_cache.enabled, known_hash=known_hash)
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Client ID {client_id} non trouvé.")
+        feature_hash = row.row_hash
+
+    cache_key = None
+    if feature_hash is not None:
+        cache_key = (feature_hash, *cache_key_suffix)
+        cached = prediction_cache.get(client_id, cache_key)
+        timer.lap("cache_lookup")
+        if cached is not None:
+            prediction_proba, decision, snapshot = cached
+            await _log_prediction(active_model, client_id, None, prediction_proba, decision, start_time, cached=True,
+                                  snapshot=snapshot)
+            timer.lap("log_write")
+            return {"client_id": client_id, "prediction_probability": prediction_proba, "prediction_decision": decision}
+        if row is not None and row.data is None and row.features is None:
+            # Entrée expirée entre la lecture de sa clé et sa consultation : features relues
+            row = await _fetch_client(db, client_id)
+
+    if settings.feature_store_enabled:
+        entry = feature_store.get_row(client_id, with_record=True)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Client ID {client_id} non trouvé.")
+        timer.lap("feature_fetch")
+        prediction_proba, input_data = await run_in_threadpool(_score_features, active_model.scorer, *entry, timer)
+    elif row.features is not None:
+        timer.lap("feature_fetch")
+        prediction_proba, input_data = await run_in_threadpool(
+            _score_packed, active_model.scorer, row.manifest_id, row.features, timer
         )
-        db.add(log_entry)
-        db.commit()
-    except Exception as e:
-        print(f"ERREUR lors de l'enregistrement du log : {e}")
-        db.rollback()
+    else:
+        timer.lap("feature_fetch")
+        prediction_proba, input_data = await run_in_threadpool(_score_record, active_model.scorer, row.data, timer)
+
+    decision = "Crédit Accordé" if prediction_proba < settings.decision_threshold else "Crédit Refusé"
+    snapshot = None
+    if cache_key is not None and log_writer.snapshots is not None:
+        snapshot = snapshot_hash(input_data)
+    logged = await _log_prediction(active_model, client_id, input_data, prediction_proba, decision, start_time,
+                                   cached=False, snapshot=snapshot)
+    if cache_key is not None and logged:
+        # Le cache ne garde que l'empreinte du snapshot des features (~32 octets au lieu de ~70 Ko) ;
+        # un log abandonné (file pleine) n'écrira pas ce snapshot : le résultat n'est pas mis en cache
+        prediction_cache.set(client_id, cache_key, (prediction_proba, decision, snapshot))
+    shadow_scorer.submit_sample(active_model, client_id, input_data, prediction_proba)
+    timer.lap("log_write")
 
     return {"client_id": client_id, "prediction_probability": prediction_proba, "prediction_decision": decision}
 
+async def _log_prediction(active_model: LoadedModel, client_id: int, input_data: Optional[dict], prediction_proba: float,
+                          decision: str, start_time: float, cached: bool, snapshot: Optional[str] = None) -> bool:
+    """
+    Met le log en file et retourne False s'il a été abandonné. `snapshot` est l'empreinte
+    déjà calculée des features : un log servi par le cache ne référence que le snapshot
+    écrit lors du calcul (sans recopier les features ; le writer vérifie qu'il a bien été
+    écrit). Sans snapshots (LOG_FEATURE_SNAPSHOTS=false), un log servi par le cache n'a
+    pas de features et n'entre ni dans les histogrammes de dérive, ni dans les rapports.
+    """
+    row = {
+        "request_timestamp": datetime.now(),
+        "client_id": client_id,
+        "input_data": input_data,
+        "prediction_proba": prediction_proba,
+        "prediction_decision": decision,
+        "inference_time_ms": (time.time() - start_time) * 1000,
+        "http_status_code": 200,
+        "cached": cached,
+        "model_version": active_model.version
+    }
+    if snapshot is not None:
+        row["feature_hash"] = snapshot
+    return await _submit_logs([row]) == 1
+
+async def _submit_logs(records: List[dict]) -> int:
+    """
+    Met des logs en file et retourne le nombre de logs acceptés. Avec la politique "block",
+    l'attente d'une place se fait dans le pool de threads : elle ne retarde que cette
+    requête, pas la boucle d'événements.
+    """
+    if log_writer.blocking:
+        return await run_in_threadpool(log_writer.submit_many, records)
+    return log_writer.submit_many(records)
+
+async def _fetch_client(db: AsyncSession, client_id: int, with_hash: bool = False, known_hash: Optional[str] = None):
+    """
+    Lit en une requête la ligne `test_data` du client : empreinte du JSON (avec `with_hash`),
+    vecteur packed s'il existe (FEATURE_STORAGE=packed), JSON sinon. Si l'empreinte vaut
+    `known_hash` (résultat en cache), les features ne sont pas lues. None si le client est inconnu.
+    """
+    table = models.ClientDataForTest
+    row_hash = data_hash_column() if with_hash or known_hash is not None else null()
+    unchanged = row_hash == known_hash if known_hash is not None else None
+    features = null()
+    skip_data = unchanged
+    if settings.feature_storage == "packed":
+        features = table.features if unchanged is None else case((unchanged, null()), else_=table.features)
+        skip_data = table.features.isnot(None) if unchanged is None else or_(unchanged, table.features.isnot(None))
+    data = table.data if skip_data is None else case((skip_data, null()), else_=table.data)
+    row = (await db.execute(
+        select(
+            row_hash.label("row_hash"), table.manifest_id,
+            type_coerce(features, table.features.type).label("features"),
+            type_coerce(data, table.data.type).label("data"),
+        ).where(table.sk_id_curr == client_id)
+    )).first()
+    if row is not None and row.features is not None:
+        await register_manifests(db, [row.manifest_id])
+    return row
+
+# Parties CPU de /predict (entrée du modèle, modèle, features du log), exécutées dans le pool de threads.
+# La préparation des features du log est comptée dans l'étape "log_write".
+def _score_record(scorer, client_data: dict, timer: StageTimer):
+    X = scorer.prepare_record(client_data)
+    timer.lap("frame_build")
+    prediction_proba = scorer.predict_prepared(X)
+    timer.lap("model")
+    return prediction_proba, {k: to_serializable(v) for k, v in client_data.items()}
+
+def _score_features(scorer, features: np.ndarray, packed_record: bytes, timer: StageTimer):
+    X = features[np.newaxis, :]
+    timer.lap("frame_build")
+    prediction_proba = float(scorer.predict_proba(X)[0])
+    timer.lap("model")
+    return prediction_proba, {k: to_serializable(v) for k, v in feature_store.to_record(packed_record).items()}
+
+def _score_packed(scorer, manifest_id: int, blob: bytes, timer: StageTimer):
+    X = packed_decoder.decode(manifest_id, [blob])
+    timer.lap("frame_build")
+    prediction_proba = float(scorer.predict_proba(X)[0])
+    timer.lap("model")
+    return prediction_proba, packed_decoder.to_record(manifest_id, blob)
+
 @app.get("/clients", response_model=List[int])
-def get_all_client_ids(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    clients = db.query(models.ClientDataForTest.sk_id_curr).order_by(models.ClientDataForTest.sk_id_curr).all()
-    return [client[0] for client in clients]
-
-@app.get("/api-logs", response_model=List[schemas.ApiLog])
-def get_api_logs(limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    query = db.query(models.ApiLog).order_by(models.ApiLog.request_timestamp.desc())
-    if limit > 0:
-        query = query.limit(limit)
-    logs = query.all()
-    
-    for log in logs:
-        if isinstance(log.input_data, str):
-            log.input_data = json.loads(log.input_data)
-            
+async def get_all_client_ids(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_active_user)):
+    if settings.feature_store_enabled:
+        return feature_store.client_ids()
+    clients = await db.scalars(select(models.ClientDataForTest.sk_id_curr).order_by(models.ClientDataForTest.sk_id_curr))
+    return clients.all()
+
+# Champs renvoyés par /api-logs quand `fields` n'est pas précisé (sans le JSON des features)
+LOG_FIELDS = list(schemas.ApiLog.model_fields)
+DEFAULT_LOG_FIELDS = [field for field in LOG_FIELDS if field != "input_data"]
+
+def encode_log_cursor(timestamp: datetime, log_id: int) -> str:
+    """Curseur opaque : position (request_timestamp, id) du dernier log d'une page."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), log_id]).encode("utf-8")).decode("ascii")
+
+def decode_log_cursor(cursor: str):
+    try:
+        timestamp, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide.")
+
+def local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Les horodatages des logs sont en heure locale, sans fuseau."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+@app.get("/api-logs", response_model=List[schemas.ApiLog], response_model_exclude_unset=True)
+async def get_api_logs(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Logs du plus récent au plus ancien, sur la période [start, end[, par pages d'au plus
+    `api_logs_max_page_size` logs (`limit=0` : page maximale).
+
+    Pagination par clé sur (request_timestamp, id), indexée : quand la page est pleine,
+    l'en-tête X-Next-Cursor donne le `cursor` de la page suivante (pas d'OFFSET à parcourir).
+    `fields` (noms séparés par des virgules) choisit les colonnes lues ; `input_data`,
+    volumineux, n'est renvoyé que s'il est demandé.
+    """
+    selected = DEFAULT_LOG_FIELDS if fields is None else [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in LOG_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Champs inconnus : {', '.join(unknown)} (valeurs possibles : {', '.join(LOG_FIELDS)})."
+        )
+    columns = ["id", "request_timestamp"] + [field for field in selected if field not in ("id", "request_timestamp")]
+    with_features = "input_data" in columns
+    if with_features:
+        columns.append("feature_hash")
+    page_size = min(limit, settings.api_logs_max_page_size) if limit > 0 else settings.api_logs_max_page_size
+
+    log = models.ApiLog
+    query = select(*[getattr(log, column) for column in columns]) \
+        .order_by(log.request_timestamp.desc(), log.id.desc()).limit(page_size)
+    if start is not None:
+        query = query.where(log.request_timestamp >= local_naive(start))
+    if end is not None:
+        query = query.where(log.request_timestamp < local_naive(end))
+    if cursor:
+        cursor_timestamp, cursor_id = decode_log_cursor(cursor)
+        # La borne simple sur request_timestamp permet d'écarter les partitions plus récentes
+        query = query.where(log.request_timestamp <= cursor_timestamp,
+                            tuple_(log.request_timestamp, log.id) < tuple_(cursor_timestamp, cursor_id))
+    logs = [dict(row) for row in (await db.execute(query)).mappings()]
+
+    if with_features:
+        # Features des logs récents : snapshots référencés, lus une fois pour toute la page
+        hashes = {row["feature_hash"] for row in logs if row["input_data"] is None and row["feature_hash"]}
+        snapshots = dict((await db.execute(snapshot_query(hashes))).all()) if hashes else {}
+        for row in logs:
+            feature_hash = row.pop("feature_hash")
+            if row["input_data"] is None:
+                row["input_data"] = snapshots.get(feature_hash)
+            if isinstance(row["input_data"], str):
+                row["input_data"] = json.loads(row["input_data"])
+    if len(logs) == page_size:
+        response.headers["X-Next-Cursor"] = encode_log_cursor(logs[-1]["request_timestamp"], logs[-1]["id"])
     return logs
 
+# Granularités de /api-logs/stats (noms acceptés par `date_trunc`)
+STATS_BUCKETS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+def truncate_time(value: datetime, bucket: str) -> datetime:
+    """Début de la tranche contenant `value`, comme `date_trunc` (semaines commençant le lundi)."""
+    if bucket == "minute":
+        return value.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if bucket == "day" else day - timedelta(days=day.weekday())
+
+@app.get("/api-logs/stats", response_model=schemas.LogStats)
+async def get_api_logs_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Latence (moyenne, p50/p95/p99), volume, taux d'erreur, part servie par le cache et
+    répartition des décisions sur la période [start, end[ (par défaut : depuis le premier
+    log), au total et par tranche de temps, calculés en SQL (`percentile_cont`, `date_trunc`) : seules
+    quelques centaines de lignes agrégées sont renvoyées, quelle que soit la période.
+    Sans `bucket`, la plus fine granularité donnant au plus `api_logs_stats_max_buckets`
+    tranches est choisie.
+    """
+    log = models.ApiLog
+    end = local_naive(end) or datetime.now()
+    start = local_naive(start)
+    if start is None:
+        start = await db.scalar(select(func.min(log.request_timestamp)).where(log.request_timestamp < end))
+    span = end - start if start is not None else timedelta(0)
+    max_buckets = settings.api_logs_stats_max_buckets
+    if bucket is None:
+        bucket = next((name for name, width in STATS_BUCKETS.items() if span / width <= max_buckets), "week")
+    elif bucket not in STATS_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Granularité inconnue (valeurs possibles : {', '.join(STATS_BUCKETS)}).")
+    elif span / STATS_BUCKETS[bucket] > max_buckets:
+        raise HTTPException(status_code=400, detail=f"Plus de {max_buckets} tranches sur cette période : choisissez une granularité plus large.")
+
+    window = [log.request_timestamp < end] + ([log.request_timestamp >= start] if start is not None else [])
+    latency = log.inference_time_ms
+    aggregates = [
+        func.count().label("requests"),
+        func.count().filter(log.http_status_code != 200).label("errors"),
+        func.count().filter(log.cached).label("cached"),
+        func.avg(latency).label("mean_ms"),
+        *[func.percentile_cont(q).within_group(latency).label(f"p{int(q * 100)}_ms") for q in (0.5, 0.95, 0.99)],
+    ]
+    bucket_start = func.date_trunc(bucket, log.request_timestamp).label("bucket_start")
+
+    totals = (await db.execute(select(*aggregates).where(*window))).mappings().one()
+    rows = (await db.execute(
+        select(bucket_start, *aggregates).where(*window).group_by(bucket_start).order_by(bucket_start)
+    )).mappings().all()
+    decisions = (await db.execute(
+        select(bucket_start, log.prediction_decision, func.count()).where(*window).group_by(bucket_start, log.prediction_decision)
+    )).all()
+
+    bucket_decisions = defaultdict(dict)
+    total_decisions = defaultdict(int)
+    for bucket_time, decision, count in decisions:
+        bucket_decisions[bucket_time][decision] = count
+        total_decisions[decision] += count
+
+    # Les tranches sans log sont renvoyées à zéro : les graphiques montrent les creux
+    by_start = {row["bucket_start"]: row for row in rows}
+    buckets = []
+    bucket_time = truncate_time(start, bucket) if start is not None else end
+    while bucket_time < end:
+        row = by_start.get(bucket_time, {"bucket_start": bucket_time, "requests": 0, "errors": 0, "cached": 0})
+        buckets.append({**row, "decisions": bucket_decisions[bucket_time]})
+        bucket_time += STATS_BUCKETS[bucket]
+    return {
+        **totals, "start": start, "end": end, "bucket": bucket,
+        "error_rate": totals["errors"] / totals["requests"] if totals["requests"] else 0.0,
+        "cache_hit_ratio": totals["cached"] / totals["requests"] if totals["requests"] else 0.0,
+        "decisions": total_decisions,
+        "buckets": buckets,
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Métriques du processus au format texte de Prometheus (non authentifié, pour le scraper)."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Les métriques ne sont pas activées.")
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.post("/admin/profiler/start", response_model=schemas.ProfilerStatus)
+def start_profiler(
+    request: Optional[schemas.ProfilerStartRequest] = None,
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Démarre une session du profiler par échantillonnage dans ce processus : les piles
+    de /predict, /predict/batch et /drift-reports (jobs compris) sont relevées jusqu'à
+    `duration_seconds` secondes ou `max_requests` requêtes, puis lues avec
+    GET /admin/profiler/profile.
+    """
+    request = request or schemas.ProfilerStartRequest()
+    duration = request.duration_seconds or settings.profiler_max_duration_seconds
+    interval_ms = request.interval_ms or settings.profiler_interval_ms
+    if not 0 < duration <= settings.profiler_max_duration_seconds:
+        raise HTTPException(
+            status_code=400, detail=f"La durée doit être comprise entre 0 et {settings.profiler_max_duration_seconds} secondes."
+        )
+    if not 0.5 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="L'intervalle d'échantillonnage doit être compris entre 0,5 et 1000 ms.")
+    if request.max_requests is not None and request.max_requests <= 0:
+        raise HTTPException(status_code=400, detail="Le nombre de requêtes doit être positif.")
+    try:
+        profiler.start(
+            duration=duration, interval=interval_ms / 1000, max_requests=request.max_requests,
+            focus=DEFAULT_FOCUS if request.focus is None else request.focus,
+            include_drift_jobs=request.include_drift_jobs,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+@app.post("/admin/profiler/stop", response_model=schemas.ProfilerStatus)
+def stop_profiler(current_user: models.User = Depends(get_current_admin_user)):
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/admin/profiler", response_model=schemas.ProfilerStatus)
+def get_profiler_status(current_user: models.User = Depends(get_current_admin_user)):
+    return profiler.status()
+
+@app.get("/admin/profiler/profile")
+def get_profile(format: str = "collapsed", current_user: models.User = Depends(get_current_admin_user)):
+    """
+    Piles de la session courante ou de la dernière session : "collapsed" (une pile par
+    ligne, pour flamegraph.pl ou speedscope) ou "pstats" (fichier lisible par pstats/snakeviz).
+    """
+    if format not in ("collapsed", "pstats"):
+        raise HTTPException(status_code=400, detail="Format inconnu (valeurs possibles : collapsed, pstats).")
+    if profiler.session == 0:
+        raise HTTPException(status_code=404, detail="Aucune session de profiling.")
+    if format == "collapsed":
+        return Response(content=profiler.collapsed(), media_type="text/plain; charset=utf-8")
+    return Response(
+        content=profiler.pstats_dump(), media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profiler.session}.pstats"'}
+    )
+
+def model_version_info(metadata: dict) -> dict:
+    return {
+        "version": metadata["version"], "created_at": metadata.get("created_at"), "sha256": metadata.get("sha256"),
+        "features": len(metadata["feature_names"]), "metrics": metadata.get("metrics", {}),
+    }
+
+@app.get("/admin/model", response_model=schemas.ModelStatus)
+def get_model_status(current_user: models.User = Depends(get_current_admin_user)):
+    """Version servie par ce processus, dernier rechargement et versions du registre."""
+    current = model_manager.current
+    return {
+        "current": model_version_info(current.metadata),
+        "source": current.source,
+        "loaded_at": current.loaded_at,
+        "load_seconds": current.load_seconds,
+        "active_version": active_version(settings.model_registry_dir),
+        "reload": model_manager.last_reload,
+        "versions": [model_version_info(metadata) for metadata in list_versions(settings.model_registry_dir)],
+    }
+
+@app.post("/admin/model/reload", response_model=schemas.ModelReloadStatus, status_code=status.HTTP_202_ACCEPTED)
+def reload_model(
+    request: Optional[schemas.ModelReloadRequest] = None,
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Charge en arrière-plan une version du registre (par défaut la version active, ou
+    MODEL_PATH sans registre), la chauffe puis la sert à la place de la version courante ;
+    les requêtes en cours se terminent sur l'ancienne version. L'avancement se lit avec
+    GET /admin/model. Avec plusieurs workers, seul ce processus recharge immédiatement :
+    les autres suivent la version active s'ils surveillent le registre.
+    """
+    request = request or schemas.ModelReloadRequest()
+    try:
+        return model_manager.reload_in_background(request.version, activate=request.activate)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/shadow/stats", response_model=schemas.ShadowStats)
+async def get_shadow_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Comparaison champion / challenger sur la période [start, end[, par couple de versions :
+    taux d'accord des décisions, écart des probabilités et écart de latence (moyenne et p95),
+    calculés en SQL sur `shadow_predictions`, ainsi que les compteurs du scoring de ce processus.
+    """
+    shadow = models.ShadowPrediction
+    window = []
+    if start is not None:
+        window.append(shadow.request_timestamp >= local_naive(start))
+    if end is not None:
+        window.append(shadow.request_timestamp < local_naive(end))
+    versions = (shadow.champion_version, shadow.challenger_version)
+    rows = (await db.execute(
+        select(
+            *versions,
+            func.count().label("predictions"),
+            func.avg(case((shadow.champion_decision == shadow.challenger_decision, 1.0), else_=0.0)).label("agreement_rate"),
+            func.avg(shadow.challenger_proba - shadow.champion_proba).label("mean_diff"),
+            func.avg(func.abs(shadow.challenger_proba - shadow.champion_proba)).label("mean_abs_diff"),
+            func.avg(shadow.champion_time_ms).label("champion_mean_ms"),
+            func.avg(shadow.challenger_time_ms).label("challenger_mean_ms"),
+            func.percentile_cont(0.95).within_group(shadow.champion_time_ms).label("champion_p95_ms"),
+            func.percentile_cont(0.95).within_group(shadow.challenger_time_ms).label("challenger_p95_ms"),
+        ).where(*window).group_by(*versions).order_by(*versions)
+    )).mappings().all()
+    challenger = shadow_scorer.challenger
+    return {
+        **shadow_scorer.stats(),
+        "challenger_version": challenger.version if challenger is not None else None,
+        "sample_rate": shadow_scorer.sample_rate,
+        "change": challenger_manager.last_change,
+        "comparisons": [
+            {
+                **row,
+                "latency_delta_ms": row["challenger_mean_ms"] - row["champion_mean_ms"],
+                "latency_delta_p95_ms": row["challenger_p95_ms"] - row["champion_p95_ms"],
+            }
+            for row in rows
+        ],
+    }
+
+@app.post("/admin/shadow", response_model=schemas.ShadowConfigStatus, status_code=202)
+def configure_challenger(request: schemas.ShadowConfigRequest, current_user: models.User = Depends(get_current_admin_user)):
+    """
+    Change le challenger (version du registre ; vide : scoring fantôme arrêté) et/ou la part
+    du trafic qu'il score, pour tous les workers : le réglage est écrit dans le registre et
+    la version est chargée (et chauffée) en arrière-plan. Sans `version`, le challenger
+    demandé est conservé. Le statut du changement est visible dans GET /shadow/stats.
+    """
+    if request.sample_rate is not None and not 0 <= request.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="La part du trafic doit être comprise entre 0 et 1.")
+    try:
+        return challenger_manager.configure_in_background(request.version, request.sample_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api-logs/writer-stats", response_model=schemas.LogWriterStats)
+def get_log_writer_stats(current_user: models.User = Depends(get_current_active_user)):
+    """Compteurs de la file d'écriture des logs (mis en file, écrits, abandonnés, en échec)."""
+    return log_writer.stats()
+
+def require_feature_store():
+    if not settings.feature_store_enabled:
+        raise HTTPException(status_code=404, detail="Le feature store n'est pas activé.")
+
+@app.get("/feature-store/stats", response_model=schemas.FeatureStoreStats)
+def get_feature_store_stats(current_user: models.User = Depends(get_current_active_user)):
+    """Empreinte mémoire du feature store."""
+    require_feature_store()
+    return feature_store.memory_usage()
+
+@app.post("/feature-store/refresh", response_model=schemas.FeatureStoreRefresh)
+def refresh_feature_store(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    """Relit uniquement les lignes de `test_data` ajoutées, modifiées ou supprimées."""
+    require_feature_store()
+    return feature_store.refresh(db)
+
+def require_drift_sketch():
+    if not settings.drift_sketch_enabled:
+        raise HTTPException(status_code=404, detail="Les histogrammes de dérive ne sont pas activés.")
+    if drift_sketcher.layout is None:
+        raise HTTPException(status_code=409, detail="Aucune référence de dérive : lancez POST /drift-sketch/reference.")
+
+@app.get("/drift-sketch", response_model=schemas.SketchDriftReport)
+def get_sketch_drift(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    hours: int = 24,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Dérive (PSI, KS, Jensen-Shannon) de chaque feature entre la référence et les logs
+    de la période [start, end[ (par défaut, les `hours` dernières heures), calculée à
+    partir des histogrammes horaires : aucun log n'est relu.
+    """
+    require_drift_sketch()
+    end = end or datetime.now()
+    start = start or end - timedelta(hours=hours)
+    # Les compteurs de ce processus pas encore enregistrés sont écrits d'abord
+    drift_sketcher.persist()
+    return drift_sketcher.report(db, start, end, settings.drift_psi_threshold)
+
+@app.post("/drift-sketch/reference", response_model=schemas.SketchReferenceInfo)
+def rebuild_drift_reference(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    """Recalcule la référence à partir de `training_data` (les fenêtres suivantes l'utilisent)."""
+    if not settings.drift_sketch_enabled:
+        raise HTTPException(status_code=404, detail="Les histogrammes de dérive ne sont pas activés.")
+    try:
+        reference_id = drift_sketcher.build_reference(db, settings.drift_sketch_reference_size, settings.drift_sketch_bins)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"reference_id": reference_id, "reference_rows": drift_sketcher.reference_rows,
+            "features": len(drift_sketcher.feature_names)}
+
 @app.get("/drift-reports", response_model=List[schemas.DriftReportInfo])
-def get_drift_reports_list(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    reports = db.query(models.DriftReport.id, models.DriftReport.report_timestamp).order_by(models.DriftReport.report_timestamp.desc()).all()
-    return reports
+async def get_drift_reports_list(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_active_user)):
+    reports = await db.execute(
+        select(models.DriftReport.id, models.DriftReport.report_timestamp).order_by(models.DriftReport.report_timestamp.desc())
+    )
+    return reports.all()
 
 @app.get("/drift-reports/{report_id}", response_model=schemas.DriftReportDetail)
 def get_drift_report_detail(report_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    """Rapport complet dans une réponse JSON (préférer /drift-reports/{report_id}/html, plus léger)."""
     report = db.query(models.DriftReport).filter(models.DriftReport.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Rapport non trouvé.")
-    return report
+    return {"id": report.id, "report_timestamp": report.report_timestamp,
+            "report_html": report_storage.report_html(report, report_storage.load_segments(db, report))}
 
-@app.post("/drift-reports", status_code=status.HTTP_201_CREATED)
-def generate_drift_report(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    try:
-        print("Début de la génération du rapport de dérive...")
-        ref_query = db.query(models.TrainingData.data, models.TrainingData.target).limit(10000).statement
-        reference_df = pd.read_sql(ref_query, db.bind)
-
-        logs_query = db.query(models.ApiLog.input_data).statement
-        current_logs_df = pd.read_sql(logs_query, db.bind)
-
-        if current_logs_df.empty:
-            raise HTTPException(status_code=400, detail="Aucun log de production trouvé.")
-
-        reference_data = pd.DataFrame(list(reference_df['data']))
-        reference_data['TARGET'] = reference_df['target']
-        
-        # --- CORRECTION APPLIQUÉE ICI ---
-        # On convertit la chaîne JSON en dictionnaire avant de créer le DataFrame
-        current_data_list = [json.loads(row) if isinstance(row, str) else row for row in current_logs_df['input_data']]
-        current_data = pd.DataFrame(current_data_list)
-
-        if 'TARGET' in reference_data.columns:
-            reference_data.drop(columns=['TARGET'], inplace=True)
-        
-        common_cols = list(set(reference_data.columns) & set(current_data.columns))
-        
-        data_drift_report = Report(metrics=[DataDriftPreset()])
-        data_drift_report_run = data_drift_report.run(reference_data=reference_data[common_cols], current_data=current_data[common_cols])
-
-        fd, tmp_path = tempfile.mkstemp(suffix=".html")
-        try:
-            os.close(fd)
-            data_drift_report_run.save_html(tmp_path)
-            with open(tmp_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-        finally:
-            os.unlink(tmp_path)
-        
-        new_report = models.DriftReport(report_timestamp=datetime.now(), report_html=html_content)
-        db.add(new_report)
-        db.commit()
-
-        return {"message": "Rapport de dérive généré avec succès."}
+@app.get("/drift-reports/{report_id}/html", response_class=HTMLResponse)
+def get_drift_report_html(
+    report_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    HTML brut d'un rapport. Les segments compressés sont envoyés tels quels
+    (Content-Encoding: gzip, sans recompression) et l'ETag permet au client de
+    ne pas retélécharger un rapport déjà reçu (If-None-Match -> 304).
+    """
+    report = db.get(models.DriftReport, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Rapport non trouvé.")
+    etag = report_storage.report_etag(report)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if report_storage.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if report.segments is None:
+        return HTMLResponse(report.report_html, headers=headers)
 
-    except Exception as e:
-        print("--- ERREUR LORS DE LA GÉNÉRATION DU RAPPORT DE DÉRIVE ---")
-        traceback.print_exc()
-        print("---------------------------------------------------------")
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Erreur interne du serveur : {e}")
+    deflated = report_storage.load_segments(db, report)
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers.update({"Content-Encoding": "gzip", "Content-Length": str(report_storage.gzip_length(report, deflated))})
+        stream = report_storage.gzip_stream(report, deflated)
+    else:
+        headers["Content-Length"] = str(report.html_size)
+        stream = report_storage.html_stream(report, deflated)
+    return StreamingResponse(stream, media_type="text/html; charset=utf-8", headers=headers)
+
+@app.post("/drift-reports", response_model=schemas.DriftReportJobStatus, status_code=status.HTTP_202_ACCEPTED,
+          dependencies=[Depends(profiled_request)])
+def generate_drift_report(
+    request: Optional[schemas.DriftReportRequest] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Lance la génération d'un rapport Evidently en arrière-plan et retourne le job
+    immédiatement ; l'avancement se suit avec GET /drift-reports/jobs/{job_id}.
+
+    Le corps (optionnel) limite les logs à une fenêtre de temps et choisit la taille
+    et la méthode d'échantillonnage, appliquées en SQL de chaque côté.
+    """
+    parameters = resolve_parameters(request.model_dump() if request else None)
+    if parameters["sampling"] not in SAMPLING_METHODS:
+        raise HTTPException(
+            status_code=400, detail=f"Méthode d'échantillonnage inconnue (valeurs possibles : {', '.join(SAMPLING_METHODS)})."
+        )
+    if not 0 < parameters["sample_size"] <= settings.drift_report_max_sample_size:
+        raise HTTPException(
+            status_code=400, detail=f"La taille d'échantillon doit être comprise entre 1 et {settings.drift_report_max_sample_size}."
+        )
+    if parameters["bucket_minutes"] <= 0:
+        raise HTTPException(status_code=400, detail="La largeur des tranches de temps doit être positive.")
+    if parameters["start"] and parameters["end"] and \
+            datetime.fromisoformat(parameters["start"]) >= datetime.fromisoformat(parameters["end"]):
+        raise HTTPException(status_code=400, detail="Le début de la période doit précéder sa fin.")
+    if db.query(models.ApiLog.id).filter(*log_window(parameters)).first() is None:
+        raise HTTPException(status_code=400, detail="Aucun log de production trouvé sur la période demandée.")
+    return drift_jobs.submit(db, requested_by=current_user.username, parameters=parameters)
+
+@app.get("/drift-reports/jobs/{job_id}", response_model=schemas.DriftReportJobStatus)
+async def get_drift_report_job(job_id: int, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_active_user)):
+    job = await db.get(models.DriftReportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job non trouvé.")
+    return job
@@ -0,0 +1,305 @@
+# src/api/model_registry.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import joblib
+import numpy as np
+
+from src.api.inference import load_inference_engine, model_file_version
+
+# Registre des modèles : un dossier par version, la version servie est nommée dans ACTIVE
+#   <registre>/<version>/model.joblib
+#   <registre>/<version>/metadata.json  (empreinte, features, métriques d'entraînement)
+#   <registre>/ACTIVE
+#   <registre>/CHALLENGER  (challenger du scoring fantôme et part du trafic, commun à tous les workers)
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+ACTIVE_FILE = "ACTIVE"
+CHALLENGER_FILE = "CHALLENGER"
+# Paramètres de LightGBM / scikit-learn qui fixent le nombre de threads d'un modèle
+THREAD_PARAMS = ("n_jobs", "num_threads", "num_thread", "nthread", "nthreads")
+
+
+# --- Registre sur disque ---
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_atomically(path: str, content: str):
+    # Un lecteur (ex. un autre worker) ne voit jamais un fichier à moitié écrit
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+def publish_model(registry_dir: str, model, metrics: Optional[dict] = None, params: Optional[dict] = None,
+                  activate: bool = True) -> dict:
+    """
+    Enregistre `model` comme nouvelle version du registre (nommée d'après la date) avec
+    ses métadonnées, puis l'active si `activate`. Retourne les métadonnées.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    base_version = datetime.now().strftime("%Y%m%d-%H%M%S")
+    version, suffix = base_version, 1
+    while os.path.exists(os.path.join(registry_dir, version)):
+        suffix += 1
+        version = f"{base_version}-{suffix}"
+    version_dir = os.path.join(registry_dir, version)
+    os.makedirs(version_dir)
+
+    model_path = os.path.join(version_dir, MODEL_FILE)
+    joblib.dump(model, model_path)
+    metadata = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "sha256": file_sha256(model_path),
+        "feature_names": [str(name) for name in model.feature_names_in_],
+        "metrics": metrics or {},
+        "params": params or {},
+    }
+    _write_atomically(os.path.join(version_dir, METADATA_FILE), json.dumps(metadata, indent=2))
+    if activate:
+        activate_version(registry_dir, version)
+    return metadata
+
+def read_metadata(registry_dir: str, version: str) -> dict:
+    path = os.path.join(registry_dir, version, METADATA_FILE)
+    if os.path.basename(version) != version or not os.path.isfile(path):
+        raise ValueError(f"Version de modèle inconnue : '{version}'.")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def list_versions(registry_dir: str) -> List[dict]:
+    """Métadonnées de toutes les versions du registre, de la plus ancienne à la plus récente."""
+    if not registry_dir or not os.path.isdir(registry_dir):
+        return []
+    return [
+        read_metadata(registry_dir, name) for name in sorted(os.listdir(registry_dir))
+        if os.path.isfile(os.path.join(registry_dir, name, METADATA_FILE))
+    ]
+
+def active_version(registry_dir: str) -> Optional[str]:
+    """Version nommée dans ACTIVE, ou None si le registre est absent ou vide."""
+    if not registry_dir:
+        return None
+    try:
+        with open(os.path.join(registry_dir, ACTIVE_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def activate_version(registry_dir: str, version: str):
+    read_metadata(registry_dir, version)
+    _write_atomically(os.path.join(registry_dir, ACTIVE_FILE), version + "\n")
+
+def read_challenger(registry_dir: str) -> Optional[dict]:
+    """Challenger demandé à tous les workers ({"version", "sample_rate"}), ou None s'il n'a jamais été réglé."""
+    if not registry_dir:
+        return None
+    try:
+        with open(os.path.join(registry_dir, CHALLENGER_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_challenger(registry_dir: str, version: str, sample_rate: float):
+    """Demande un challenger (version vide : aucun) à tous les workers qui surveillent le registre."""
+    if version:
+        read_metadata(registry_dir, version)
+    config = {"version": version, "sample_rate": sample_rate}
+    _write_atomically(os.path.join(registry_dir, CHALLENGER_FILE), json.dumps(config) + "\n")
+
+def load_version(registry_dir: str, version: str):
+    """(modèle, métadonnées) d'une version, après vérification de l'empreinte du fichier."""
+    metadata = read_metadata(registry_dir, version)
+    model_path = os.path.join(registry_dir, version, MODEL_FILE)
+    if file_sha256(model_path) != metadata["sha256"]:
+        raise ValueError(f"Empreinte du modèle '{version}' différente de ses métadonnées (fichier modifié ou incomplet).")
+    return joblib.load(model_path), metadata
+
+
+# --- Modèle servi par l'API ---
+
+class LoadedModel:
+    """Une version chargée : moteur d'inférence prêt à servir et métadonnées (jamais modifiée)."""
+
+    def __init__(self, version: str, scorer, metadata: dict, source: str, load_seconds: float):
+        self.version = version
+        self.scorer = scorer
+        self.feature_names = scorer.feature_names
+        self.metadata = metadata
+        self.source = source
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now()
+
+
+class ModelManager:
+    """
+    Modèle servi par l'API, rechargeable à chaud sans redémarrer les workers.
+
+    La version active du registre (`registry_dir`) est servie ; sans registre, le
+    fichier `model_path` l'est, avec pour version le début de son empreinte SHA-256.
+    Un rechargement charge la nouvelle version, la chauffe avec quelques prédictions
+    factices, puis remplace `current` en une seule affectation : chaque requête lit
+    `current` une fois à son début et se termine donc sur la version avec laquelle
+    elle a commencé. Le feature store, le décodeur packed et les histogrammes de
+    dérive étant construits pour une liste de features, une version dont la liste
+    diffère est refusée (redémarrage nécessaire).
+    Les `listeners` sont appelés avec (ancienne version, nouvelle version) après
+    chaque remplacement (ex. vidage du cache des prédictions).
+    """
+
+    def __init__(self, registry_dir: str, model_path: str, engine_name: str, warmup_predictions: int = 5,
+                 listeners=None):
+        self.registry_dir = registry_dir
+        self.model_path = model_path
+        self.engine_name = engine_name
+        self.warmup_predictions = warmup_predictions
+        self.listeners = list(listeners or [])
+        self.current: Optional[LoadedModel] = None
+        self.last_reload: Optional[dict] = None
+        self._reload_lock = threading.Lock()
+        # Protège la vérification / le lancement d'un rechargement en arrière-plan
+        self._status_lock = threading.Lock()
+        self._signature = None
+        self._stop_watching = threading.Event()
+        self._watch_thread = None
+
+    # --- Chargement ---
+    def load(self, version: Optional[str] = None, max_threads: Optional[int] = None) -> LoadedModel:
+        """
+        Charge et chauffe, sans la servir, une version du registre (par défaut : la version
+        active) ou un fichier .joblib désigné par son chemin. `max_threads` fixe le nombre
+        de threads du modèle (ex. 1 pour un challenger qui ne doit pas concurrencer le
+        modèle servi).
+        """
+        start = time.perf_counter()
+        model_path = version if version is not None and os.path.isfile(version) else None
+        if model_path is None:
+            version = version or active_version(self.registry_dir)
+            model_path = self.model_path if version is None else None
+        if model_path is None:
+            model, metadata = load_version(self.registry_dir, version)
+            source = "registry"
+        else:
+            model = joblib.load(model_path)
+            version = model_file_version(model_path)
+            metadata = {"version": version, "feature_names": [str(name) for name in model.feature_names_in_]}
+            source = "file"
+        if max_threads is not None:
+            _limit_threads(model, max_threads)
+        scorer = load_inference_engine(model, self.engine_name)
+        self._warm_up(scorer)
+        return LoadedModel(version, scorer, metadata, source, time.perf_counter() - start)
+
+    def load_copy(self, loaded: LoadedModel, max_threads: Optional[int] = None) -> LoadedModel:
+        """Nouvelle instance d'une version déjà chargée (ex. limitée à `max_threads` threads)."""
+        return self.load(loaded.version if loaded.source == "registry" else self.model_path, max_threads=max_threads)
+
+    def reload(self, version: Optional[str] = None, activate: bool = False) -> LoadedModel:
+        """
+        Charge une version puis la sert à la place de la version courante. Avec
+        `activate`, la version devient aussi la version active du registre (suivie
+        par les autres workers qui surveillent le registre).
+        """
+        with self._reload_lock:
+            signature = self._source_signature()
+            loaded = self.load(version)
+            previous = self.current
+            if previous is not None and loaded.feature_names != previous.feature_names:
+                raise ValueError(
+                    f"La version '{loaded.version}' n'a pas les mêmes features que la version servie "
+                    f"'{previous.version}' : redémarrez l'API pour la charger."
+                )
+            if activate and version is not None:
+                activate_version(self.registry_dir, version)
+                signature = self._source_signature()
+            self.current = loaded
+            self._signature = signature
+        for listener in self.listeners:
+            try:
+                listener(previous, loaded)
+            except Exception as e:
+                print(f"ERREUR dans un listener du rechargement du modèle : {e}")
+        return loaded
+
+    def reload_in_background(self, version: Optional[str] = None, activate: bool = False) -> dict:
+        """Lance `reload` dans un thread et retourne son statut (RuntimeError si un rechargement est en cours)."""
+        if version is not None:
+            read_metadata(self.registry_dir, version)
+        status = {"status": "running", "requested_version": version, "version": None, "error": None,
+                  "started_at": datetime.now(), "finished_at": None}
+        with self._status_lock:
+            if self.last_reload is not None and self.last_reload["status"] == "running":
+                raise RuntimeError("Un rechargement du modèle est déjà en cours.")
+            self.last_reload = status
+
+        def run():
+            try:
+                result = {"status": "succeeded", "version": self.reload(version, activate).version}
+            except Exception as e:
+                print(f"ERREUR lors du rechargement du modèle : {e}")
+                result = {"status": "failed", "error": str(e)}
+            with self._status_lock:
+                status.update(result, finished_at=datetime.now())
+
+        threading.Thread(target=run, name="model-reload", daemon=True).start()
+        return status
+
+    # --- Surveillance du registre ---
+    def start_watching(self, interval: float):
+        """
+        Vérifie toutes les `interval` secondes la version active du registre (ou la date
+        du fichier `model_path`) et recharge le modèle quand elle change.
+        """
+        def run():
+            while not self._stop_watching.wait(interval):
+                try:
+                    signature = self._source_signature()
+                    if signature != self._signature:
+                        # Une version refusée n'est retentée qu'au prochain changement
+                        self._signature = signature
+                        print(f"Nouvelle version du modèle détectée, rechargement : {self.reload().version}")
+                except Exception as e:
+                    print(f"ERREUR lors du rechargement automatique du modèle : {e}")
+
+        self._stop_watching.clear()
+        self._watch_thread = threading.Thread(target=run, name="model-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        if self._watch_thread is not None:
+            self._stop_watching.set()
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    # --- Fonctions internes ---
+    def _source_signature(self):
+        version = active_version(self.registry_dir)
+        if version is not None:
+            return version
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _warm_up(self, scorer):
+        # Premiers appels (allocation des buffers, chargement paresseux du booster) hors des requêtes
+        X = np.zeros((1, len(scorer.feature_names)), dtype=np.float64)
+        for _ in range(self.warmup_predictions):
+            scorer.predict_proba(X)
+            scorer.predict_record({})
+
+
+def _limit_threads(model, threads: int):
+    """Fixe le nombre de threads du modèle (et des étapes d'un Pipeline) à `threads`."""
+    params = model.get_params()
+    model.set_params(**{name: threads for name in params if name.split("__")[-1] in THREAD_PARAMS})
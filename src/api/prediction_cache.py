@@ -0,0 +1,81 @@
+# src/api/prediction_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class PredictionCache:
+    """
+    Cache TTL/LRU des résultats de /predict, une entrée par client.
+
+    Une entrée n'est servie que si sa clé (empreinte du contenu des features, version
+    du modèle, seuil de décision) est identique à celle de la requête : une ligne
+    `test_data` modifiée ou un nouveau modèle invalident donc l'entrée sans action
+    explicite, et l'ancienne entrée est remplacée au calcul suivant. `clear` vide le
+    cache (ex. rechargement du modèle).
+    La valeur ne garde que l'empreinte du snapshot des features du log (voir
+    feature_snapshots.py), pas les features elles-mêmes : quelques centaines d'octets
+    par entrée.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, client_id: int, key: Hashable):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is not None and entry[0] == key and entry[1] > now:
+                self._entries.move_to_end(client_id)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[client_id]
+            self.misses += 1
+            return None
+
+    def key(self, client_id: int):
+        """Clé de l'entrée du client si elle n'a pas expiré, sans compter de hit ni de miss."""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            return entry[0] if entry is not None and entry[1] > time.monotonic() else None
+
+    def set(self, client_id: int, key: Hashable, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[client_id] = (key, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(client_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, client_id: int):
+        with self._lock:
+            self._entries.pop(client_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,205 @@
+# src/api/profiler.py
+
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Fonctions des chemins profilés par défaut : une pile n'est gardée que si elle passe
+# par l'une d'elles (les threads inactifs, en attente sur une file, sont ignorés)
+DEFAULT_FOCUS = (
+    "predict", "predict_batch", "_score_record", "_score_features", "_score_packed", "_score_batch",
+    "_authenticate_token", "generate_drift_report", "run_drift_job",
+)
+MAX_STACK_DEPTH = 128
+
+# Une frame : (fichier, première ligne de la fonction, nom), comme les clés de pstats
+Frame = Tuple[str, int, str]
+_ROOTS = sorted({os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))} |
+                {path for path in sys.path if path and os.path.isdir(path)}, key=len, reverse=True)
+
+
+def frame_label(frame: Frame) -> str:
+    """Libellé court d'une frame pour le format "collapsed" : chemin relatif et fonction."""
+    filename, _, name = frame
+    for root in _ROOTS:
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return f"{filename}:{name}".replace(";", ",").replace(" ", "_")
+
+
+class SamplingProfiler:
+    """
+    Profiler par échantillonnage, activable à chaud dans le processus de l'API.
+
+    Un thread relève toutes les `interval` secondes la pile de chaque thread
+    (`sys._current_frames`) et compte les piles identiques : le code profilé n'est
+    pas instrumenté, le coût est celui d'un parcours de piles par intervalle.
+    Une session s'arrête après `duration` secondes, après `max_requests` requêtes
+    profilées (`count_request`) ou sur `stop()`. Les résultats restent disponibles
+    jusqu'à la session suivante, au format "collapsed" (flamegraph) ou pstats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stacks: Counter = Counter()
+        self.session = 0
+        self.interval = 0.005
+        self.focus: Tuple[str, ...] = DEFAULT_FOCUS
+        self.include_drift_jobs = True
+        self.duration = None
+        self.max_requests = None
+        self.requests = 0
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._thread_ids = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Pilotage ---
+    def start(self, duration: Optional[float] = 30.0, interval: float = 0.005, max_requests: Optional[int] = None,
+              focus: Optional[Iterable[str]] = DEFAULT_FOCUS, include_drift_jobs: bool = True,
+              thread_ids: Optional[List[int]] = None) -> int:
+        """
+        Démarre une session et retourne son numéro. `focus` vide : toutes les piles.
+        `thread_ids` limite l'échantillonnage à certains threads (ex. processus d'un job).
+        """
+        with self._lock:
+            if self.active:
+                raise RuntimeError("Une session de profiling est déjà en cours.")
+            self.session += 1
+            self._stacks = Counter()
+            self.interval = interval
+            self.focus = tuple(focus or ())
+            self.include_drift_jobs = include_drift_jobs
+            self.duration, self.max_requests = duration, max_requests
+            self.requests, self.samples = 0, 0
+            self.started_at, self.stopped_at = datetime.now(), None
+            self._thread_ids = set(thread_ids) if thread_ids else None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return self.session
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def count_request(self):
+        """Appelé par les endpoints profilés : arrête la session après `max_requests` requêtes."""
+        if not self.active:
+            return
+        with self._lock:
+            self.requests += 1
+            done = self.max_requests is not None and self.requests >= self.max_requests
+        if done:
+            self._stop.set()
+
+    def merge(self, stacks: Dict[tuple, int], session: int, prefix: Optional[str] = None):
+        """Ajoute des piles relevées ailleurs (ex. processus d'un job de dérive) à la session `session`."""
+        root = ((f"<{prefix}>", 0, prefix),) if prefix else ()
+        with self._lock:
+            if session != self.session:
+                return
+            for stack, count in stacks.items():
+                self._stacks[root + tuple(stack)] += count
+
+    # --- Résultats ---
+    def status(self) -> dict:
+        with self._lock:
+            end = self.stopped_at or datetime.now()
+            return {
+                "session": self.session,
+                "active": self.active,
+                "started_at": self.started_at,
+                "elapsed_seconds": (end - self.started_at).total_seconds() if self.started_at else 0.0,
+                "interval_ms": self.interval * 1000,
+                "samples": self.samples,
+                "stacks": len(self._stacks),
+                "requests": self.requests,
+                "max_requests": self.max_requests,
+                "duration_seconds": self.duration,
+                "focus": list(self.focus),
+                "include_drift_jobs": self.include_drift_jobs,
+            }
+
+    def stacks(self) -> Dict[tuple, int]:
+        with self._lock:
+            return dict(self._stacks)
+
+    def collapsed(self) -> str:
+        """Une ligne par pile : frames de la racine à la feuille séparées par ';', puis le nombre d'échantillons."""
+        lines = [
+            f"{';'.join(frame_label(frame) for frame in stack)} {count}"
+            for stack, count in sorted(self.stacks().items(), key=lambda item: -item[1])
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def pstats_dump(self) -> bytes:
+        """
+        Statistiques au format de `pstats.Stats` (dictionnaire sérialisé par marshal) :
+        temps propre et cumulé estimés par nombre d'échantillons x intervalle, appels
+        comptés en échantillons. Lisible avec pstats, snakeviz, etc.
+        """
+        interval = self.interval
+        stats = {}
+
+        def entry(frame):
+            if frame not in stats:
+                stats[frame] = [0, 0, 0.0, 0.0, {}]
+            return stats[frame]
+
+        for stack, count in self.stacks().items():
+            elapsed = count * interval
+            leaf = entry(stack[-1])
+            leaf[2] += elapsed
+            # Une fonction récursive n'est comptée qu'une fois par pile dans le temps cumulé
+            for frame in set(stack):
+                function = entry(frame)
+                function[0] += count
+                function[1] += count
+                function[3] += elapsed
+            for caller, callee in set(zip(stack, stack[1:])):
+                callers = entry(callee)[4]
+                calls, _, own, cumulative = callers.get(caller, (0, 0, 0.0, 0.0))
+                own_elapsed = elapsed if callee == stack[-1] else 0.0
+                callers[caller] = (calls + count, calls + count, own + own_elapsed, cumulative + elapsed)
+        return marshal.dumps({frame: (cc, nc, tt, ct, callers) for frame, (cc, nc, tt, ct, callers) in stats.items()})
+
+    # --- Thread d'échantillonnage ---
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + self.duration if self.duration else None
+        focus = set(self.focus)
+        while not self._stop.wait(self.interval):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self._thread_ids is not None and thread_id not in self._thread_ids):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if focus and not any(name in focus for _, _, name in stack):
+                    continue
+                sampled.append(tuple(reversed(stack)))
+            with self._lock:
+                self.samples += 1
+                self._stacks.update(sampled)
+        with self._lock:
+            self.stopped_at = datetime.now()
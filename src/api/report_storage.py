@@ -0,0 +1,117 @@
+# src/api/report_storage.py
+
+import hashlib
+import re
+import struct
+import zlib
+from datetime import datetime
+from typing import Iterator, List
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database import models
+
+# Les blocs <script> / <style> plus gros que ce seuil sont stockés à part, par contenu :
+# le bundle JS/CSS d'Evidently, identique d'un rapport à l'autre, n'est stocké qu'une fois.
+SEGMENT_MIN_SIZE = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+_BLOCK = re.compile(rb"<(script|style)\b[^>]*>(.*?)</\1>", re.S | re.I)
+# En-tête gzip minimal (pas de nom de fichier, date à 0) et dernier bloc deflate vide
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+FINAL_BLOCK = b"\x03\x00"
+
+
+def split_html(html: bytes) -> List[bytes]:
+    """Découpe le HTML en segments : gros blocs <script>/<style> et texte entre eux."""
+    segments, position = [], 0
+    for match in _BLOCK.finditer(html):
+        start, end = match.span(2)
+        if end - start >= SEGMENT_MIN_SIZE:
+            segments += [html[position:start], html[start:end]]
+            position = end
+    segments.append(html[position:])
+    return [segment for segment in segments if segment]
+
+def deflate_segment(segment: bytes) -> bytes:
+    """
+    Compresse un segment en deflate brut terminé par un "full flush" : chaque segment
+    est indépendant et aligné sur un octet, et leur concaténation reste un flux
+    deflate valide. Un rapport se sert donc sans recompression.
+    """
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(segment) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+def compress_html(db: Session, html: str) -> dict:
+    """
+    Enregistre les segments compressés d'un HTML (sans commit) et retourne les
+    colonnes du rapport qui le décrivent : empreintes des segments, taille, CRC32, ETag.
+    """
+    content = html.encode("utf-8")
+    hashes = []
+    for segment in split_html(content):
+        segment_hash = hashlib.sha256(segment).hexdigest()
+        # Segment déjà connu (bundle Evidently) : ni recompression, ni lecture de son contenu
+        known = db.query(models.DriftReportSegment.hash).filter(models.DriftReportSegment.hash == segment_hash).first()
+        if segment_hash not in hashes and known is None:
+            db.execute(insert(models.DriftReportSegment).values(
+                hash=segment_hash, size=len(segment), deflate=deflate_segment(segment), created_at=datetime.now()
+            ).on_conflict_do_nothing(index_elements=["hash"]))
+        hashes.append(segment_hash)
+    return {"segments": hashes, "html_size": len(content), "html_crc32": zlib.crc32(content),
+            "etag": hashlib.sha256(content).hexdigest()[:32]}
+
+def store_report(db: Session, html: str) -> models.DriftReport:
+    """Enregistre un nouveau rapport compressé (sans commit)."""
+    report = models.DriftReport(report_timestamp=datetime.now(), **compress_html(db, html))
+    db.add(report)
+    db.flush()
+    return report
+
+def load_segments(db: Session, report: models.DriftReport) -> dict:
+    """Octets compressés des segments d'un rapport, par empreinte."""
+    if not report.segments:
+        return {}
+    rows = db.query(models.DriftReportSegment.hash, models.DriftReportSegment.deflate) \
+             .filter(models.DriftReportSegment.hash.in_(set(report.segments))).all()
+    return {segment_hash: bytes(deflated) for segment_hash, deflated in rows}
+
+def report_etag(report: models.DriftReport) -> str:
+    """ETag d'un rapport (calculé à la volée pour les rapports enregistrés avant la compression)."""
+    if report.etag is not None:
+        return report.etag
+    return hashlib.sha256(report.report_html.encode("utf-8")).hexdigest()[:32]
+
+def gzip_stream(report: models.DriftReport, deflated: dict) -> Iterator[bytes]:
+    """
+    Flux gzip d'un rapport : en-tête, segments stockés tels quels, bloc final et
+    CRC32 / taille du HTML calculés à l'enregistrement.
+    `deflated` associe l'empreinte de chaque segment à ses octets compressés.
+    """
+    yield GZIP_HEADER
+    for segment_hash in report.segments:
+        yield deflated[segment_hash]
+    yield FINAL_BLOCK + struct.pack("<II", report.html_crc32, report.html_size & 0xFFFFFFFF)
+
+def gzip_length(report: models.DriftReport, deflated: dict) -> int:
+    """Taille du flux gzip (en-tête Content-Length)."""
+    return len(GZIP_HEADER) + sum(len(deflated[h]) for h in report.segments) + len(FINAL_BLOCK) + 8
+
+def html_stream(report: models.DriftReport, deflated: dict) -> Iterator[bytes]:
+    """HTML décompressé segment par segment (clients qui n'acceptent pas gzip)."""
+    for segment_hash in report.segments:
+        yield zlib.decompressobj(-zlib.MAX_WBITS).decompress(deflated[segment_hash])
+
+def report_html(report: models.DriftReport, deflated: dict) -> str:
+    """HTML complet d'un rapport (rapports compressés ou enregistrés avant la compression)."""
+    if report.segments is None:
+        return report.report_html
+    return b"".join(html_stream(report, deflated)).decode("utf-8")
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Compare l'en-tête If-None-Match (liste, "*" ou ETag faible) à l'ETag du rapport."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or f'"{etag}"' in candidates
@@ -1,14 +1,22 @@
 # src/security.py
 
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import anyio
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
+from sqlalchemy import event, inspect, select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # On importe les modèles et la configuration
 from ..database import models, schemas
@@ -32,6 +40,10 @@ def get_user(db: Session, username: str):
     """Récupère un utilisateur depuis la BDD par son nom d'utilisateur."""
     return db.query(models.User).filter(models.User.username == username).first()
 
+async def get_user_async(db: AsyncSession, username: str):
+    """Équivalent asynchrone de `get_user`."""
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
 def authenticate_user(db: Session, username: str, password: str):
     """Vérifie si un utilisateur existe et si le mot de passe est correct."""
     user = get_user(db, username)
@@ -39,6 +51,131 @@ def authenticate_user(db: Session, username: str, password: str):
         return None
     return user
 
+_verify_limiter = None
+
+def _get_verify_limiter() -> anyio.CapacityLimiter:
+    # Créé à la première utilisation : un CapacityLimiter doit naître dans la boucle d'événements
+    global _verify_limiter
+    if _verify_limiter is None:
+        _verify_limiter = anyio.CapacityLimiter(settings.auth_verify_concurrency)
+    return _verify_limiter
+
+def credentials_key(username: str, password: str) -> bytes:
+    """Empreinte HMAC des identifiants : le mot de passe en clair n'est jamais conservé."""
+    message = f"{username}\0{password}".encode("utf-8")
+    return hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).digest()
+
+async def authenticate_user_async(db: Session, username: str, password: str):
+    """
+    Version non bloquante de `authenticate_user` pour les endpoints `async`.
+    La vérification bcrypt tourne dans un thread, avec au plus
+    `auth_verify_concurrency` vérifications simultanées ; les identifiants
+    récemment validés sont servis par `credential_cache` sans bcrypt.
+    """
+    key = credentials_key(username, password)
+    user = credential_cache.get(key)
+    if user is not None:
+        return user
+    user = await anyio.to_thread.run_sync(authenticate_user, db, username, password, limiter=_get_verify_limiter())
+    if user is not None:
+        credential_cache.set(key, user)
+    return user
+
+def disable_user(db: Session, username: str):
+    """Désactive un utilisateur et retire immédiatement ses identités du cache."""
+    user = get_user(db, username)
+    if user is None:
+        return None
+    user.disabled = True
+    db.commit()
+    identity_cache.invalidate_user(username)
+    credential_cache.invalidate_user(username)
+    return user
+
+# --- Cache des Identités Validées ---
+class IdentityCache:
+    """
+    Cache TTL/LRU des utilisateurs déjà validés.
+    - `identity_cache` est indexé par (sub, exp) du JWT : la signature du token est
+      toujours vérifiée, seul l'aller-retour vers la table `users` est évité, et une
+      entrée expire au plus tard avec son token.
+    - `credential_cache` est indexé par l'empreinte HMAC des identifiants de /auth :
+      une connexion répétée évite la vérification bcrypt.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, user: models.User, token_exp: Optional[float] = None):
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        # Copie détachée de toute session : l'objet est partagé entre les requêtes
+        snapshot = models.User(
+            id=user.id, username=user.username, email=user.email,
+            hashed_password=user.hashed_password, disabled=user.disabled
+        )
+        with self._lock:
+            self._entries[key] = (expires_at, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, username: str):
+        with self._lock:
+            for key in [key for key, (_, user) in self._entries.items() if user.username == username]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
+identity_cache = IdentityCache(settings.identity_cache_ttl_seconds, settings.identity_cache_max_size)
+credential_cache = IdentityCache(settings.auth_credential_cache_ttl_seconds, settings.auth_credential_cache_max_size)
+
+# Toute désactivation, suppression ou changement de mot de passe d'un utilisateur
+# via l'ORM invalide les caches de ce processus. Les objets transients (dont les
+# copies stockées dans les caches) sont ignorés : ils ne correspondent à aucune ligne.
+@event.listens_for(models.User.disabled, "set")
+def _invalidate_on_disable(target, value, oldvalue, initiator):
+    if value and inspect(target).has_identity:
+        identity_cache.invalidate_user(target.username)
+        credential_cache.invalidate_user(target.username)
+
+@event.listens_for(models.User.hashed_password, "set")
+def _invalidate_on_password_change(target, value, oldvalue, initiator):
+    if inspect(target).has_identity:
+        credential_cache.invalidate_user(target.username)
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    identity_cache.invalidate_user(target.username)
+    credential_cache.invalidate_user(target.username)
+
 # --- Fonctions de Gestion du Token JWT ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crée un nouveau token JWT."""
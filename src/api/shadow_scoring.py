@@ -0,0 +1,239 @@
+# src/api/shadow_scoring.py
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import insert
+
+from src.api.batch_writer import BatchWriter
+from src.api.model_registry import LoadedModel, ModelManager, read_challenger, read_metadata, write_challenger
+from src.database import models
+
+
+class ShadowScorer(BatchWriter):
+    """
+    Score en arrière-plan une part du trafic de /predict avec un modèle challenger.
+
+    `submit_sample` tire la requête au sort (probabilité `sample_rate`) et dépose ses
+    features et la probabilité du modèle servi (champion) dans une file bornée, sans
+    attente si elle est pleine : la réponse ne subit aucune latence supplémentaire.
+    Le thread d'écriture score chaque lot avec le challenger (une matrice, un seul appel
+    à `predict_proba`) et insère les deux probabilités dans `shadow_predictions`.
+    Pour comparer les latences dans les mêmes conditions, le champion est chronométré
+    sur le même lot et depuis les mêmes features, avec une copie limitée comme le
+    challenger à un thread (fournie par `reference_loader`, une fois par version) ; le
+    temps enregistré pour chaque prédiction est celui du lot divisé par sa taille.
+    Sans `reference_loader`, le champion servi est chronométré tel quel.
+    """
+
+    thread_name = "shadow-scorer"
+
+    def __init__(self, engine, decision_threshold: float, sample_rate: float = 0.1, max_queue_size: int = 10000,
+                 batch_size: int = 256, flush_interval: float = 1.0, seed: Optional[int] = None,
+                 reference_loader: Optional[Callable[[LoadedModel], LoadedModel]] = None):
+        super().__init__(max_queue_size=max_queue_size, batch_size=batch_size, flush_interval=flush_interval)
+        self.engine = engine
+        self.decision_threshold = decision_threshold
+        self.sample_rate = sample_rate
+        self.reference_loader = reference_loader
+        self.challenger: Optional[LoadedModel] = None
+        self._random = random.Random(seed)
+        # Copie du champion chronométrée par le thread d'écriture, et version dont elle est la copie
+        self._reference: Optional[LoadedModel] = None
+        self._reference_of: Optional[LoadedModel] = None
+
+    def set_challenger(self, challenger: Optional[LoadedModel], sample_rate: Optional[float] = None):
+        """Remplace (ou retire, avec None) le challenger ; les prédictions déjà en file gardent le leur."""
+        if sample_rate is not None:
+            if not 0 <= sample_rate <= 1:
+                raise ValueError("La part du trafic scorée par le challenger doit être comprise entre 0 et 1.")
+            self.sample_rate = sample_rate
+        self.challenger = challenger
+
+    def submit_sample(self, champion: LoadedModel, client_id: int, record: dict, champion_proba: float) -> bool:
+        """Dépose la prédiction si elle est tirée au sort. Retourne True si elle sera scorée par le challenger."""
+        challenger = self.challenger
+        if challenger is None or self._random.random() >= self.sample_rate:
+            return False
+        return self._enqueue({
+            "request_timestamp": datetime.now(),
+            "client_id": client_id,
+            "record": record,
+            "champion": champion,
+            "challenger": challenger,
+            "champion_proba": champion_proba,
+        })
+
+    # --- Côté thread d'écriture ---
+    def _write(self, rows: List[dict]):
+        if not rows:
+            return
+        try:
+            groups = defaultdict(list)
+            for row in rows:
+                groups[row["champion"], row["challenger"]].append(row)
+            prepared = []
+            for (champion, challenger), group in groups.items():
+                prepared.extend(self._score(champion, challenger, group))
+            with self.engine.begin() as connection:
+                connection.execute(insert(models.ShadowPrediction), prepared)
+            with self._lock:
+                self.flushed += len(rows)
+        except Exception as e:
+            print(f"ERREUR lors du scoring challenger de {len(rows)} prédictions : {e}")
+            with self._lock:
+                self.failed += len(rows)
+
+    def _score(self, champion: LoadedModel, challenger: LoadedModel, rows: List[dict]) -> List[dict]:
+        records = [row["record"] for row in rows]
+        challenger_probas, challenger_ms = _score_batch(challenger, records)
+        # Probabilités du champion déjà connues : ce passage ne sert qu'à comparer les temps
+        _, champion_ms = _score_batch(self._reference_model(champion), records)
+        return [
+            {
+                "request_timestamp": row["request_timestamp"],
+                "client_id": row["client_id"],
+                "champion_version": champion.version,
+                "challenger_version": challenger.version,
+                "champion_proba": row["champion_proba"],
+                "challenger_proba": float(challenger_proba),
+                "champion_decision": self._decision(row["champion_proba"]),
+                "challenger_decision": self._decision(challenger_proba),
+                "champion_time_ms": champion_ms,
+                "challenger_time_ms": challenger_ms,
+            }
+            for row, challenger_proba in zip(rows, challenger_probas)
+        ]
+
+    def _reference_model(self, champion: LoadedModel) -> LoadedModel:
+        if self.reference_loader is None:
+            return champion
+        if self._reference_of is not champion:
+            self._reference = self.reference_loader(champion)
+            self._reference_of = champion
+        return self._reference
+
+    def _decision(self, proba: float) -> str:
+        return "Crédit Accordé" if proba < self.decision_threshold else "Crédit Refusé"
+
+
+def _score_batch(model: LoadedModel, records: List[dict]):
+    """Probabilités d'un lot de features et temps par prédiction (ms) : temps du lot divisé par sa taille."""
+    start = time.perf_counter()
+    probas = model.scorer.predict_proba(model.scorer.build_matrix(records))
+    return probas, (time.perf_counter() - start) * 1000 / len(records)
+
+
+class ChallengerManager:
+    """
+    Challenger du ShadowScorer, commun à tous les workers.
+
+    Le réglage (version et part du trafic) est écrit dans le fichier CHALLENGER du
+    registre ; chaque worker le relit toutes les `interval` secondes et charge la
+    version demandée dans son thread de surveillance, sans bloquer les requêtes.
+    Tant qu'il n'a jamais été réglé, CHALLENGER_MODEL et CHALLENGER_SAMPLE_RATE
+    s'appliquent. Sans dossier de registre, un réglage ne vaut que pour ce processus.
+    """
+
+    def __init__(self, scorer: ShadowScorer, models: ModelManager, default_version: str, default_sample_rate: float):
+        self.scorer = scorer
+        self.models = models
+        self.registry_dir = models.registry_dir
+        self.default = {"version": default_version, "sample_rate": default_sample_rate}
+        self.applied: Optional[dict] = None
+        self.last_change: Optional[dict] = None
+        self._local: Optional[dict] = None
+        self._seen: Optional[dict] = None
+        self._apply_lock = threading.Lock()
+        # Protège la vérification / le lancement d'un changement en arrière-plan
+        self._status_lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._watch_thread = None
+
+    def requested(self) -> dict:
+        """Réglage demandé : fichier CHALLENGER du registre, sinon dernier réglage local ou par défaut."""
+        return read_challenger(self.registry_dir) or self._local or self.default
+
+    def apply(self, config: Optional[dict] = None):
+        """Charge (avec un seul thread) la version demandée si elle a changé, puis règle le ShadowScorer."""
+        with self._apply_lock:
+            config = config or self.requested()
+            if config == self.applied:
+                return
+            challenger = self.scorer.challenger
+            if self.applied is None or config["version"] != self.applied["version"]:
+                challenger = self.models.load(config["version"], max_threads=1) if config["version"] else None
+            self.scorer.set_challenger(challenger, config["sample_rate"])
+            self.applied = config
+
+    def configure_in_background(self, version: Optional[str] = None, sample_rate: Optional[float] = None) -> dict:
+        """
+        Écrit le réglage dans le registre et l'applique à ce processus dans un thread ; retourne
+        son statut. Sans `version` (ou `sample_rate`), la valeur demandée actuellement est gardée ;
+        une version vide retire le challenger. ValueError si la version est inconnue ou la part
+        invalide, RuntimeError si un changement est en cours.
+        """
+        current = self.requested()
+        config = {
+            "version": current["version"] if version is None else version,
+            "sample_rate": current["sample_rate"] if sample_rate is None else sample_rate,
+        }
+        if not 0 <= config["sample_rate"] <= 1:
+            raise ValueError("La part du trafic scorée par le challenger doit être comprise entre 0 et 1.")
+        if version:
+            read_metadata(self.registry_dir, version)
+        status = {"status": "running", "requested_version": config["version"], "sample_rate": config["sample_rate"],
+                  "error": None, "started_at": datetime.now(), "finished_at": None}
+        with self._status_lock:
+            if self.last_change is not None and self.last_change["status"] == "running":
+                raise RuntimeError("Un changement de challenger est déjà en cours.")
+            self.last_change = status
+
+        def run():
+            try:
+                if self.registry_dir and os.path.isdir(self.registry_dir):
+                    write_challenger(self.registry_dir, config["version"], config["sample_rate"])
+                else:
+                    self._local = config
+                self._seen = config
+                self.apply(config)
+                result = {"status": "succeeded"}
+            except Exception as e:
+                print(f"ERREUR lors du changement de challenger : {e}")
+                result = {"status": "failed", "error": str(e)}
+            with self._status_lock:
+                status.update(result, finished_at=datetime.now())
+
+        threading.Thread(target=run, name="challenger-load", daemon=True).start()
+        return status
+
+    # --- Surveillance du registre ---
+    def start_watching(self, interval: float):
+        """Relit toutes les `interval` secondes le réglage du registre et l'applique quand il change."""
+        def run():
+            while not self._stop_watching.wait(interval):
+                try:
+                    config = self.requested()
+                    if config != self._seen:
+                        # Un réglage refusé n'est retenté qu'au prochain changement
+                        self._seen = config
+                        self.apply(config)
+                        print(f"Nouveau challenger appliqué : {config['version'] or 'aucun'} ({config['sample_rate']:.0%} du trafic)")
+                except Exception as e:
+                    print(f"ERREUR lors du changement automatique de challenger : {e}")
+
+        self._seen = self.applied
+        self._stop_watching.clear()
+        self._watch_thread = threading.Thread(target=run, name="challenger-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        if self._watch_thread is not None:
+            self._stop_watching.set()
+            self._watch_thread.join()
+            self._watch_thread = None
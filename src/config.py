@@ -17,6 +17,12 @@ class Settings(BaseSettings):
     db_name: str
     # Nouvelle variable pour contrôler le mode SSL (optionnelle)
     db_ssl_mode: Optional[str] = None
+    # Pool de connexions (partagé par les moteurs synchrone et asynchrone)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle_seconds: int = 1800
+    # Taille du cache de requêtes préparées d'asyncpg (0 pour PgBouncer en mode transaction)
+    db_statement_cache_size: int = 100
     
     # --- Sécurité JWT & API ---
     api_url: str
@@ -25,11 +31,133 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    # Durée de vie du cache des identités validées (0 = désactivé) et nombre maximum d'entrées
+    identity_cache_ttl_seconds: float = 60
+    identity_cache_max_size: int = 10000
+    # Nombre maximum de vérifications bcrypt simultanées lors des connexions (/auth)
+    auth_verify_concurrency: int = 4
+    # Cache optionnel des connexions réussies, indexé par une empreinte HMAC des identifiants (0 = désactivé)
+    auth_credential_cache_ttl_seconds: float = 0
+    auth_credential_cache_max_size: int = 1000
     
     # --- Modèle & Métier ---
     decision_threshold: float
     model_path: str
+    # Moteur d'inférence : "numpy" (chemin rapide sans pandas) ou "pipeline" (Pipeline scikit-learn)
+    inference_engine: str = "numpy"
+    # Registre des versions du modèle (écrit par src/train.py) : la version nommée dans
+    # <registre>/ACTIVE est servie ; sans registre (dossier absent ou vide), MODEL_PATH l'est
+    model_registry_dir: str = "model_artifacts/registry"
+    # Vérification de la version active (ou de la date de MODEL_PATH) et rechargement à chaud (0 = désactivé)
+    model_reload_poll_seconds: float = 0
+    # Prédictions factices lancées sur une nouvelle version avant de la servir
+    model_warmup_predictions: int = 5
+
+    # --- Cache des Prédictions (/predict) ---
+    # Résultat réutilisé tant que les features du client, le modèle et le seuil sont inchangés
+    # (0 = désactivé) ; chaque entrée ne garde que l'empreinte du snapshot des features du log
+    prediction_cache_ttl_seconds: float = 300
+    prediction_cache_max_size: int = 1000
+
+    # --- Modèle Challenger (scoring fantôme) ---
+    # Version du registre (ou chemin d'un fichier .joblib) scorée en arrière-plan sur une part
+    # du trafic de /predict (vide = désactivé), sans effet sur la réponse du modèle servi
+    challenger_model: str = ""
+    challenger_sample_rate: float = 0.1
+    challenger_queue_max_size: int = 10000
+    challenger_batch_size: int = 256
+    challenger_flush_interval_seconds: float = 1.0
+    # Relecture du challenger demandé à tous les workers (fichier CHALLENGER du registre, réglé
+    # par POST /admin/shadow ; 0 = le réglage ne s'applique qu'au processus qui le reçoit)
+    challenger_poll_seconds: float = 10
+
+    # --- Prédiction par Lot ---
+    # Nombre maximum d'ID acceptés par appel à /predict/batch
+    batch_max_size: int = 100000
+    # Taille des paquets d'ID envoyés dans chaque requête SQL `IN (...)`
+    batch_query_chunk_size: int = 10000
+
+    # --- Consultation des Logs (/api-logs) ---
+    # Nombre maximum de logs par page (la suite se lit avec le curseur X-Next-Cursor)
+    api_logs_max_page_size: int = 1000
+    # Nombre maximum de tranches de temps renvoyées par /api-logs/stats
+    api_logs_stats_max_buckets: int = 500
+
+    # --- Partitionnement et Rétention des Logs ---
+    # Une partition de `api_logs` par "day" ou par "month", créées `api_logs_partitions_ahead` périodes à l'avance
+    api_logs_partition_interval: str = "month"
+    api_logs_partitions_ahead: int = 2
+    # Partitions plus anciennes supprimées (0 = conservation illimitée), archivées en Parquet si un dossier est donné
+    api_logs_retention_days: int = 0
+    api_logs_archive_dir: str = ""
+    api_logs_maintenance_interval_seconds: float = 3600
+
+    # --- Stockage des Features en BDD ---
+    # "json" : colonne `data` (JSON) ; "packed" : vecteur float64 binaire `features`
+    # (rempli par init_db ou src/scripts/migrate_features.py), décodé avec np.frombuffer
+    feature_storage: str = "json"
+
+    # --- Feature Store en Mémoire ---
+    # Si activé, /predict et /clients lisent les features en mémoire au lieu de la BDD
+    feature_store_enabled: bool = False
+    # Intervalle du rafraîchissement incrémental automatique (0 = désactivé)
+    feature_store_refresh_interval_seconds: float = 0
+
+    # --- Dérive Incrémentale (histogrammes par feature) ---
+    # Les logs écrits alimentent des histogrammes horaires ; /drift-sketch calcule PSI/KS/JS
+    drift_sketch_enabled: bool = True
+    drift_sketch_bins: int = 20
+    # Nombre de lignes de `training_data` résumées dans la référence
+    drift_sketch_reference_size: int = 10000
+    drift_sketch_persist_interval_seconds: float = 10.0
+    # Une feature est considérée en dérive au-delà de ce PSI
+    drift_psi_threshold: float = 0.2
+
+    # --- Rapports de Dérive Evidently (jobs en arrière-plan) ---
+    # Nombre maximum de rapports calculés en même temps (processus dédiés)
+    drift_job_max_concurrency: int = 1
+    # Chaque processus de l'API renouvelle le bail de ses jobs ; un job dont le bail
+    # a expiré (processus arrêté ou bloqué) est marqué en échec par les autres
+    drift_job_heartbeat_seconds: float = 30.0
+    drift_job_lease_seconds: float = 120.0
+    # Échantillonnage par défaut (lignes par côté, "reservoir", "stratified" ou "time_bucket")
+    drift_report_sample_size: int = 10000
+    drift_report_max_sample_size: int = 100000
+    drift_report_sampling: str = "reservoir"
+    # Largeur des tranches de temps de l'échantillonnage "time_bucket"
+    drift_report_bucket_minutes: int = 60
+
+    # --- Écriture des Logs en Arrière-Plan ---
+    log_queue_max_size: int = 10000
+    log_flush_batch_size: int = 500
+    log_flush_interval_seconds: float = 1.0
+    # "drop" : un log est abandonné si la file est pleine ; "block" : on attend au plus
+    # `log_queue_block_timeout_seconds` avant de l'abandonner (dans le pool de threads, sans
+    # bloquer la boucle d'événements : seule la requête qui écrit le log attend)
+    log_queue_full_policy: str = "drop"
+    log_queue_block_timeout_seconds: float = 0.05
+    # Features des logs écrites une fois dans `feature_snapshots` et référencées par empreinte
+    # (false : copie complète dans `api_logs.input_data`, comme avant ; les prédictions servies
+    # par le cache sont alors journalisées sans features et exclues de la dérive)
+    log_feature_snapshots: bool = True
+    # Nombre d'empreintes de snapshots mémorisées par processus (snapshots non renvoyés à la BDD)
+    log_feature_snapshot_cache_size: int = 100000
     
+    # --- Métriques Prometheus (/metrics) ---
+    metrics_enabled: bool = True
+
+    # --- Profiling à chaud (/admin/profiler) ---
+    # Utilisateurs autorisés sur les endpoints /admin, séparés par des virgules
+    # (vide : seul l'utilisateur API_USER)
+    admin_users: str = ""
+    profiler_interval_ms: float = 5.0
+    profiler_max_duration_seconds: float = 300.0
+
+    @property
+    def admin_usernames(self) -> set:
+        names = {name.strip() for name in self.admin_users.split(",") if name.strip()}
+        return names or ({self.api_user} if self.api_user else set())
+
     # --- Chemins vers les données (optionnels) ---
     train_data_file: Optional[str] = None
     test_data_file: Optional[str] = None
@@ -46,6 +174,19 @@ class Settings(BaseSettings):
             
         return url
 
+    @property
+    def async_database_url(self) -> str:
+        """Génère l'URL de connexion asynchrone (driver asyncpg)."""
+        encoded_password = urllib.parse.quote_plus(self.db_password)
+        url = f"postgresql+asyncpg://{self.db_user}:{encoded_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+        url += f"?prepared_statement_cache_size={self.db_statement_cache_size}"
+
+        # asyncpg attend le paramètre `ssl` (mêmes valeurs que `sslmode`)
+        if self.db_ssl_mode:
+            url += f"&ssl={self.db_ssl_mode}"
+
+        return url
+
     # Configuration pour Pydantic V2
     model_config = SettingsConfigDict(
         env_file=".env",
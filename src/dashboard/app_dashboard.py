@@ -6,7 +6,8 @@ import numpy as np
 import requests
 import warnings
 import json
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+import time as time_module
 import os
 import sys
 
@@ -35,22 +36,51 @@ def get_client_ids():
         st.error(f"Erreur de connexion lors de la récupération des ID clients : {e}")
         return []
 
+# Taille des pages lues sur /api-logs et plafond de l'historique complet
+LOG_PAGE_SIZE = 1000
+LOG_HISTORY_MAX_ROWS = 50000
+
 @st.cache_data(ttl=30)
-def get_api_logs(limit: int = 100):
-    """Récupère les logs de l'API avec une limite."""
+def get_api_logs(limit: int = 100, start=None, end=None):
+    """
+    Récupère au plus `limit` logs de l'API (du plus récent au plus ancien, sans le
+    JSON des features), page par page avec le curseur renvoyé par l'API.
+    """
     try:
         headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-        url = f"{settings.api_url}/api-logs?limit={limit}"
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return pd.DataFrame(response.json())
-        else:
-            st.error(f"Erreur lors de la récupération des logs : {response.status_code} - {response.text}")
-            return pd.DataFrame()
+        params = {key: value.isoformat() for key, value in (("start", start), ("end", end)) if value is not None}
+        logs = []
+        while len(logs) < limit:
+            params["limit"] = min(LOG_PAGE_SIZE, limit - len(logs))
+            response = requests.get(f"{settings.api_url}/api-logs", headers=headers, params=params)
+            if response.status_code != 200:
+                st.error(f"Erreur lors de la récupération des logs : {response.status_code} - {response.text}")
+                break
+            logs += response.json()
+            params["cursor"] = response.headers.get("X-Next-Cursor")
+            if not params["cursor"]:
+                break
+        return pd.DataFrame(logs)
     except Exception as e:
         st.error(f"Erreur de connexion lors de la récupération des logs : {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=30)
+def get_api_logs_stats(start=None, end=None, bucket=None):
+    """Statistiques agrégées des logs (latence, volume, erreurs, décisions) calculées par l'API."""
+    try:
+        headers = {"Authorization": f"Bearer {st.session_state['token']}"}
+        params = {key: value for key, value in (("start", start), ("end", end), ("bucket", bucket)) if value is not None}
+        params = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in params.items()}
+        response = requests.get(f"{settings.api_url}/api-logs/stats", headers=headers, params=params)
+        if response.status_code == 200:
+            return response.json()
+        st.error(f"Erreur lors du calcul des statistiques : {response.status_code} - {response.text}")
+        return None
+    except Exception as e:
+        st.error(f"Erreur de connexion lors du calcul des statistiques : {e}")
+        return None
+
 @st.cache_data(ttl=30)
 def get_drift_reports_list():
     """Récupère la liste des rapports de dérive disponibles."""
@@ -66,14 +96,27 @@ def get_drift_reports_list():
         st.error(f"Erreur de connexion lors de la récupération de la liste des rapports : {e}")
         return []
 
-@st.cache_data(ttl=3600)
+@st.cache_resource
+def get_drift_report_cache():
+    """Rapports déjà téléchargés (ETag, HTML), partagés entre les sessions du dashboard."""
+    return {}
+
 def get_drift_report_detail(report_id):
-    """Récupère le contenu HTML d'un rapport de dérive spécifique."""
+    """
+    Récupère le contenu HTML d'un rapport de dérive spécifique. Le rapport arrive
+    compressé (gzip) et n'est retéléchargé que si son ETag a changé.
+    """
+    cache = get_drift_report_cache()
     try:
         headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-        response = requests.get(f"{settings.api_url}/drift-reports/{report_id}", headers=headers)
+        if report_id in cache:
+            headers["If-None-Match"] = cache[report_id][0]
+        response = requests.get(f"{settings.api_url}/drift-reports/{report_id}/html", headers=headers)
+        if response.status_code == 304:
+            return cache[report_id][1]
         if response.status_code == 200:
-            return response.json()['report_html']
+            cache[report_id] = (response.headers.get("ETag"), response.text)
+            return response.text
         else:
             st.error(f"Erreur lors de la récupération du rapport #{report_id} : {response.status_code} - {response.text}")
             return None
@@ -81,20 +124,53 @@ def get_drift_report_detail(report_id):
         st.error(f"Erreur de connexion lors de la récupération du rapport #{report_id} : {e}")
         return None
 
-def trigger_drift_report_generation():
-    """Déclenche la génération d'un nouveau rapport de dérive via l'API."""
-    with st.spinner("Génération du rapport en cours..."):
-        try:
-            headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-            response = requests.post(f"{settings.api_url}/drift-reports", headers=headers)
-            if response.status_code == 201:
-                st.success("Rapport de dérive généré avec succès ! Le cache va être vidé pour rafraîchir la liste.")
-                st.cache_data.clear()
-                st.rerun()
-            else:
-                st.error(f"Échec de la génération du rapport : {response.status_code} - {response.text}")
-        except Exception as e:
-            st.error(f"Erreur de connexion lors de la génération du rapport : {e}")
+def get_drift_job(job_id):
+    """Récupère le statut d'un job de génération de rapport de dérive."""
+    try:
+        headers = {"Authorization": f"Bearer {st.session_state['token']}"}
+        response = requests.get(f"{settings.api_url}/drift-reports/jobs/{job_id}", headers=headers)
+        if response.status_code == 200:
+            return response.json()
+        st.error(f"Erreur lors du suivi du job #{job_id} : {response.status_code} - {response.text}")
+        return None
+    except Exception as e:
+        st.error(f"Erreur de connexion lors du suivi du job #{job_id} : {e}")
+        return None
+
+def trigger_drift_report_generation(parameters=None, poll_interval: float = 2.0, timeout: float = 1800):
+    """
+    Lance la génération d'un rapport de dérive via l'API, puis suit son avancement :
+    l'API répond immédiatement, le calcul se fait en arrière-plan.
+    `parameters` : fenêtre de temps et échantillonnage (voir POST /drift-reports).
+    """
+    try:
+        headers = {"Authorization": f"Bearer {st.session_state['token']}"}
+        response = requests.post(f"{settings.api_url}/drift-reports", headers=headers, json=parameters)
+    except Exception as e:
+        st.error(f"Erreur de connexion lors de la génération du rapport : {e}")
+        return
+    if response.status_code != 202:
+        st.error(f"Échec de la génération du rapport : {response.status_code} - {response.text}")
+        return
+
+    job = response.json()
+    progress_bar = st.progress(0, text="Génération du rapport en attente...")
+    deadline = time_module.monotonic() + timeout
+    while job["status"] in ("pending", "running") and time_module.monotonic() < deadline:
+        time_module.sleep(poll_interval)
+        job = get_drift_job(job["id"])
+        if job is None:
+            return
+        progress_bar.progress(job["progress"] / 100, text=f"{job['step'] or 'En cours'} ({job['progress']} %)")
+
+    if job["status"] == "succeeded":
+        st.success("Rapport de dérive généré avec succès ! Le cache va être vidé pour rafraîchir la liste.")
+        st.cache_data.clear()
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"Échec de la génération du rapport : {job['error']}")
+    else:
+        st.warning(f"Le rapport est toujours en cours de génération (job #{job['id']}). Revenez plus tard.")
 
 
 # --- Fonctions d'Authentification ---
@@ -167,41 +243,70 @@ else:
     with tab2:
         st.header("Monitoring de Performance de l'API")
 
-        if st.checkbox("Charger l'historique complet des logs"):
-            logs_df = get_api_logs(limit=0)
-        else:
-            st.info("Affichage des 100 derniers logs. Cochez la case ci-dessus pour voir l'historique complet.")
-            logs_df = get_api_logs()
-
-        if not logs_df.empty:
-            logs_df['request_timestamp'] = pd.to_datetime(logs_df['request_timestamp']).dt.tz_localize(None)
-            st.subheader("Filtres")
-            min_date, max_date = logs_df['request_timestamp'].min().date(), logs_df['request_timestamp'].max().date()
-            start_date = st.date_input("Date de début", min_date, min_value=min_date, max_value=max_date)
-            end_date = st.date_input("Date de fin", max_date, min_value=start_date, max_value=max_date)
-            start_datetime, end_datetime = datetime.combine(start_date, time.min), datetime.combine(end_date, time.max)
-            filtered_logs = logs_df[(logs_df['request_timestamp'] >= start_datetime) & (logs_df['request_timestamp'] <= end_datetime)]
-            st.divider()
-            if not filtered_logs.empty:
-                st.subheader("Statistiques sur la période")
-                col1, col2, col3 = st.columns(3)
-                col1.metric("Nombre de requêtes", len(filtered_logs))
-                col2.metric("Temps d'inférence moyen", f"{filtered_logs['inference_time_ms'].mean():.2f} ms")
-                col3.metric("Taux de succès", f"{(filtered_logs['http_status_code'] == 200).mean():.2%}")
-                st.subheader("Évolution des temps d'inférence")
-                st.line_chart(filtered_logs.set_index('request_timestamp')['inference_time_ms'])
-                st.subheader("Détail des appels")
-                st.dataframe(filtered_logs, use_container_width=True)
+        # Statistiques calculées par l'API : quelques centaines de lignes agrégées, même sur plusieurs mois
+        st.subheader("Filtres")
+        col1, col2, col3 = st.columns(3)
+        start_date = col1.date_input("Date de début", datetime.now().date() - timedelta(days=7))
+        end_date = col2.date_input("Date de fin", datetime.now().date(), min_value=start_date)
+        granularities = {None: "Automatique", "minute": "Minute", "hour": "Heure", "day": "Jour", "week": "Semaine"}
+        bucket = col3.selectbox("Granularité", options=list(granularities), format_func=granularities.get)
+        start_datetime = datetime.combine(start_date, time.min)
+        end_datetime = datetime.combine(end_date + timedelta(days=1), time.min)
+        stats = get_api_logs_stats(start_datetime, end_datetime, bucket)
+        st.divider()
+
+        if stats and stats["requests"]:
+            st.subheader("Statistiques sur la période")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Nombre de requêtes", stats["requests"])
+            col2.metric("Temps d'inférence p50", f"{stats['p50_ms']:.2f} ms")
+            col3.metric("Temps d'inférence p95 / p99", f"{stats['p95_ms']:.1f} / {stats['p99_ms']:.1f} ms")
+            col4.metric("Taux de succès", f"{1 - stats['error_rate']:.2%}")
+
+            buckets_df = pd.DataFrame(stats["buckets"])
+            buckets_df["bucket_start"] = pd.to_datetime(buckets_df["bucket_start"])
+            buckets_df = buckets_df.set_index("bucket_start")
+            st.subheader(f"Évolution des temps d'inférence (par {granularities[stats['bucket']].lower()})")
+            st.line_chart(buckets_df[["p50_ms", "p95_ms", "p99_ms"]])
+            st.subheader("Débit et erreurs")
+            st.bar_chart(buckets_df[["requests", "errors"]])
+            st.subheader("Répartition des décisions")
+            decisions_df = pd.DataFrame(list(buckets_df["decisions"]), index=buckets_df.index).fillna(0)
+            st.bar_chart(decisions_df)
+
+            st.subheader("Détail des appels")
+            if st.checkbox("Charger l'historique complet des logs"):
+                logs_df = get_api_logs(limit=LOG_HISTORY_MAX_ROWS, start=start_datetime, end=end_datetime)
+                if len(logs_df) >= LOG_HISTORY_MAX_ROWS:
+                    st.warning(f"Seuls les {LOG_HISTORY_MAX_ROWS} logs les plus récents de la période sont chargés.")
             else:
-                st.info("Aucune donnée disponible pour la période sélectionnée.")
-        else:
-            st.info("Aucun log de performance disponible pour le moment.")
+                st.info("Affichage des 100 derniers logs de la période. Cochez la case ci-dessus pour voir l'historique complet.")
+                logs_df = get_api_logs(start=start_datetime, end=end_datetime)
+            st.dataframe(logs_df, use_container_width=True)
+        elif stats:
+            st.info("Aucune donnée disponible pour la période sélectionnée.")
 
     # --- Onglet 3: Analyse de Dérive ---
     with tab3:
         st.header("Analyse de la Dérive des Données (Data Drift)")
+        with st.expander("Paramètres du rapport"):
+            col1, col2 = st.columns(2)
+            window_days = col1.number_input("Période analysée (jours, 0 = tous les logs)", min_value=0, value=0)
+            sample_size = col2.number_input(
+                "Taille d'échantillon (par côté)", min_value=100, max_value=settings.drift_report_max_sample_size,
+                value=settings.drift_report_sample_size, step=1000
+            )
+            sampling_labels = {
+                "reservoir": "Aléatoire uniforme",
+                "stratified": "Référence stratifiée par TARGET",
+                "time_bucket": "Logs répartis par tranche horaire",
+            }
+            sampling = st.selectbox("Méthode d'échantillonnage", options=list(sampling_labels), format_func=sampling_labels.get)
         if st.button("Générer un nouveau Rapport de Dérive", type="secondary"):
-            trigger_drift_report_generation()
+            parameters = {"sample_size": int(sample_size), "sampling": sampling}
+            if window_days:
+                parameters["start"] = (datetime.now() - timedelta(days=int(window_days))).isoformat()
+            trigger_drift_report_generation(parameters)
         st.divider()
         reports = get_drift_reports_list()
         if reports:
@@ -2,6 +2,7 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 # On importe notre objet de configuration centralisé
 from ..config import settings
@@ -11,15 +12,31 @@ from ..config import settings
 # `pool_pre_ping=True` vérifie les connexions avant de les utiliser.
 engine = create_engine(
     settings.database_url, 
-    pool_pre_ping=True
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle_seconds
 )
 
 # 2. Création de la Fabrique de Sessions
 # Chaque instance de SessionLocal sera une session de base de données.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 3. Engine et Sessions asynchrones (asyncpg)
+# Utilisés par les endpoints `async` de l'API ; le moteur synchrone reste
+# utilisé par les scripts (init_db) et les threads d'arrière-plan.
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    connect_args={"statement_cache_size": settings.db_statement_cache_size}
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
-# 3. Fonction de Dépendance pour FastAPI
+# 4. Fonctions de Dépendance pour FastAPI
 def get_db():
     """
     Cette fonction est un "générateur" qui sera utilisé par FastAPI.
@@ -30,4 +47,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Équivalent asynchrone de `get_db` pour les endpoints `async def`."""
+    async with AsyncSessionLocal() as db:
+        yield db
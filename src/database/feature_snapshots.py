@@ -0,0 +1,113 @@
+# src/database/feature_snapshots.py
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database import models
+
+
+def snapshot_hash(data: dict) -> str:
+    """
+    Empreinte MD5 du JSON des features d'un log. Les clés ne sont pas triées (le tri
+    double le coût du calcul) : l'ordre est fixe pour une même source de features, et
+    deux ordres différents ne donnent au pire qu'un snapshot en double.
+    """
+    return hashlib.md5(json.dumps(data, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+def snapshot_query(hashes: Iterable[str]):
+    """(empreinte, features) des snapshots demandés."""
+    return select(models.FeatureSnapshot.hash, models.FeatureSnapshot.data) \
+        .where(models.FeatureSnapshot.hash.in_(list(hashes)))
+
+def load_snapshots(db, hashes: Iterable[str]) -> Dict[str, dict]:
+    """Features des snapshots référencés, en une requête (chaque snapshot n'est lu qu'une fois)."""
+    hashes = set(hashes)
+    if not hashes:
+        return {}
+    return dict(db.execute(snapshot_query(hashes)).all())
+
+
+class FeatureSnapshotStore:
+    """
+    Remplace les features des logs par une référence à `feature_snapshots`.
+
+    Au lieu de recopier les centaines de features du client dans chaque log, le writer
+    écrit une fois le snapshot (clé : empreinte du JSON) et le log n'en garde que
+    l'empreinte (`feature_hash`). Les empreintes déjà écrites sont mémorisées (LRU
+    borné à `max_known`) : les prédictions répétées pour un même client n'envoient
+    plus leurs features à la BDD. Une empreinte mémorisée depuis plus de `known_ttl`
+    secondes est réécrite (sans effet si le snapshot existe), au cas où la rétention
+    des logs l'aurait supprimé entre-temps.
+    """
+
+    def __init__(self, max_known: int = 100000, known_ttl: float = 3600.0):
+        self.max_known = max_known
+        self.known_ttl = known_ttl
+        self._known = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prepare(self, connection, rows: List[dict]) -> Tuple[List[dict], List[str]]:
+        """
+        Écrit les snapshots inconnus (dans la transaction de `connection`) et retourne les
+        logs à insérer, avec `feature_hash` à la place de `input_data`, ainsi que les
+        empreintes écrites (ou trouvées en BDD), à passer à `remember` une fois la
+        transaction validée.
+        Un log déjà réduit à son empreinte (prédiction servie par le cache) ne garde sa
+        référence que si le snapshot est confirmé écrit : mémorisé, écrit dans ce lot ou
+        présent en BDD (le log du calcul a pu échouer).
+        """
+        prepared, new_snapshots, references = [], {}, set()
+        expired = time.monotonic() - self.known_ttl
+        with self._lock:
+            for row in rows:
+                data = row.get("input_data")
+                if data is None:
+                    # Log sans features (erreur) ou déjà réduit à son empreinte (prédiction en cache)
+                    digest = row.get("feature_hash")
+                    known_at = self._known.get(digest)
+                    if digest is not None and (known_at is None or known_at < expired):
+                        references.add(digest)
+                    prepared.append({**row, "feature_hash": digest})
+                    continue
+                # Empreinte déjà calculée par l'API quand le résultat a été mis en cache
+                digest = row.get("feature_hash") or snapshot_hash(data)
+                known_at = self._known.get(digest)
+                if known_at is None or known_at < expired:
+                    new_snapshots[digest] = data
+                else:
+                    self._known.move_to_end(digest)
+                prepared.append({**row, "input_data": None, "feature_hash": digest})
+        if new_snapshots:
+            now = datetime.now()
+            connection.execute(
+                insert(models.FeatureSnapshot).on_conflict_do_nothing(index_elements=["hash"]),
+                [{"hash": digest, "data": data, "created_at": now} for digest, data in new_snapshots.items()]
+            )
+        references.difference_update(new_snapshots)
+        found = set()
+        if references:
+            found = set(connection.execute(
+                select(models.FeatureSnapshot.hash).where(models.FeatureSnapshot.hash.in_(list(references)))
+            ).scalars())
+            missing = references - found
+            if missing:
+                print(f"ATTENTION : {len(missing)} snapshots de features introuvables, logs écrits sans référence.")
+                prepared = [{**row, "feature_hash": None} if row["feature_hash"] in missing else row for row in prepared]
+        return prepared, [*new_snapshots, *found]
+
+    def remember(self, hashes: List[str]):
+        now = time.monotonic()
+        with self._lock:
+            for digest in hashes:
+                self._known[digest] = now
+                self._known.move_to_end(digest)
+            while len(self._known) > self.max_known:
+                self._known.popitem(last=False)
@@ -1,8 +1,8 @@
 # src/models.py
 
 from sqlalchemy import (
-    Boolean, Column, Integer, String, DateTime, 
-    JSON, Float, Text
+    Boolean, Column, Integer, BigInteger, String, DateTime, 
+    JSON, Float, Text, LargeBinary, ForeignKey, UniqueConstraint, Index, text
 )
 from sqlalchemy.orm import declarative_base
 
@@ -23,15 +23,59 @@ class User(Base):
 # --- Modèle pour les logs de l'API ---
 class ApiLog(Base):
     __tablename__ = 'api_logs'
-    
-    id = Column(Integer, primary_key=True, index=True)
-    request_timestamp = Column(DateTime, nullable=False)
+    __table_args__ = (
+        # Tri et pagination par clé (request_timestamp, id) de /api-logs, fenêtres de temps
+        Index('ix_api_logs_request_timestamp_id', 'request_timestamp', 'id'),
+        # Une partition par jour ou par mois (voir src/database/partitions.py)
+        {"postgresql_partition_by": "RANGE (request_timestamp)"},
+    )
+
+    # La clé de partitionnement doit faire partie de la clé primaire
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    request_timestamp = Column(DateTime, primary_key=True)
     client_id = Column(Integer, nullable=True)
-    input_data = Column(JSON, nullable=False)
+    # Features copiées dans le log (logs écrits avant les snapshots, sinon vide)
+    input_data = Column(JSON(none_as_null=True), nullable=True)
+    # Empreinte du snapshot des features dans `feature_snapshots` (voir src/database/feature_snapshots.py)
+    feature_hash = Column(String(32), nullable=True, index=True)
     prediction_proba = Column(Float, nullable=False)
     prediction_decision = Column(String, nullable=False)
     inference_time_ms = Column(Float, nullable=False)
     http_status_code = Column(Integer, nullable=False)
+    # Résultat servi par le cache des prédictions (voir src/api/prediction_cache.py)
+    cached = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    # Version du modèle qui a produit la prédiction (voir src/api/model_registry.py)
+    model_version = Column(String(32), nullable=True)
+    # Clé aléatoire uniforme dans [0, 1), fixée à l'insertion : échantillonnage par parcours d'index
+    sample_key = Column(Float, nullable=False, server_default=text("random()"), index=True)
+
+# --- Modèle pour les prédictions du modèle challenger (scoring fantôme) ---
+class ShadowPrediction(Base):
+    __tablename__ = 'shadow_predictions'
+    # Comparaison champion / challenger sur une période (/shadow/stats)
+    __table_args__ = (Index('ix_shadow_predictions_versions_timestamp', 'challenger_version', 'request_timestamp'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    request_timestamp = Column(DateTime, nullable=False, index=True)
+    client_id = Column(Integer, nullable=True)
+    champion_version = Column(String(32), nullable=False)
+    challenger_version = Column(String(32), nullable=False)
+    champion_proba = Column(Float, nullable=False)
+    challenger_proba = Column(Float, nullable=False)
+    champion_decision = Column(String, nullable=False)
+    challenger_decision = Column(String, nullable=False)
+    # Temps par prédiction des deux modèles, mesurés sur le même lot (entrée du modèle comprise)
+    champion_time_ms = Column(Float, nullable=False)
+    challenger_time_ms = Column(Float, nullable=False)
+
+# --- Modèle pour les features des logs, dédupliquées ---
+class FeatureSnapshot(Base):
+    __tablename__ = 'feature_snapshots'
+
+    # MD5 du JSON des features : les prédictions pour un même client partagent un snapshot
+    hash = Column(String(32), primary_key=True)
+    data = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False)
 
 # --- Modèle pour les rapports de dérive de données ---
 class DriftReport(Base):
@@ -39,16 +83,75 @@ class DriftReport(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     report_timestamp = Column(DateTime, nullable=False)
-    report_html = Column(Text, nullable=False)
+    # Rapports enregistrés avant la compression (vide pour les nouveaux rapports)
+    report_html = Column(Text, nullable=True)
+    # Empreintes des segments du HTML, dans l'ordre (voir src/api/report_storage.py)
+    segments = Column(JSON(none_as_null=True), nullable=True)
+    # Taille et CRC32 du HTML décompressé (fin du flux gzip), ETag servi aux clients
+    html_size = Column(Integer, nullable=True)
+    html_crc32 = Column(BigInteger, nullable=True)
+    etag = Column(String(32), nullable=True)
+
+# --- Modèle pour les segments compressés des rapports de dérive ---
+class DriftReportSegment(Base):
+    __tablename__ = 'drift_report_segments'
+
+    # SHA-256 du segment décompressé : un bloc identique entre rapports n'est stocké qu'une fois
+    hash = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    # Deflate brut terminé par un "full flush", concaténable tel quel dans un flux gzip
+    deflate = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+# --- Modèle pour les manifestes du stockage "packed" des features ---
+class FeatureManifest(Base):
+    __tablename__ = 'feature_manifests'
+
+    id = Column(Integer, primary_key=True, index=True)
+    manifest_hash = Column(String(32), unique=True, nullable=False)
+    # Noms et types d'origine ("float", "int", "bool") des features, dans l'ordre du vecteur
+    feature_names = Column(JSON, nullable=False)
+    feature_types = Column(JSON, nullable=False)
+    dtype = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+# --- Modèle pour les jobs de génération des rapports de dérive ---
+class DriftReportJob(Base):
+    __tablename__ = 'drift_report_jobs'
+
+    id = Column(Integer, primary_key=True, index=True)
+    # "pending", "running", "succeeded" ou "failed"
+    status = Column(String, nullable=False, index=True)
+    progress = Column(Integer, nullable=False, default=0)
+    step = Column(String, nullable=True)
+    report_id = Column(Integer, ForeignKey('drift_reports.id', ondelete='SET NULL'), nullable=True)
+    error = Column(Text, nullable=True)
+    requested_by = Column(String, nullable=True)
+    # Fenêtre de temps et échantillonnage demandés (voir src/api/drift_sampling.py)
+    parameters = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Processus de l'API qui exécute le job ("hôte:pid:id") et dernier signe de vie
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
 
 # --- Modèle pour stocker les données d'entraînement ---
 class TrainingData(Base):
     __tablename__ = 'training_data'
-    
+    # Échantillonnage stratifié par cible des rapports de dérive
+    __table_args__ = (Index('ix_training_data_target_sample_key', 'target', 'sample_key'),)
+
     # On utilise sk_id_curr comme clé primaire, comme dans les données réelles
     sk_id_curr = Column(Integer, primary_key=True, index=True)
     data = Column(JSON, nullable=False)
     target = Column(Integer, nullable=False)
+    # Empreinte MD5 du contenu, pour ne réécrire que les lignes modifiées (init_db --mode upsert)
+    content_hash = Column(String(32), nullable=True)
+    # Stockage "packed" : vecteur float64 des features, dans l'ordre du manifeste
+    features = Column(LargeBinary, nullable=True)
+    manifest_id = Column(Integer, ForeignKey('feature_manifests.id'), nullable=True)
+    sample_key = Column(Float, nullable=False, server_default=text("random()"), index=True)
 
 # --- Modèle pour stocker les données de test ---
 class ClientDataForTest(Base):
@@ -56,4 +159,44 @@ class ClientDataForTest(Base):
 
     # On utilise également sk_id_curr comme clé primaire
     sk_id_curr = Column(Integer, primary_key=True, index=True)
-    data = Column(JSON, nullable=False)
\ No newline at end of file
+    data = Column(JSON, nullable=False)
+    content_hash = Column(String(32), nullable=True)
+    features = Column(LargeBinary, nullable=True)
+    manifest_id = Column(Integer, ForeignKey('feature_manifests.id'), nullable=True)
+
+# --- Modèle pour les points de reprise du chargement des données ---
+class LoadCheckpoint(Base):
+    __tablename__ = 'load_checkpoints'
+
+    # Une ligne par table en cours de chargement, supprimée une fois le fichier entièrement traité
+    table_name = Column(String, primary_key=True)
+    file_path = Column(String, nullable=False)
+    file_signature = Column(String, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    rows_done = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+# --- Modèles pour le calcul incrémental de la dérive (histogrammes) ---
+class DriftSketchReference(Base):
+    __tablename__ = 'drift_sketch_references'
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, nullable=False)
+    n_rows = Column(Integer, nullable=False)
+    # Découpage en classes de chaque feature (noms, type de classes, bornes)
+    layout = Column(JSON, nullable=False)
+    # Compteurs int64 de toutes les classes, bout à bout
+    counts = Column(LargeBinary, nullable=False)
+
+class DriftSketchWindow(Base):
+    __tablename__ = 'drift_sketch_windows'
+    __table_args__ = (UniqueConstraint('reference_id', 'window_start', 'writer_id'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    reference_id = Column(Integer, ForeignKey('drift_sketch_references.id', ondelete='CASCADE'), nullable=False)
+    # Début de la fenêtre d'une heure ; une ligne par processus de l'API (writer_id)
+    window_start = Column(DateTime, nullable=False, index=True)
+    writer_id = Column(String, nullable=False)
+    n_rows = Column(Integer, nullable=False)
+    counts = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
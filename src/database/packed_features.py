@@ -0,0 +1,131 @@
+# src/database/packed_features.py
+
+import hashlib
+import json
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database import models
+
+# Stockage "packed" : les features d'un client sont rangées dans un vecteur float64
+# little-endian (colonne `features`, type BYTEA), dans l'ordre décrit par un
+# manifeste (`feature_manifests`). La lecture se fait sans copie avec `np.frombuffer`.
+DTYPE = np.dtype("<f8")
+FEATURE_STORAGES = ["json", "packed"]
+
+
+# --- Manifeste ---
+
+def infer_feature_types(frame: pd.DataFrame) -> List[str]:
+    """Type d'origine de chaque colonne ("bool", "int" ou "float"), pour reconstruire un JSON fidèle."""
+    types = []
+    for dtype in frame.dtypes:
+        if pd.api.types.is_bool_dtype(dtype):
+            types.append("bool")
+        elif pd.api.types.is_integer_dtype(dtype):
+            types.append("int")
+        else:
+            types.append("float")
+    return types
+
+def infer_types_from_records(feature_names, records) -> List[str]:
+    """Même chose à partir de dictionnaires JSON (migration) : premier type non nul rencontré."""
+    types = []
+    for name in feature_names:
+        value = next((record[name] for record in records if record.get(name) is not None), None)
+        types.append("bool" if isinstance(value, bool) else "int" if isinstance(value, int) else "float")
+    return types
+
+def get_or_create_manifest(connection, feature_names, feature_types) -> int:
+    """Retourne l'ID du manifeste (créé si nécessaire ; sûr en cas d'appels concurrents)."""
+    manifest_hash = hashlib.md5(json.dumps([feature_names, feature_types]).encode("utf-8")).hexdigest()
+    table = models.FeatureManifest.__table__
+    connection.execute(
+        insert(table).values(
+            manifest_hash=manifest_hash, feature_names=feature_names, feature_types=feature_types,
+            dtype=DTYPE.str, created_at=datetime.now()
+        ).on_conflict_do_nothing(index_elements=["manifest_hash"])
+    )
+    return connection.execute(select(table.c.id).where(table.c.manifest_hash == manifest_hash)).scalar_one()
+
+
+# --- Encodage / décodage ---
+
+def pack_matrix(matrix) -> List[bytes]:
+    """Encode chaque ligne d'une matrice (NaN pour les valeurs manquantes) en vecteur binaire."""
+    matrix = np.ascontiguousarray(matrix, dtype=DTYPE)
+    return [row.tobytes() for row in matrix]
+
+def unpack_row(blob: bytes) -> np.ndarray:
+    """Vue en lecture seule sur le buffer, sans copie."""
+    return np.frombuffer(blob, dtype=DTYPE)
+
+def unpack_rows(blobs, n_features: int) -> np.ndarray:
+    """Matrice (n_lignes x n_features) : une seule concaténation, puis une vue sans copie."""
+    return np.frombuffer(b"".join(blobs), dtype=DTYPE).reshape(-1, n_features)
+
+
+class PackedFeatureDecoder:
+    """
+    Replace les vecteurs packed dans l'ordre des features du modèle.
+
+    Pour chaque manifeste, la correspondance de colonnes est calculée une seule fois.
+    Une feature du modèle absente du manifeste vaut 0 (même sémantique que le JSON) ;
+    si le manifeste suit déjà l'ordre du modèle, les vecteurs sont utilisés tels quels.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        self._manifests = {}
+
+    def knows(self, manifest_id: Optional[int]) -> bool:
+        return manifest_id in self._manifests
+
+    def register(self, manifest: models.FeatureManifest):
+        names, types = list(manifest.feature_names), list(manifest.feature_types)
+        if names == self.feature_names:
+            columns = None
+        else:
+            positions = {name: i for i, name in enumerate(names)}
+            # Index len(names) = colonne de zéros ajoutée pour les features absentes
+            columns = np.array([positions.get(f, len(names)) for f in self.feature_names])
+        casters = [_as_bool if t == "bool" else _as_int if t == "int" else float for t in types]
+        self._manifests[manifest.id] = (names, types, columns, casters)
+
+    def decode(self, manifest_id: int, blobs) -> np.ndarray:
+        """Matrice dans l'ordre du modèle, prête pour `scorer.predict_proba`."""
+        names, _, columns, _ = self._manifests[manifest_id]
+        matrix = unpack_rows(blobs, len(names))
+        if columns is None:
+            return matrix
+        padded = np.concatenate([matrix, np.zeros((len(matrix), 1), dtype=DTYPE)], axis=1)
+        return padded.take(columns, axis=1)
+
+    def to_record(self, manifest_id: int, blob: bytes) -> dict:
+        """Reconstruit le dictionnaire JSON d'origine (ordre et types du manifeste), pour les logs."""
+        names, _, _, casters = self._manifests[manifest_id]
+        return {
+            name: None if np.isnan(value) else cast_value(value)
+            for name, value, cast_value in zip(names, unpack_row(blob).tolist(), casters)
+        }
+
+    def to_frame(self, manifest_id: int, blobs) -> pd.DataFrame:
+        """DataFrame dans l'ordre du manifeste, avec les types d'origine quand c'est possible (dérive)."""
+        names, types, _, _ = self._manifests[manifest_id]
+        frame = pd.DataFrame(unpack_rows(blobs, len(names)), columns=names)
+        for name, feature_type in zip(names, types):
+            if feature_type != "float" and not frame[name].isna().any():
+                frame[name] = frame[name].astype(bool if feature_type == "bool" else "int64")
+        return frame
+
+
+def _as_int(value: float):
+    return int(value) if value.is_integer() else value
+
+def _as_bool(value: float):
+    return bool(value) if value in (0.0, 1.0) else value
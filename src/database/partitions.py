@@ -0,0 +1,275 @@
+# src/database/partitions.py
+
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from src.database import models
+
+# `api_logs` est partitionnée par plage de `request_timestamp` : une partition par jour
+# ou par mois, plus une partition par défaut pour les lignes hors de toute plage.
+PARTITION_INTERVALS = ["day", "month"]
+TABLE = models.ApiLog.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+SNAPSHOT_TABLE = models.FeatureSnapshot.__tablename__
+_NAME = re.compile(rf"^{TABLE}_p(\d{{6}}|\d{{8}})$")
+# Clé du verrou consultatif : un seul processus fait la maintenance à la fois
+MAINTENANCE_LOCK_KEY = 0x61706C6F
+# Types Parquet des colonnes de `api_logs` (features du log sérialisées en JSON)
+_ARCHIVE_TYPES = {int: pa.int64(), float: pa.float64(), str: pa.string(), bool: pa.bool_(),
+                  datetime: pa.timestamp("us"), dict: pa.string()}
+
+
+def partition_start(moment: datetime, interval: str) -> datetime:
+    """Début de la partition contenant `moment`."""
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if interval == "day" else day.replace(day=1)
+
+def next_start(start: datetime, interval: str) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def partition_name(start: datetime, interval: str) -> str:
+    return f"{TABLE}_p{start:%Y%m%d}" if interval == "day" else f"{TABLE}_p{start:%Y%m}"
+
+def parse_partition_name(name: str):
+    """(début, fin) de la plage d'une partition d'après son nom, None pour les autres tables."""
+    match = _NAME.match(name)
+    if match is None:
+        return None
+    digits = match.group(1)
+    interval = "day" if len(digits) == 8 else "month"
+    start = datetime.strptime(digits, "%Y%m%d" if interval == "day" else "%Y%m")
+    return start, next_start(start, interval)
+
+def is_partitioned(connection) -> bool:
+    return connection.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name AND relnamespace = 'public'::regnamespace"),
+        {"name": TABLE}
+    ).scalar() == "p"
+
+def list_partitions(connection) -> List[tuple]:
+    """Partitions datées de `api_logs` : (nom, début, fin), par ordre chronologique."""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = :name"
+    ), {"name": TABLE}).scalars()
+    partitions = [(name, *bounds) for name in names if (bounds := parse_partition_name(name)) is not None]
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def create_partition(connection, start: datetime, interval: str) -> str:
+    """
+    Crée la partition commençant à `start`. Les lignes de la même plage déjà
+    écrites dans la partition par défaut y sont déplacées : PostgreSQL refuse
+    d'attacher une plage que la partition par défaut contient encore. La partition
+    par défaut est verrouillée en écriture jusqu'à la fin de la transaction : un log
+    écrit entre le déplacement et l'ATTACH ferait échouer ce dernier (les écritures
+    attendent, les lectures ne sont pas bloquées).
+    """
+    name, end = partition_name(start, interval), next_start(start, interval)
+    bounds = {"start": start, "end": end}
+    # Même ordre de verrouillage que l'ATTACH (table parente, puis partition par défaut)
+    connection.execute(text(f"LOCK TABLE {TABLE} IN SHARE UPDATE EXCLUSIVE MODE"))
+    connection.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE"))
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE request_timestamp >= :start AND request_timestamp < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds).rowcount
+    connection.execute(text(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if moved:
+        print(f"[{TABLE}] {moved} lignes déplacées de la partition par défaut vers {name}.")
+    return name
+
+def ensure_partitions(connection, interval: str, ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Crée la partition par défaut, la partition courante et les `ahead` suivantes
+    si elles n'existent pas. Retourne les noms des partitions créées.
+    """
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    existing = list_partitions(connection)
+    created = []
+    start = partition_start(now or datetime.now(), interval)
+    for _ in range(ahead + 1):
+        end = next_start(start, interval)
+        # Une partition existante (éventuellement d'une autre granularité) couvre déjà la plage
+        if not any(p_start < end and start < p_end for _, p_start, p_end in existing):
+            created.append(create_partition(connection, start, interval))
+        start = end
+    return created
+
+def archive_schema() -> pa.Schema:
+    """
+    Schéma Parquet des archives, tiré des colonnes de `api_logs` : il ne dépend pas du
+    premier lot lu (dont une colonne ajoutée depuis, ex. `model_version`, peut n'avoir
+    que des NULL dans une ancienne partition).
+    """
+    return pa.schema([
+        (column.name, _ARCHIVE_TYPES[column.type.python_type]) for column in models.ApiLog.__table__.columns
+    ])
+
+def archive_partition(connection, name: str, archive_dir: str, chunk_size: int = 50000) -> Optional[str]:
+    """
+    Écrit le contenu d'une partition dans `archive_dir/<nom>.parquet` (compression zstd).
+    Le fichier est écrit sous un nom temporaire puis renommé : une archive présente est complète.
+    Retourne le chemin du fichier (None si la partition est vide).
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.parquet")
+    schema = archive_schema()
+    writer = None
+    try:
+        # Les features référencées sont recopiées dans l'archive, qui reste lisible seule
+        columns = ", ".join(f"logs.{column}" for column in schema.names)
+        query = text(
+            f"SELECT {columns}, snapshots.data AS snapshot_data FROM {name} logs "
+            f"LEFT JOIN {SNAPSHOT_TABLE} snapshots ON snapshots.hash = logs.feature_hash "
+            f"ORDER BY logs.request_timestamp, logs.id"
+        )
+        for chunk in pd.read_sql(query, connection, chunksize=chunk_size):
+            snapshot_data = chunk.pop("snapshot_data")
+            chunk["input_data"] = chunk["input_data"].where(chunk["input_data"].notna(), snapshot_data).map(json.dumps)
+            if writer is None:
+                writer = pq.ParquetWriter(f"{path}.tmp", schema, compression="zstd")
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(f"{path}.tmp")
+        raise
+    if writer is None:
+        return None
+    writer.close()
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def apply_retention(connection, retention_days: int, archive_dir: str = "", now: Optional[datetime] = None) -> List[str]:
+    """
+    Supprime les partitions entièrement plus anciennes que `retention_days` jours,
+    après les avoir archivées en Parquet si `archive_dir` est renseigné.
+    Retourne les noms des partitions supprimées.
+    """
+    if retention_days <= 0:
+        return []
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    dropped = []
+    for name, _, end in list_partitions(connection):
+        if end > cutoff:
+            break
+        if archive_dir:
+            path = archive_partition(connection, name, archive_dir)
+            if path:
+                print(f"[{TABLE}] Partition {name} archivée dans {path}.")
+        connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    if dropped:
+        prune_snapshots(connection, cutoff)
+    return dropped
+
+def prune_snapshots(connection, cutoff: datetime) -> int:
+    """Supprime les snapshots de features créés avant `cutoff` qu'aucun log ne référence plus."""
+    pruned = connection.execute(text(
+        f"DELETE FROM {SNAPSHOT_TABLE} snapshots WHERE snapshots.created_at < :cutoff "
+        f"AND NOT EXISTS (SELECT 1 FROM {TABLE} logs WHERE logs.feature_hash = snapshots.hash)"
+    ), {"cutoff": cutoff}).rowcount
+    if pruned:
+        print(f"[{TABLE}] {pruned} snapshots de features supprimés.")
+    return pruned
+
+def convert_to_partitioned(connection, interval: str, ahead: int) -> int:
+    """
+    Remplace une table `api_logs` non partitionnée (créée avant le partitionnement)
+    par la table partitionnée, en conservant les lignes et leurs identifiants.
+    Retourne le nombre de lignes recopiées.
+    """
+    legacy = f"{TABLE}_unpartitioned"
+    connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+    connection.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq RENAME TO {legacy}_id_seq"))
+    # Les noms d'index (et de clé primaire) doivent être libérés pour la nouvelle table
+    indexes = connection.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :name"), {"name": legacy}).scalars()
+    for index in list(indexes):
+        connection.execute(text(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned"))
+    models.ApiLog.__table__.create(connection)
+
+    first = connection.execute(text(f"SELECT min(request_timestamp) FROM {legacy}")).scalar()
+    ensure_partitions(connection, interval, ahead)
+    if first is not None:
+        # Partitions des mois (ou jours) passés contenant des logs
+        existing = list_partitions(connection)
+        start, current = partition_start(first, interval), partition_start(datetime.now(), interval)
+        while start < current:
+            if not any(p_start <= start < p_end for _, p_start, p_end in existing):
+                create_partition(connection, start, interval)
+            start = next_start(start, interval)
+
+    columns = ", ".join(column.name for column in models.ApiLog.__table__.columns)
+    copied = connection.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {legacy}")).rowcount
+    connection.execute(text(f"SELECT setval('{TABLE}_id_seq', COALESCE((SELECT max(id) FROM {TABLE}), 0) + 1, false)"))
+    connection.execute(text(f"DROP TABLE {legacy}"))
+    return copied
+
+
+class LogPartitionManager:
+    """
+    Maintenance de `api_logs` : création des partitions à venir et rétention.
+    Exécutée au démarrage de l'API puis périodiquement dans un thread ; un verrou
+    consultatif PostgreSQL évite que plusieurs processus la fassent en même temps.
+    """
+
+    def __init__(self, engine, interval: str = "month", ahead: int = 2, retention_days: int = 0, archive_dir: str = ""):
+        if interval not in PARTITION_INTERVALS:
+            raise ValueError(f"Granularité de partitionnement inconnue : {interval} (valeurs possibles : {PARTITION_INTERVALS}).")
+        self.engine = engine
+        self.interval = interval
+        self.ahead = ahead
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        with self.engine.begin() as connection:
+            if not is_partitioned(connection):
+                print(f"ATTENTION : la table {TABLE} n'est pas partitionnée "
+                      f"(lancez python -m src.scripts.manage_partitions --convert).")
+                return {"created": [], "dropped": []}
+            if not connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar():
+                return {"created": [], "dropped": []}
+            created = ensure_partitions(connection, self.interval, self.ahead)
+            dropped = apply_retention(connection, self.retention_days, self.archive_dir)
+        return {"created": created, "dropped": dropped}
+
+    def start(self, period: float):
+        """Relance la maintenance toutes les `period` secondes dans un thread d'arrière-plan."""
+        def run():
+            while not self._stop.wait(period):
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"ERREUR lors de la maintenance des partitions de {TABLE} : {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="api-logs-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
@@ -13,6 +13,22 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class IdentityCacheStats(BaseModel):
+    hits: int
+    misses: int
+    size: int
+    ttl_seconds: float
+
+# Compteurs du cache des prédictions (/predict/cache)
+class PredictionCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    size: int
+    max_size: int
+    ttl_seconds: float
+    model_version: str
+
 # --- Schéma pour la Prédiction ---
 
 class PredictionResponse(BaseModel):
@@ -20,24 +36,124 @@ class PredictionResponse(BaseModel):
     prediction_probability: float
     prediction_decision: str
 
+# --- Schémas pour la Prédiction par Lot ---
+
+class BatchPredictionRequest(BaseModel):
+    client_ids: List[int]
+
+# Un élément par ID demandé : soit la prédiction, soit l'erreur associée
+class BatchPredictionItem(BaseModel):
+    client_id: int
+    prediction_probability: Optional[float] = None
+    prediction_decision: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionItem]
+
 # --- Schémas pour les Endpoints du Dashboard ---
 
 # Schéma pour la sortie des logs de l'API
 # Il est utilisé pour valider les données envoyées par l'endpoint /api-logs
+# Seuls `id` et `request_timestamp` (clé de pagination) sont toujours présents : les
+# autres champs dépendent du paramètre `fields`
 class ApiLog(BaseModel):
     id: int
     request_timestamp: datetime
-    client_id: Optional[int]
-    input_data: Dict[str, Any]
-    prediction_proba: float
-    prediction_decision: str
-    inference_time_ms: float
-    http_status_code: int
+    client_id: Optional[int] = None
+    input_data: Optional[Dict[str, Any]] = None
+    prediction_proba: Optional[float] = None
+    prediction_decision: Optional[str] = None
+    inference_time_ms: Optional[float] = None
+    http_status_code: Optional[int] = None
+    cached: Optional[bool] = None
+    model_version: Optional[str] = None
 
     # Permet à Pydantic de lire les données depuis un objet SQLAlchemy
     class Config:
         from_attributes = True
 
+# Statistiques des logs sur une tranche de temps (/api-logs/stats)
+class LogStatsBucket(BaseModel):
+    bucket_start: datetime
+    requests: int
+    errors: int
+    cached: int = 0
+    mean_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    decisions: Dict[str, int]
+
+# Statistiques des logs sur toute la période, et par tranche de temps
+class LogStats(BaseModel):
+    start: Optional[datetime] = None
+    end: datetime
+    bucket: str
+    requests: int
+    errors: int
+    error_rate: float
+    # Part des prédictions servies par le cache, tous processus confondus
+    cached: int = 0
+    cache_hit_ratio: float = 0.0
+    mean_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    decisions: Dict[str, int]
+    buckets: List[LogStatsBucket]
+
+# Compteurs de l'écriture des logs en arrière-plan
+class LogWriterStats(BaseModel):
+    queued: int
+    flushed: int
+    dropped: int
+    failed: int
+    pending: int
+
+# Empreinte mémoire du feature store
+class FeatureStoreStats(BaseModel):
+    clients: int
+    features: int
+    allocated_rows: int
+    matrix_bytes: int
+    index_bytes: int
+    records_bytes: int
+    total_bytes: int
+    loaded_at: Optional[datetime]
+
+# Résultat d'un rafraîchissement incrémental du feature store
+class FeatureStoreRefresh(BaseModel):
+    updated: int
+    removed: int
+    clients: int
+
+# Dérive d'une feature calculée à partir des histogrammes
+class SketchFeatureDrift(BaseModel):
+    feature: str
+    psi: float
+    ks: float
+    js: float
+    drifted: bool
+
+# Dérive de toutes les features sur une période (fenêtres horaires)
+class SketchDriftReport(BaseModel):
+    reference_id: int
+    reference_rows: int
+    current_rows: int
+    window_start: datetime
+    window_end: datetime
+    psi_threshold: float
+    drifted_features: int
+    drift_share: float
+    features: List[SketchFeatureDrift]
+
+# Référence des histogrammes de dérive
+class SketchReferenceInfo(BaseModel):
+    reference_id: int
+    reference_rows: int
+    features: int
+
 # Schéma pour la liste des rapports de dérive
 class DriftReportInfo(BaseModel):
     id: int
@@ -54,3 +170,134 @@ class DriftReportDetail(BaseModel):
 
     class Config:
         from_attributes = True
+
+# Paramètres d'un rapport de dérive (les valeurs absentes reprennent la configuration)
+class DriftReportRequest(BaseModel):
+    # Fenêtre [start, end[ sur l'horodatage des logs de production
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    # Nombre maximum de lignes échantillonnées de chaque côté (référence et logs)
+    sample_size: Optional[int] = None
+    # "reservoir", "stratified" (référence par TARGET) ou "time_bucket" (logs par tranche de temps)
+    sampling: Optional[str] = None
+    bucket_minutes: Optional[int] = None
+
+# Statut d'un job de génération de rapport de dérive
+class DriftReportJobStatus(BaseModel):
+    id: int
+    status: str
+    progress: int
+    step: Optional[str] = None
+    report_id: Optional[int] = None
+    error: Optional[str] = None
+    parameters: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# Démarrage d'une session du profiler par échantillonnage (valeurs absentes : configuration)
+class ProfilerStartRequest(BaseModel):
+    # La session s'arrête à la première limite atteinte (durée ou nombre de requêtes profilées)
+    duration_seconds: Optional[float] = None
+    max_requests: Optional[int] = None
+    interval_ms: Optional[float] = None
+    # Noms de fonctions : seules les piles qui passent par l'une d'elles sont gardées
+    # (liste vide : toutes les piles de tous les threads)
+    focus: Optional[List[str]] = None
+    include_drift_jobs: bool = True
+
+# État de la session courante (ou de la dernière) du profiler
+class ProfilerStatus(BaseModel):
+    session: int
+    active: bool
+    started_at: Optional[datetime] = None
+    elapsed_seconds: float
+    interval_ms: float
+    samples: int
+    stacks: int
+    requests: int
+    max_requests: Optional[int] = None
+    duration_seconds: Optional[float] = None
+    focus: List[str]
+    include_drift_jobs: bool
+
+# Version du modèle : métadonnées du registre (ou du fichier MODEL_PATH)
+class ModelVersionInfo(BaseModel):
+    version: str
+    created_at: Optional[str] = None
+    sha256: Optional[str] = None
+    features: int
+    metrics: Dict[str, float] = {}
+
+# Rechargement à chaud du modèle (version absente : version active du registre, ou MODEL_PATH)
+class ModelReloadRequest(BaseModel):
+    version: Optional[str] = None
+    # La version demandée devient la version active du registre, suivie par les autres workers
+    activate: bool = True
+
+class ModelReloadStatus(BaseModel):
+    status: str
+    requested_version: Optional[str] = None
+    version: Optional[str] = None
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+# Modèle servi par ce processus, dernier rechargement et versions du registre
+class ModelStatus(BaseModel):
+    current: ModelVersionInfo
+    source: str
+    loaded_at: datetime
+    load_seconds: float
+    active_version: Optional[str] = None
+    reload: Optional[ModelReloadStatus] = None
+    versions: List[ModelVersionInfo]
+
+# Comparaison champion / challenger pour un couple de versions (/shadow/stats)
+class ShadowComparison(BaseModel):
+    champion_version: str
+    challenger_version: str
+    predictions: int
+    # Part des prédictions où les deux modèles prennent la même décision
+    agreement_rate: float
+    # Écart des probabilités (challenger - champion), moyen et moyen en valeur absolue
+    mean_diff: float
+    mean_abs_diff: float
+    # Temps par prédiction (lot scoré en arrière-plan par les deux modèles, un thread chacun),
+    # et écart (challenger - champion)
+    champion_mean_ms: float
+    challenger_mean_ms: float
+    latency_delta_ms: float
+    champion_p95_ms: float
+    challenger_p95_ms: float
+    latency_delta_p95_ms: float
+
+# Changement de challenger, appliqué en arrière-plan (POST /admin/shadow)
+class ShadowConfigStatus(BaseModel):
+    status: str
+    requested_version: Optional[str] = None
+    sample_rate: float
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+class ShadowStats(BaseModel):
+    challenger_version: Optional[str] = None
+    sample_rate: float
+    # Compteurs du scoring en arrière-plan de ce processus
+    queued: int
+    flushed: int
+    dropped: int
+    failed: int
+    pending: int
+    # Dernier changement de challenger lancé depuis ce processus
+    change: Optional[ShadowConfigStatus] = None
+    comparisons: List[ShadowComparison]
+
+# Challenger de tous les workers (version du registre ; vide : scoring fantôme désactivé)
+class ShadowConfigRequest(BaseModel):
+    version: Optional[str] = None
+    sample_rate: Optional[float] = None
@@ -0,0 +1,95 @@
+# src/scripts/benchmark_feature_decode.py
+
+import argparse
+import json
+import time
+
+import numpy as np
+from sqlalchemy import Text, cast, select
+
+from src.database.database import engine
+from src.database import models
+from src.database.packed_features import PackedFeatureDecoder
+
+TABLES = {
+    models.TrainingData.__tablename__: models.TrainingData,
+    models.ClientDataForTest.__tablename__: models.ClientDataForTest,
+}
+
+def best_time(function, repeat: int) -> float:
+    """Meilleur temps (en secondes) sur `repeat` exécutions."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_benchmark(model, limit: int, repeat: int) -> dict:
+    """
+    Compare le coût de décodage des deux stockages, sur les mêmes lignes :
+    - json   : `json.loads` du texte stocké, puis matrice dans l'ordre des features ;
+    - packed : `np.frombuffer` sur les vecteurs binaires (une concaténation, aucune conversion).
+    Le temps de lecture en BDD est mesuré séparément pour chaque colonne.
+    """
+    table = model.__table__
+    query = select(table.c.manifest_id, cast(table.c.data, Text), table.c.features) \
+        .where(table.c.features.isnot(None)).order_by(table.c.sk_id_curr).limit(limit)
+    with engine.connect() as connection:
+        rows = connection.execute(query).all()
+        manifest_ids = {manifest_id for manifest_id, _, _ in rows}
+        if len(manifest_ids) != 1:
+            raise ValueError("Le benchmark attend des lignes migrées avec un seul manifeste (voir migrate_features.py).")
+        manifest = connection.execute(
+            select(models.FeatureManifest).where(models.FeatureManifest.id == manifest_ids.pop())
+        ).first()
+
+        def fetch(column):
+            return lambda: connection.execute(select(column).order_by(table.c.sk_id_curr).limit(limit)).all()
+        fetch_json = best_time(fetch(table.c.data), repeat)
+        fetch_packed = best_time(fetch(table.c.features), repeat)
+
+    decoder = PackedFeatureDecoder(manifest.feature_names)
+    decoder.register(manifest)
+    texts = [text_value for _, text_value, _ in rows]
+    blobs = [bytes(blob) for _, _, blob in rows]
+    names = decoder.feature_names
+
+    def decode_json():
+        records = [json.loads(text_value) for text_value in texts]
+        return np.array([[record.get(f, 0) for f in names] for record in records], dtype=np.float64)
+
+    def decode_packed():
+        return decoder.decode(manifest.id, blobs)
+
+    # Les deux décodages doivent produire la même matrice (NaN compris)
+    if not np.array_equal(decode_json(), decode_packed(), equal_nan=True):
+        raise ValueError("Les stockages json et packed ne contiennent pas les mêmes valeurs.")
+
+    return {
+        "rows": len(rows),
+        "features": len(names),
+        "json_bytes_per_row": sum(len(text_value.encode("utf-8")) for text_value in texts) / len(rows),
+        "packed_bytes_per_row": sum(len(blob) for blob in blobs) / len(rows),
+        "json_fetch_s": fetch_json,
+        "packed_fetch_s": fetch_packed,
+        "json_decode_s": best_time(decode_json, repeat),
+        "packed_decode_s": best_time(decode_packed, repeat),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs packed feature decoding.")
+    parser.add_argument("--table", choices=list(TABLES), default=models.ClientDataForTest.__tablename__)
+    parser.add_argument("--limit", type=int, default=10000, help="Number of rows to decode.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs (the best one is kept).")
+    args = parser.parse_args()
+
+    result = run_benchmark(TABLES[args.table], args.limit, args.repeat)
+    rows = result["rows"]
+    print(f"{rows} lignes x {result['features']} features ({args.table})")
+    print(f"{'':10}{'octets/ligne':>15}{'lecture BDD (ms)':>20}{'décodage (ms)':>18}{'µs/ligne':>12}")
+    for layout in ("json", "packed"):
+        decode_s = result[f"{layout}_decode_s"]
+        print(f"{layout:10}{result[f'{layout}_bytes_per_row']:>15,.0f}{result[f'{layout}_fetch_s'] * 1000:>20.2f}"
+              f"{decode_s * 1000:>18.2f}{decode_s * 1e6 / rows:>12.1f}")
+    print(f"Décodage packed {result['json_decode_s'] / result['packed_decode_s']:.0f}x plus rapide.")
@@ -0,0 +1,410 @@
+# src/scripts/benchmark_scoring.py
+
+import argparse
+import gc
+import hashlib
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = (1, 100, 1000)
+
+# Le SimpleImputer signale à chaque transform les colonnes vides supprimées à l'entraînement
+warnings.filterwarnings("ignore", message="Skipping features without any observed values")
+
+
+# --- Données et modèle synthétiques ---
+
+def synthetic_frame(n_rows: int, n_features: int, seed: int) -> pd.DataFrame:
+    """
+    Features synthétiques ayant le profil des données préparées : indicateurs 0/1,
+    petits entiers, montants continus, valeurs manquantes (et quelques colonnes vides)
+    avec des taux variables selon la colonne. Les colonnes sont toujours les mêmes
+    pour un nombre de features donné ; les lignes dépendent de `seed`.
+    """
+    layout = np.random.default_rng(n_features)
+    kinds = layout.choice(["flag", "count", "amount", "score"], size=n_features, p=[0.3, 0.1, 0.3, 0.3])
+    missing_rates = np.where(layout.random(n_features) < 0.4, layout.uniform(0, 0.7, n_features), 0.0)
+    missing_rates[layout.choice(n_features, size=max(n_features // 100, 1), replace=False)] = 1.0
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for i, (kind, missing_rate) in enumerate(zip(kinds, missing_rates)):
+        if kind == "flag":
+            values = (rng.random(n_rows) < layout.uniform(0.05, 0.5)).astype(np.float64)
+        elif kind == "count":
+            values = rng.poisson(layout.uniform(0.5, 3), n_rows).astype(np.float64)
+        elif kind == "amount":
+            values = rng.lognormal(layout.uniform(8, 13), 0.7, n_rows)
+        else:
+            values = rng.normal(layout.normal(0, 1), layout.uniform(0.1, 2), n_rows)
+        values[rng.random(n_rows) < missing_rate] = np.nan
+        columns[f"FEATURE_{i:03d}_{kind.upper()}"] = values
+    return pd.DataFrame(columns)
+
+def synthetic_target(frame: pd.DataFrame, seed: int) -> np.ndarray:
+    """Cible binaire (~8 % de défauts) dépendant d'une vingtaine de features."""
+    rng = np.random.default_rng(seed)
+    X = frame.to_numpy()
+    weights = np.zeros(X.shape[1])
+    weights[rng.choice(X.shape[1], size=min(20, X.shape[1]), replace=False)] = rng.normal(0, 1, min(20, X.shape[1]))
+    standardized = (X - np.nanmean(X, axis=0)) / np.maximum(np.nanstd(X, axis=0), 1e-9)
+    logit = np.nan_to_num(standardized) @ weights + rng.logistic(0, 1, len(X))
+    return (logit > np.quantile(logit, 0.92)).astype(int)
+
+def synthetic_model(n_features: int, n_estimators: int, train_rows: int, seed: int, cache_dir: str):
+    """
+    Pipeline SimpleImputer + LGBMClassifier avec les hyperparamètres du modèle de
+    production (src/train.py), entraîné sur des données synthétiques. L'entraînement
+    étant long, le modèle est mis en cache dans `cache_dir` selon ses paramètres.
+    Retourne (chemin du modèle, modèle).
+    """
+    from lightgbm import LGBMClassifier
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from src.train import BEST_PARAMS
+
+    params = {**BEST_PARAMS, "n_estimators": n_estimators, "seed": seed, "deterministic": True}
+    key = hashlib.md5(json.dumps([n_features, train_rows, params], sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(cache_dir, f"credit_scoring_benchmark_{key}.joblib")
+    if os.path.exists(path):
+        return path, joblib.load(path)
+
+    print(f"Entraînement du modèle synthétique ({n_features} features, {n_estimators} arbres, {train_rows} lignes)...")
+    frame = synthetic_frame(train_rows, n_features, seed)
+    model = Pipeline([("imputer", SimpleImputer(strategy="median")), ("classifier", LGBMClassifier(**params))])
+    model.fit(frame, synthetic_target(frame, seed))
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(model, path)
+    return path, model
+
+def to_records(frame: pd.DataFrame) -> list:
+    """Reproduit le JSON stocké dans `test_data` : NaN -> None, indicateurs et compteurs en entiers."""
+    integer_columns = {name for name in frame.columns if name.endswith(("_FLAG", "_COUNT"))}
+    records = []
+    for row in frame.itertuples(index=False):
+        records.append({
+            name: None if value != value else (int(value) if name in integer_columns else value)
+            for name, value in zip(frame.columns, row)
+        })
+    return records
+
+
+# --- Mesure ---
+
+def measure(function, size: int, max_rounds: int, max_seconds: float, warmup: int = 1, teardown=None,
+            min_round_seconds: float = 0.01) -> dict:
+    """
+    Exécute `function` (une opération portant sur `size` éléments) après `warmup`
+    exécutions non mesurées, au plus `max_rounds` fois et au moins 3 fois, en
+    s'arrêtant dès que `max_seconds` secondes se sont écoulées. `teardown` est
+    appelé après chaque exécution, hors mesure. Comme timeit, le ramasse-miettes
+    est suspendu pendant les mesures et une opération trop courte est répétée dans
+    chaque tour (au moins `min_round_seconds`) ; les temps sont donnés par opération.
+    """
+    loops, warmup_end = 1, time.perf_counter() + 10 * min_round_seconds
+    # Échauffement : `warmup` exécutions, prolongées jusqu'à 10 tours minimum (caches, threads OpenMP)
+    for i in itertools.count():
+        if i >= warmup and (warmup == 0 or time.perf_counter() >= warmup_end):
+            break
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if teardown is not None:
+            teardown()
+        else:
+            loops = max(1, min(int(min_round_seconds / max(elapsed, 1e-9)), 1000))
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        budget_end = time.perf_counter() + max_seconds
+        while len(timings) < max_rounds and (len(timings) < 3 or time.perf_counter() < budget_end):
+            start = time.perf_counter()
+            for _ in range(loops):
+                function()
+            timings.append((time.perf_counter() - start) / loops)
+            if teardown is not None:
+                teardown()
+    finally:
+        gc.enable()
+    ordered = sorted(timings)
+    median = statistics.median(ordered)
+    return {
+        "size": size,
+        "rounds": len(timings),
+        "loops": loops,
+        "min_s": ordered[0],
+        "median_s": median,
+        "mean_s": statistics.fmean(ordered),
+        "p95_s": ordered[min(math.ceil(0.95 * len(ordered)) - 1, len(ordered) - 1)],
+        "stdev_s": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "items_per_s": size / median if median > 0 else None,
+    }
+
+
+# --- Environnement de l'API ---
+
+def configure_api_environment(model_path: str, engine_name: str):
+    """
+    Variables lues par src/config.py à l'import de l'API : modèle synthétique, features
+    servies depuis la mémoire. Les paramètres obligatoires absents (BDD, JWT) reçoivent
+    des valeurs factices : aucune connexion à PostgreSQL n'est ouverte.
+    """
+    os.environ.update({
+        "MODEL_PATH": model_path,
+        "MODEL_REGISTRY_DIR": "",
+        "INFERENCE_ENGINE": engine_name,
+        "FEATURE_STORE_ENABLED": "true",
+        "DRIFT_SKETCH_ENABLED": "false",
+        "IDENTITY_CACHE_TTL_SECONDS": "86400",
+    })
+    for name, value in {
+        "DB_USER": "benchmark", "DB_PASSWORD": "benchmark", "DB_HOST": "localhost", "DB_PORT": "5432",
+        "DB_NAME": "benchmark", "API_URL": "http://testserver", "SECRET_KEY": "benchmark-secret-key",
+        "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "DECISION_THRESHOLD": "0.5",
+    }.items():
+        os.environ.setdefault(name, value)
+
+def sqlite_log_engine():
+    """
+    Base SQLite en mémoire avec les tables `api_logs` et `feature_snapshots`.
+    SQLite n'auto-incrémente pas une clé primaire composite : `id` y reste vide.
+    """
+    from sqlalchemy import MetaData, create_engine
+    from sqlalchemy.pool import StaticPool
+    from src.database import models
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    metadata = MetaData()
+    for table in (models.ApiLog.__table__, models.FeatureSnapshot.__table__):
+        table.to_metadata(metadata)
+    metadata.tables["api_logs"].c.id.autoincrement = False
+    metadata.tables["api_logs"].c.id.nullable = True
+    metadata.create_all(engine)
+    return engine
+
+
+# --- Benchmarks ---
+
+def run_benchmarks(sizes, n_features=568, n_estimators=1000, train_rows=10000, seed=42, engine_name="numpy",
+                   max_rounds=50, max_seconds=5.0, requests=200, drift_columns=20, evidently_max_rows=1000,
+                   cache_dir=None) -> dict:
+    """
+    Mesure le chemin de scoring dans le processus, sans PostgreSQL ni serveur :
+    - model_predict_proba / pipeline_predict_proba : moteur d'inférence et Pipeline scikit-learn ;
+    - frame_build : matrice de features construite depuis les dictionnaires JSON ;
+    - predict_endpoint / predict_batch_endpoint : /predict et /predict/batch via TestClient,
+      features servies par le feature store en mémoire ;
+    - log_write : logs mis en file puis écrits (snapshots de features compris) dans SQLite ;
+    - drift_sketch / drift_evidently : dérive par histogrammes et rapport Evidently.
+    """
+    sizes = sorted(set(sizes))
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "credit_scoring_benchmark")
+    model_path, model = synthetic_model(n_features, n_estimators, train_rows, seed, cache_dir)
+    configure_api_environment(model_path, engine_name)
+
+    from fastapi.testclient import TestClient
+    from src.api import main, security
+    from src.api.drift_jobs import render_report_html
+    from src.api.drift_sketch import SketchLayout
+    from src.api.log_writer import ApiLogWriter
+    from src.database import models
+    from src.database.feature_snapshots import FeatureSnapshotStore
+
+    n_clients = max(max(sizes), 1000)
+    clients = synthetic_frame(n_clients, n_features, seed + 1)
+    records = to_records(clients)
+    client_ids = list(range(100001, 100001 + n_clients))
+    main.feature_store.load_rows((client_id, record, None) for client_id, record in zip(client_ids, records))
+    reference = synthetic_frame(max(n_clients, 5000), n_features, seed + 2)
+
+    results = []
+
+    def record(name, function, size, **overrides):
+        options = {"max_rounds": max_rounds, "max_seconds": max_seconds, **overrides}
+        result = {"name": name, **measure(function, size, **options)}
+        results.append(result)
+        print(f"  {name:<24}{size:>8}{result['median_s'] * 1000:>14.3f} ms{result['p95_s'] * 1000:>14.3f} ms"
+              f"{result['rounds']:>8}")
+
+    print(f"  {'benchmark':<24}{'taille':>8}{'médiane':>17}{'p95':>17}{'tours':>8}")
+    scorer = main.model_manager.current.scorer
+    for size in sizes:
+        X = scorer.build_matrix(records[:size])
+        frame = pd.DataFrame(X, columns=scorer.feature_names)
+        record("model_predict_proba", lambda: scorer.predict_proba(X), size)
+        record("pipeline_predict_proba", lambda: model.predict_proba(frame), size)
+        record("frame_build", lambda: scorer.build_matrix(records[:size]), size)
+
+    # Requêtes authentifiées : le jeton est validé à chaque requête, l'utilisateur vient du cache
+    token = security.create_access_token({"sub": "benchmark"}, expires_delta=timedelta(days=1))
+    payload = security.jwt.decode(token, main.settings.secret_key, algorithms=[main.settings.algorithm])
+    security.identity_cache.set(
+        ("benchmark", payload["exp"]),
+        models.User(id=0, username="benchmark", hashed_password="", disabled=False), payload["exp"]
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    # Le writer de l'API n'est pas démarré : les logs mis en file par une requête sont
+    # écrits (dans SQLite) après sa mesure ; leur écriture est mesurée par log_write
+    main.log_writer.engine = sqlite_log_engine()
+    client = TestClient(main.app)
+    position = itertools.count()
+
+    def predict_one():
+        client.post(f"/predict/{client_ids[next(position) % n_clients]}", headers=headers).raise_for_status()
+
+    record("predict_endpoint", predict_one, 1, max_rounds=requests, teardown=main.log_writer.flush)
+    for size in sizes:
+        body = {"client_ids": client_ids[:size]}
+        record("predict_batch_endpoint", lambda: client.post("/predict/batch", json=body, headers=headers).raise_for_status(),
+               size, teardown=main.log_writer.flush)
+
+    for size in sizes:
+        writer = ApiLogWriter(sqlite_log_engine(), max_queue_size=size + 1, batch_size=500,
+                              snapshots=FeatureSnapshotStore())
+        logs = [{
+            "request_timestamp": datetime.now(), "client_id": client_id, "input_data": data,
+            "prediction_proba": 0.1, "prediction_decision": "Crédit Accordé",
+            "inference_time_ms": 1.0, "http_status_code": 200,
+        } for client_id, data in zip(client_ids[:size], records[:size])]
+
+        def write_logs():
+            writer.submit_many(logs)
+            writer.flush()
+        record("log_write", write_logs, size)
+
+    layout = SketchLayout.fit(scorer.feature_names, reference.to_numpy())
+    reference_counts = layout.count(reference.to_numpy())
+    for size in sizes:
+        current = clients.to_numpy()[:size]
+        record("drift_sketch", lambda: layout.compare(reference_counts, layout.count(current)), size)
+
+    if drift_columns > 0:
+        columns = list(clients.columns[:drift_columns])
+        for size in sizes:
+            # Les tests statistiques d'Evidently n'ont pas de sens sur quelques lignes
+            if not 10 <= size <= evidently_max_rows:
+                continue
+            reference_sample, current_sample = reference[columns].iloc[:size], clients[columns].iloc[:size]
+            record("drift_evidently", lambda: render_report_html(reference_sample, current_sample), size,
+                   max_rounds=min(max_rounds, 3), warmup=0)
+
+    import lightgbm
+    import sklearn
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "lightgbm": lightgbm.__version__,
+            "scikit-learn": sklearn.__version__,
+        },
+        "parameters": {
+            "sizes": sizes, "features": n_features, "estimators": n_estimators, "train_rows": train_rows,
+            "seed": seed, "engine": scorer.name, "drift_columns": drift_columns,
+        },
+        "results": results,
+    }
+
+
+# --- Comparaison avec une référence ---
+
+def compare_results(current: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Compare la médiane de chaque benchmark (nom, taille) à celle de la référence.
+    Statut : "regression" si elle dépasse la référence de plus de `tolerance`
+    (0.25 = +25 %), "improvement" si elle est plus rapide dans la même proportion,
+    "ok" sinon, "new" / "missing" pour les mesures présentes d'un seul côté.
+    """
+    baseline_results = {(r["name"], r["size"]): r for r in baseline["results"]}
+    current_results = {(r["name"], r["size"]): r for r in current["results"]}
+    rows = []
+    for key in list(current_results) + [key for key in baseline_results if key not in current_results]:
+        name, size = key
+        result, reference = current_results.get(key), baseline_results.get(key)
+        row = {"name": name, "size": size,
+               "baseline_median_s": reference["median_s"] if reference else None,
+               "median_s": result["median_s"] if result else None, "ratio": None}
+        if result is None:
+            row["status"] = "missing"
+        elif reference is None:
+            row["status"] = "new"
+        else:
+            row["ratio"] = result["median_s"] / reference["median_s"]
+            if row["ratio"] > 1 + tolerance:
+                row["status"] = "regression"
+            elif row["ratio"] < 1 / (1 + tolerance):
+                row["status"] = "improvement"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+def print_comparison(rows: list):
+    print(f"\n  {'benchmark':<24}{'taille':>8}{'référence':>14}{'actuel':>14}{'ratio':>8}  statut")
+    for row in rows:
+        baseline = f"{row['baseline_median_s'] * 1000:.3f} ms" if row["baseline_median_s"] is not None else "-"
+        current = f"{row['median_s'] * 1000:.3f} ms" if row["median_s"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        print(f"  {row['name']:<24}{row['size']:>8}{baseline:>14}{current:>14}{ratio:>8}  {row['status']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process benchmark of the scoring hot path (no database, no server).")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated data sizes (rows, clients, logs).")
+    parser.add_argument("--features", type=int, default=568, help="Number of features of the synthetic model.")
+    parser.add_argument("--estimators", type=int, default=1000, help="Number of trees of the synthetic model.")
+    parser.add_argument("--train-rows", type=int, default=10000, help="Number of synthetic rows used to train the model.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engine", default="numpy", help="Inference engine: numpy or pipeline.")
+    parser.add_argument("--max-rounds", type=int, default=50, help="Maximum number of measured runs per benchmark.")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="Measurement time budget per benchmark.")
+    parser.add_argument("--requests", type=int, default=200, help="Number of /predict requests measured.")
+    parser.add_argument("--drift-columns", type=int, default=20, help="Columns of the Evidently report (0 to skip it).")
+    parser.add_argument("--evidently-max-rows", type=int, default=1000, help="Largest size used for the Evidently report.")
+    parser.add_argument("--cache-dir", default=None, help="Directory where the synthetic model is cached.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with the results stored in this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a regression (0.25 = +25%%).")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        [int(size) for size in args.sizes.split(",")], n_features=args.features, n_estimators=args.estimators,
+        train_rows=args.train_rows, seed=args.seed, engine_name=args.engine, max_rounds=args.max_rounds,
+        max_seconds=args.max_seconds, requests=args.requests, drift_columns=args.drift_columns,
+        evidently_max_rows=args.evidently_max_rows, cache_dir=args.cache_dir,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}.")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != results["parameters"]:
+            print("ATTENTION : la référence a été mesurée avec d'autres paramètres.")
+        if baseline.get("environment") != results["environment"]:
+            print("ATTENTION : la référence a été mesurée dans un autre environnement.")
+        rows = compare_results(results, baseline, args.tolerance)
+        print_comparison(rows)
+        regressions = [row for row in rows if row["status"] == "regression"]
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) de plus de {args.tolerance:.0%}.")
+            sys.exit(1)
@@ -0,0 +1,44 @@
+# src/scripts/compress_drift_reports.py
+
+import argparse
+import traceback
+
+from src.database.database import engine, SessionLocal
+from src.database import models
+from src.api.report_storage import compress_html
+from src.scripts.init_db import ensure_columns
+
+def compress_reports() -> dict:
+    """
+    Convertit les rapports enregistrés en HTML brut vers le stockage compressé
+    (segments dédupliqués). Chaque rapport est traité dans sa propre transaction :
+    le script peut être interrompu puis relancé.
+    """
+    converted, bytes_before = 0, 0
+    with SessionLocal() as db:
+        report_ids = [report_id for (report_id,) in db.query(models.DriftReport.id)
+                      .filter(models.DriftReport.segments.is_(None)).order_by(models.DriftReport.id)]
+        for report_id in report_ids:
+            report = db.get(models.DriftReport, report_id)
+            bytes_before += len(report.report_html.encode("utf-8"))
+            for column, value in compress_html(db, report.report_html).items():
+                setattr(report, column, value)
+            report.report_html = None
+            db.commit()
+            converted += 1
+            print(f"Rapport #{report_id} compressé.")
+    return {"converted": converted, "html_bytes": bytes_before}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress drift reports stored as raw HTML.")
+    parser.parse_args()
+
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        ensure_columns()
+        result = compress_reports()
+        print(f"{result['converted']} rapports compressés ({result['html_bytes'] / 1e6:.1f} Mo de HTML).")
+    except Exception as e:
+        print(f"\nUNE ERREUR CRITIQUE EST SURVENUE.")
+        print(f"Erreur : {e}")
+        traceback.print_exc()
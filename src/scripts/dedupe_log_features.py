@@ -0,0 +1,61 @@
+# src/scripts/dedupe_log_features.py
+
+import argparse
+import time
+import traceback
+
+from sqlalchemy import bindparam, func, select, update
+
+from src.database.database import engine
+from src.database import models
+from src.database.feature_snapshots import FeatureSnapshotStore
+from src.scripts.init_db import ensure_columns
+
+def dedupe_logs(chunk_size=5000) -> int:
+    """
+    Déplace les features copiées dans les logs (`input_data`) vers `feature_snapshots`
+    et ne garde dans chaque log que l'empreinte du snapshot (`feature_hash`).
+    Chaque chunk est traité dans sa propre transaction et sort du filtre
+    `input_data IS NOT NULL` : le script peut être interrompu puis relancé.
+    Retourne le nombre de logs traités.
+    """
+    table = models.ApiLog.__table__
+    pending = select(table.c.id, table.c.request_timestamp, table.c.input_data) \
+        .where(table.c.input_data.isnot(None)).limit(chunk_size)
+    statement = update(table) \
+        .where(table.c.id == bindparam("log_id"), table.c.request_timestamp == bindparam("timestamp")) \
+        .values(input_data=None, feature_hash=bindparam("digest"))
+    store = FeatureSnapshotStore()
+    deduped, start = 0, time.perf_counter()
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(pending).all()
+            if not rows:
+                break
+            prepared, new_snapshots = store.prepare(connection, [{"input_data": data} for _, _, data in rows])
+            connection.execute(statement, [
+                {"log_id": log_id, "timestamp": timestamp, "digest": row["feature_hash"]}
+                for (log_id, timestamp, _), row in zip(rows, prepared)
+            ])
+        store.remember(new_snapshots)
+        deduped += len(rows)
+        print(f"[{table.name}] {deduped} logs traités ({deduped / (time.perf_counter() - start):,.0f} logs/s)")
+    return deduped
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move logged input features to the deduplicated feature_snapshots table.")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Number of logs updated per transaction.")
+    args = parser.parse_args()
+
+    try:
+        # Table feature_snapshots et colonne feature_hash sur une base créée avant les snapshots
+        models.Base.metadata.create_all(bind=engine)
+        ensure_columns()
+        deduped = dedupe_logs(args.chunk_size)
+        with engine.connect() as connection:
+            snapshots = connection.scalar(select(func.count()).select_from(models.FeatureSnapshot))
+        print(f"Déduplication terminée : {deduped} logs traités, {snapshots} snapshots de features en base.")
+    except Exception as e:
+        print(f"\nUNE ERREUR CRITIQUE EST SURVENUE.")
+        print(f"Erreur : {e}")
+        traceback.print_exc()
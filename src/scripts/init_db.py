@@ -1,24 +1,67 @@
+
 # src/scripts/init_db.py
 
 import pandas as pd
 import numpy as np
 import argparse
+import csv
+import hashlib
+import io
+import json
 import os
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
 
 from src.database.database import engine, SessionLocal
-from src.database import models
+from src.database import models, partitions
+from src.database.packed_features import get_or_create_manifest, infer_feature_types, pack_matrix
 from src.config import settings
 from src.api.security import get_password_hash
 
-def init_db(train_file_path, test_file_path):
+LOADERS = ["copy", "orm"]
+MODES = ["reset", "upsert"]
+
+def init_db(train_file_path, test_file_path, loader="copy", workers=2, chunk_size=5000, mode="reset"):
     """
     Crée toutes les tables et charge les données initiales.
+
+    - mode="reset"  : les tables sont supprimées puis recréées avant un chargement complet.
+      - loader="copy" : chaque chunk est sérialisé en JSON de façon vectorisée puis
+        envoyé à PostgreSQL avec `COPY ... FROM STDIN` ; les fichiers d'entraînement et
+        de test sont chargés en parallèle dans des processus séparés.
+      - loader="orm"  : chargement historique ligne à ligne avec `bulk_insert_mappings`.
+      Les deux loaders produisent exactement le même contenu de tables.
+    - mode="upsert" : aucune table n'est supprimée (les logs et rapports de dérive sont
+      conservés) ; seules les lignes nouvelles ou dont l'empreinte a changé sont écrites,
+      et un chargement interrompu reprend au dernier chunk validé.
     """
-    print("Création des tables via les modèles SQLAlchemy...")
-    models.Base.metadata.drop_all(bind=engine)
-    models.Base.metadata.create_all(bind=engine)
-    print("Tables créées avec succès.")
+    if loader not in LOADERS:
+        raise ValueError(f"Loader inconnu : '{loader}'. Valeurs possibles : {LOADERS}")
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : '{mode}'. Valeurs possibles : {MODES}")
+
+    if mode == "reset":
+        print("Création des tables via les modèles SQLAlchemy...")
+        models.Base.metadata.drop_all(bind=engine)
+        models.Base.metadata.create_all(bind=engine)
+        print("Tables créées avec succès.")
+    else:
+        print("Mise à jour du schéma (tables et colonnes manquantes)...")
+        models.Base.metadata.create_all(bind=engine)
+        ensure_columns()
+
+    # Partitions de `api_logs` : par défaut, courante et suivantes
+    with engine.begin() as connection:
+        if partitions.is_partitioned(connection):
+            partitions.ensure_partitions(connection, settings.api_logs_partition_interval, settings.api_logs_partitions_ahead)
+        else:
+            print("ATTENTION : la table api_logs n'est pas partitionnée "
+                  "(lancez python -m src.scripts.manage_partitions --convert).")
 
     db = SessionLocal()
     try:
@@ -29,50 +72,291 @@ def init_db(train_file_path, test_file_path):
             db.commit()
             print(f"Utilisateur de test '{settings.api_user}' créé.")
 
-        # --- Chargement des données d'entraînement ---
-        if db.query(models.TrainingData).count() == 0:
-            print(f"Chargement du fichier {os.path.basename(train_file_path)}...")
-            chunk_size = 5000
-            for chunk in pd.read_csv(train_file_path, chunksize=chunk_size):
-                chunk.replace([np.inf, -np.inf], np.nan, inplace=True)
-                
-                records_to_insert = []
-                for index, row in chunk.iterrows():
-                    # Sépare les colonnes de features des autres
-                    features = row.drop(['SK_ID_CURR', 'TARGET']).where(pd.notna(row), None).to_dict()
-                    
-                    record = {
-                        "sk_id_curr": row['SK_ID_CURR'],
-                        "target": row['TARGET'],
-                        "data": features
-                    }
-                    records_to_insert.append(record)
-                
-                db.bulk_insert_mappings(models.TrainingData, records_to_insert)
-                db.commit()
-            print("Données d'entraînement chargées.")
-
-        # --- Chargement des données de test ---
-        if db.query(models.ClientDataForTest).count() == 0:
-            print(f"Chargement du fichier {os.path.basename(test_file_path)}...")
-            chunk_size = 5000
-            for chunk in pd.read_csv(test_file_path, chunksize=chunk_size):
-                chunk.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-                records_to_insert = []
-                for index, row in chunk.iterrows():
-                    # Sépare les colonnes de features des autres
-                    features = row.drop(['SK_ID_CURR']).where(pd.notna(row), None).to_dict()
-                    
-                    record = {
-                        "sk_id_curr": row['SK_ID_CURR'],
-                        "data": features
-                    }
-                    records_to_insert.append(record)
-                
-                db.bulk_insert_mappings(models.ClientDataForTest, records_to_insert)
-                db.commit()
-            print("Données de test chargées.")
+        # --- Fichiers à charger (en mode reset, seulement si la table est vide) ---
+        tasks = []
+        if mode == "upsert" or db.query(models.TrainingData).count() == 0:
+            tasks.append(("entraînement", models.TrainingData, train_file_path))
+        if mode == "upsert" or db.query(models.ClientDataForTest).count() == 0:
+            tasks.append(("test", models.ClientDataForTest, test_file_path))
+    finally:
+        db.close()
+
+    if loader == "orm" and mode == "reset":
+        for label, model, file_path in tasks:
+            load_csv_orm(model, file_path, chunk_size)
+            print(f"Données de {label} chargées.")
+        return
+
+    load_function = upsert_csv if mode == "upsert" else load_csv_copy
+    start = time.perf_counter()
+    # Les connexions héritées du processus parent ne doivent pas être réutilisées par les workers
+    engine.dispose()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(tasks) or 1))) as executor:
+        futures = [
+            (label, executor.submit(load_function, model.__tablename__, file_path, label, chunk_size))
+            for label, model, file_path in tasks
+        ]
+        total_rows = 0
+        for label, future in futures:
+            total_rows += future.result()
+            print(f"Données de {label} chargées.")
+    elapsed = time.perf_counter() - start
+    if total_rows:
+        print(f"{total_rows} lignes traitées en {elapsed:.1f} s ({total_rows / elapsed:,.0f} lignes/s).")
+
+def ensure_columns():
+    """
+    Ajoute les colonnes introduites après la création des tables : `content_hash`,
+    `features` et `manifest_id` (données clients), `sample_key` (échantillonnage
+    des rapports de dérive, une valeur aléatoire par ligne existante),
+    `feature_hash` (features des logs dédupliquées dans `feature_snapshots`),
+    `cached` et `model_version` (cache des prédictions, version du modèle des logs),
+    `parameters`, `owner` et `heartbeat_at` (jobs de rapports) et le stockage compressé des rapports,
+    ainsi que les index associés.
+    """
+    with engine.begin() as connection:
+        for model in (models.TrainingData, models.ClientDataForTest):
+            connection.execute(text(
+                f"ALTER TABLE {model.__tablename__} "
+                f"ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32), "
+                f"ADD COLUMN IF NOT EXISTS features BYTEA, "
+                f"ADD COLUMN IF NOT EXISTS manifest_id INTEGER REFERENCES feature_manifests (id)"
+            ))
+        connection.execute(text(
+            f"ALTER TABLE {models.ApiLog.__tablename__} "
+            f"ALTER COLUMN input_data DROP NOT NULL, "
+            f"ADD COLUMN IF NOT EXISTS feature_hash VARCHAR(32), "
+            f"ADD COLUMN IF NOT EXISTS cached BOOLEAN NOT NULL DEFAULT false, "
+            f"ADD COLUMN IF NOT EXISTS model_version VARCHAR(32)"
+        ))
+        for model in (models.TrainingData, models.ApiLog):
+            connection.execute(text(
+                f"ALTER TABLE {model.__tablename__} "
+                f"ADD COLUMN IF NOT EXISTS sample_key DOUBLE PRECISION NOT NULL DEFAULT random()"
+            ))
+            for index in model.__table__.indexes:
+                index.create(connection, checkfirst=True)
+        # Remplacé par l'index (request_timestamp, id)
+        connection.execute(text("DROP INDEX IF EXISTS ix_api_logs_request_timestamp"))
+        connection.execute(text(
+            f"ALTER TABLE {models.DriftReportJob.__tablename__} "
+            f"ADD COLUMN IF NOT EXISTS parameters JSON, "
+            f"ADD COLUMN IF NOT EXISTS owner VARCHAR, "
+            f"ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITHOUT TIME ZONE"
+        ))
+        connection.execute(text(
+            f"ALTER TABLE {models.DriftReport.__tablename__} "
+            f"ALTER COLUMN report_html DROP NOT NULL, "
+            f"ADD COLUMN IF NOT EXISTS segments JSON, "
+            f"ADD COLUMN IF NOT EXISTS html_size INTEGER, "
+            f"ADD COLUMN IF NOT EXISTS html_crc32 BIGINT, "
+            f"ADD COLUMN IF NOT EXISTS etag VARCHAR(32)"
+        ))
+
+# --- Préparation des lignes ---
+
+def build_json_records(chunk: pd.DataFrame, drop_columns) -> list:
+    """
+    Sérialise les features de chaque ligne en JSON, sans boucle `iterrows`.
+
+    Le passage en `object` convertit les valeurs NumPy en types Python natifs
+    (float, int, bool) colonne par colonne, et les NaN deviennent `null`. Le texte
+    est identique à celui de l'ancien chargement ligne à ligne (`iterrows`) pour les
+    fichiers ayant au moins une colonne texte ou booléenne (cas des CSV du projet).
+    Pour un chunk entièrement numérique, `iterrows` passait chaque ligne en float
+    (`1.0` au lieu de `1`) et écrivait `NaN`, refusé par PostgreSQL : les entiers
+    restent ici des entiers et les valeurs manquantes `null` (l'empreinte de ces
+    lignes diffère donc de celle d'un ancien chargement, et `--mode upsert` les
+    réécrit une fois).
+    """
+    features = chunk.drop(columns=drop_columns).astype(object)
+    features = features.where(features.notna(), None)
+    return [json.dumps(record) for record in features.to_dict(orient="records")]
+
+def content_hash(data_json: str, target=None) -> str:
+    """Empreinte d'une ligne : JSON des features (et cible pour les données d'entraînement)."""
+    payload = data_json if target is None else f"{target}|{data_json}"
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+def _table_layout(table_name):
+    """Colonnes de la table et colonnes du CSV à exclure du JSON."""
+    if table_name == models.TrainingData.__tablename__:
+        return ["sk_id_curr", "target", "data", "content_hash", "features", "manifest_id"], ['SK_ID_CURR', 'TARGET']
+    return ["sk_id_curr", "data", "content_hash", "features", "manifest_id"], ['SK_ID_CURR']
+
+def create_manifest(chunk: pd.DataFrame, drop_columns) -> int:
+    """Manifeste du stockage packed, déduit des colonnes (et types) du premier chunk lu."""
+    features = chunk.drop(columns=drop_columns)
+    with engine.begin() as connection:
+        return get_or_create_manifest(connection, list(features.columns), infer_feature_types(features))
+
+def _packed_features(chunk: pd.DataFrame, drop_columns) -> list:
+    """Vecteurs float64 binaires des features (NaN pour les valeurs manquantes)."""
+    return pack_matrix(chunk.drop(columns=drop_columns).to_numpy(dtype=np.float64, na_value=np.nan))
+
+def _chunk_rows(chunk: pd.DataFrame, with_target: bool, manifest_id: int) -> list:
+    """Lignes prêtes pour COPY : (sk_id_curr, [target], data, content_hash, features, manifest_id)."""
+    chunk.replace([np.inf, -np.inf], np.nan, inplace=True)
+    drop_columns = ['SK_ID_CURR', 'TARGET'] if with_target else ['SK_ID_CURR']
+    # Les colonnes entières peuvent être lues en float par pandas (ex. "1.0")
+    ids = chunk['SK_ID_CURR'].astype("int64").tolist()
+    records = build_json_records(chunk, drop_columns)
+    # Format hexadécimal de BYTEA, accepté tel quel par COPY en CSV
+    packed = ["\\x" + blob.hex() for blob in _packed_features(chunk, drop_columns)]
+    if with_target:
+        targets = chunk['TARGET'].astype("int64").tolist()
+        return [(i, t, r, content_hash(r, t), p, manifest_id) for i, t, r, p in zip(ids, targets, records, packed)]
+    return [(i, r, content_hash(r), p, manifest_id) for i, r, p in zip(ids, records, packed)]
+
+def _copy_rows(cursor, table_name, columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+# --- Chargement via COPY ---
+
+def load_csv_copy(table_name, file_path, label="", chunk_size=5000) -> int:
+    """
+    Charge un CSV dans `training_data` ou `test_data` avec `COPY FROM STDIN` (format CSV).
+    Exécuté dans un processus dédié ; retourne le nombre de lignes chargées.
+    """
+    columns, drop_columns = _table_layout(table_name)
+
+    print(f"[{label}] Chargement du fichier {os.path.basename(file_path)} (COPY)...")
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        rows, start, manifest_id = 0, time.perf_counter(), None
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            if manifest_id is None:
+                manifest_id = create_manifest(chunk, drop_columns)
+            _copy_rows(cursor, table_name, columns, _chunk_rows(chunk, 'TARGET' in drop_columns, manifest_id))
+            connection.commit()
+
+            rows += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"[{label}] {rows} lignes ({rows / elapsed:,.0f} lignes/s)")
+        cursor.close()
+    finally:
+        connection.close()
+    return rows
+
+# --- Chargement incrémental (upsert) avec reprise ---
+
+def file_signature(file_path) -> str:
+    """Taille et date de modification : un point de reprise n'est valable que pour le même fichier."""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def upsert_csv(table_name, file_path, label="", chunk_size=5000) -> int:
+    """
+    Met à jour `training_data` ou `test_data` à partir d'un CSV, sans rien supprimer.
+
+    Chaque chunk est copié dans une table temporaire puis fusionné avec
+    `INSERT ... ON CONFLICT (sk_id_curr) DO UPDATE`, uniquement pour les lignes
+    dont l'empreinte `content_hash` a changé. Le point de reprise est mis à jour
+    dans la même transaction que le chunk : après un arrêt brutal, le chargement
+    repart du premier chunk non validé. Les clients absents du CSV sont conservés.
+    Retourne le nombre de lignes lues dans le fichier lors de cet appel.
+    """
+    columns, drop_columns = _table_layout(table_name)
+    with_target = 'TARGET' in drop_columns
+    signature = file_signature(file_path)
+    checkpoint_table = models.LoadCheckpoint.__table__
+
+    with engine.connect() as connection:
+        checkpoint = connection.execute(
+            select(checkpoint_table).where(checkpoint_table.c.table_name == table_name)
+        ).first()
+    rows_done = 0
+    if checkpoint and checkpoint.file_signature == signature and checkpoint.chunk_size == chunk_size:
+        rows_done = checkpoint.rows_done
+        print(f"[{label}] Reprise du chargement après {rows_done} lignes.")
+
+    updates = [f"{column} = EXCLUDED.{column}" for column in columns if column != "sk_id_curr"]
+    merge_sql = (
+        f"INSERT INTO {table_name} ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM staging_{table_name} "
+        f"ON CONFLICT (sk_id_curr) DO UPDATE SET {', '.join(updates)} "
+        f"WHERE {table_name}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        f"OR {table_name}.features IS NULL "
+        f"RETURNING (xmax = 0)"
+    )
+
+    print(f"[{label}] Mise à jour depuis {os.path.basename(file_path)} (upsert)...")
+    rows, inserted, updated, start, manifest_id = 0, 0, 0, time.perf_counter(), None
+    # Les lignes déjà validées sont sautées sans être analysées (l'en-tête est conservé)
+    reader = pd.read_csv(file_path, chunksize=chunk_size, skiprows=range(1, rows_done + 1))
+    for chunk in reader:
+        if manifest_id is None:
+            manifest_id = create_manifest(chunk, drop_columns)
+        chunk_rows = _chunk_rows(chunk, with_target, manifest_id)
+        with engine.begin() as connection:
+            connection.execute(text(
+                f"CREATE TEMP TABLE staging_{table_name} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+            ))
+            cursor = connection.connection.cursor()
+            _copy_rows(cursor, f"staging_{table_name}", columns, chunk_rows)
+            written = [is_insert for (is_insert,) in connection.execute(text(merge_sql))]
+
+            rows_done += len(chunk)
+            values = {
+                "table_name": table_name, "file_path": file_path, "file_signature": signature,
+                "chunk_size": chunk_size, "rows_done": rows_done, "updated_at": datetime.now(),
+            }
+            connection.execute(
+                insert(checkpoint_table).values(**values)
+                .on_conflict_do_update(index_elements=["table_name"], set_=values)
+            )
+
+        rows += len(chunk)
+        inserted += sum(written)
+        updated += len(written) - sum(written)
+        elapsed = time.perf_counter() - start
+        print(f"[{label}] {rows_done} lignes ({inserted} ajoutées, {updated} modifiées, "
+              f"{rows / elapsed:,.0f} lignes/s)")
+
+    # Fichier entièrement traité : le prochain appel repartira du début
+    with engine.begin() as connection:
+        connection.execute(delete(checkpoint_table).where(checkpoint_table.c.table_name == table_name))
+    print(f"[{label}] {inserted} lignes ajoutées, {updated} modifiées, "
+          f"{rows - inserted - updated} inchangées.")
+    return rows
+
+# --- Chargement historique via l'ORM ---
+
+def load_csv_orm(model, file_path, chunk_size=5000):
+    """Chargement ligne à ligne avec `bulk_insert_mappings` (mode "orm")."""
+    with_target = model is models.TrainingData
+    drop_columns = ['SK_ID_CURR', 'TARGET'] if with_target else ['SK_ID_CURR']
+
+    print(f"Chargement du fichier {os.path.basename(file_path)}...")
+    db = SessionLocal()
+    try:
+        manifest_id = None
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            chunk.replace([np.inf, -np.inf], np.nan, inplace=True)
+            if manifest_id is None:
+                manifest_id = create_manifest(chunk, drop_columns)
+            packed = _packed_features(chunk, drop_columns)
+
+            records_to_insert = []
+            for (index, row), features_blob in zip(chunk.iterrows(), packed):
+                # Sépare les colonnes de features des autres
+                features = row.drop(drop_columns).where(pd.notna(row), None).to_dict()
+
+                record = {"sk_id_curr": row['SK_ID_CURR'], "data": features}
+                if with_target:
+                    record["target"] = row['TARGET']
+                    record["content_hash"] = content_hash(json.dumps(features), int(row['TARGET']))
+                else:
+                    record["content_hash"] = content_hash(json.dumps(features))
+                record["features"], record["manifest_id"] = features_blob, manifest_id
+                records_to_insert.append(record)
+
+            db.bulk_insert_mappings(model, records_to_insert)
+            db.commit()
     finally:
         db.close()
 
@@ -80,13 +364,19 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Initialize the database.")
     parser.add_argument("--train-file", default=settings.train_data_file, help="Path to the training data CSV.")
     parser.add_argument("--test-file", default=settings.test_data_file, help="Path to the test data CSV.")
+    parser.add_argument("--mode", choices=MODES, default="reset",
+                        help="reset: drop and reload every table; upsert: only write new or changed rows, resumable.")
+    parser.add_argument("--loader", choices=LOADERS, default="copy", help="Loading strategy (COPY or row-by-row ORM).")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes for the COPY loader.")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Number of CSV rows read per chunk.")
     args = parser.parse_args()
 
     print("Initialisation de la base de données...")
     try:
-        init_db(args.train_file, args.test_file)
+        init_db(args.train_file, args.test_file, loader=args.loader, workers=args.workers,
+                chunk_size=args.chunk_size, mode=args.mode)
         print("Initialisation terminée avec succès.")
     except Exception as e:
         print(f"\nUNE ERREUR CRITIQUE EST SURVENUE.")
         print(f"Erreur : {e}")
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
@@ -0,0 +1,185 @@
+# src/scripts/load_profiles.py
+
+import bisect
+import csv
+import itertools
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Profils de charge, utilisés par locustfile.py (ce module n'importe pas Locust)
+# Une étape : (durée en secondes, nombre d'utilisateurs, utilisateurs démarrés par seconde)
+Stage = Tuple[float, int, float]
+
+PROFILES = ("steady", "ramp", "spike", "soak")
+DEFAULT_DURATIONS = {"steady": 600, "ramp": 900, "spike": 600, "soak": 4 * 3600}
+
+
+class LoadTestSettings(BaseSettings):
+    """Paramètres du test de charge, lus dans les variables d'environnement LOAD_*."""
+    # Profil (steady, ramp, spike, soak) ; vide : nombre d'utilisateurs choisi dans Locust
+    profile: Optional[str] = None
+    # Nombre d'utilisateurs au pic du profil, durée totale (défaut selon le profil)
+    users: int = 50
+    duration_seconds: Optional[float] = None
+    spawn_rate: Optional[float] = None
+    # Source des ID clients : "db", "api" (GET /clients), "file:<chemin>" ou "range:<début>-<fin>"
+    client_ids: str = "db"
+    # Exposant de la loi de Zipf des ID demandés (0 : tirage uniforme)
+    zipf_s: float = 1.1
+    zipf_seed: Optional[int] = None
+    # Poids des tâches et taille des lots de /predict/batch
+    task_weights: str = "predict=20,batch=2,logs=2,clients=1"
+    batch_size: int = 50
+    # Temps de réflexion de chaque utilisateur entre deux requêtes (boucle fermée)
+    wait_min: float = 1.0
+    wait_max: float = 3.0
+    # Objectifs de service vérifiés à la fin du test
+    slo_p95_ms: float = 500.0
+    slo_p99_ms: float = 1000.0
+    slo_error_rate: float = 0.01
+    slo_min_rps: float = 0.0
+
+    model_config = SettingsConfigDict(env_prefix="LOAD_", env_file=".env", env_file_encoding="utf-8", extra="ignore")
+
+
+# --- Profils de charge ---
+
+def profile_stages(name: str, users: int, duration: Optional[float] = None, spawn_rate: Optional[float] = None) -> List[Stage]:
+    """
+    Étapes d'un profil, pour `users` utilisateurs au pic :
+    - steady : charge constante ;
+    - ramp   : montée en 5 paliers jusqu'au pic ;
+    - spike  : charge de fond (20 % du pic), pic soudain au milieu du test, puis retour au fond ;
+    - soak   : charge constante de longue durée (fuites mémoire, connexions, croissance des tables).
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Profil de charge inconnu : '{name}'. Valeurs possibles : {list(PROFILES)}")
+    duration = duration or DEFAULT_DURATIONS[name]
+    rate = spawn_rate or max(users / 10, 1.0)
+    if name in ("steady", "soak"):
+        return [(duration, users, rate)]
+    if name == "ramp":
+        return [(duration / 5, max(round(users * step / 5), 1), rate) for step in range(1, 6)]
+    base = max(users // 5, 1)
+    # Le pic est atteint en une seconde
+    return [(duration * 0.4, base, rate), (duration * 0.2, users, max(float(users), rate)), (duration * 0.4, base, rate)]
+
+def stage_at(stages: Sequence[Stage], run_time: float) -> Optional[Tuple[int, float]]:
+    """(utilisateurs, taux de démarrage) de l'étape en cours, ou None une fois le profil terminé."""
+    for end, (_, users, rate) in zip(itertools.accumulate(stage[0] for stage in stages), stages):
+        if run_time < end:
+            return users, rate
+    return None
+
+
+# --- Tirage des ID clients ---
+
+class ZipfSampler:
+    """
+    Tire des ID clients selon une loi de Zipf : le k-ième client le plus demandé l'est
+    proportionnellement à 1 / k^s, comme un trafic réel concentré sur quelques clients
+    (ce qui sollicite les caches). L'ordre de popularité est un mélange aléatoire des ID,
+    pour que les clients les plus demandés ne soient pas simplement les plus petits ID.
+    """
+
+    def __init__(self, ids: Sequence[int], s: float = 1.1, seed: Optional[int] = None):
+        if not ids:
+            raise ValueError("Aucun ID client à tirer.")
+        self._random = random.Random(seed)
+        self.ids = list(ids)
+        self._random.shuffle(self.ids)
+        self.s = s
+        self._cumulative = list(itertools.accumulate(1 / rank ** s for rank in range(1, len(self.ids) + 1)))
+
+    def sample(self) -> int:
+        position = bisect.bisect_right(self._cumulative, self._random.random() * self._cumulative[-1])
+        return self.ids[min(position, len(self.ids) - 1)]
+
+    def sample_many(self, count: int) -> List[int]:
+        return [self.sample() for _ in range(count)]
+
+
+def load_client_ids(source: str, host: Optional[str] = None, username: Optional[str] = None,
+                    password: Optional[str] = None) -> List[int]:
+    """
+    ID clients du test selon `source` :
+    - "db"               : table `test_data` (connexion directe à la BDD) ;
+    - "api"              : GET /clients de l'API testée (aucun accès BDD côté injecteur) ;
+    - "file:<chemin>"    : un ID par ligne, ou CSV avec une colonne SK_ID_CURR ;
+    - "range:<a>-<b>"    : ID consécutifs de a à b inclus.
+    """
+    kind, _, argument = source.partition(":")
+    if kind == "range":
+        start, _, end = argument.partition("-")
+        return list(range(int(start), int(end) + 1))
+    if kind == "file":
+        with open(argument, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        if rows and "SK_ID_CURR" in rows[0]:
+            column = rows[0].index("SK_ID_CURR")
+            return [int(row[column]) for row in rows[1:] if row]
+        return [int(row[0]) for row in rows if row and row[0].strip()]
+    if kind == "api":
+        import requests
+        response = requests.post(f"{host}/auth", data={"username": username, "password": password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = requests.get(f"{host}/clients", headers=headers)
+        response.raise_for_status()
+        return response.json()
+    if kind == "db":
+        from sqlalchemy import create_engine, text
+        from src.config import settings
+        engine = create_engine(settings.database_url)
+        try:
+            with engine.connect() as connection:
+                return [row[0] for row in connection.execute(text("SELECT sk_id_curr FROM test_data;"))]
+        finally:
+            engine.dispose()
+    raise ValueError(f"Source d'ID clients inconnue : '{source}' (db, api, file:<chemin>, range:<début>-<fin>).")
+
+def parse_task_weights(value: str) -> Dict[str, int]:
+    """"predict=20,batch=2" -> {"predict": 20, "batch": 2} (les poids nuls sont ignorés)."""
+    weights = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, weight = item.partition("=")
+            weights[name.strip()] = int(weight)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+# --- Objectifs de service (SLO) ---
+
+def evaluate_slo(rows: List[dict], total: dict, settings: LoadTestSettings) -> List[dict]:
+    """
+    Vérifie les objectifs de latence de chaque endpoint et du total, puis le taux
+    d'erreur et le débit du total. `rows` et `total` : {"name", "requests", "failures",
+    "p95_ms", "p99_ms", "rps"}. Retourne un contrôle par ligne : {"scope", "metric",
+    "value", "threshold", "passed"}.
+    """
+    checks = []
+
+    def check(scope, metric, value, threshold, passed):
+        checks.append({"scope": scope, "metric": metric, "value": value, "threshold": threshold, "passed": passed})
+
+    for row in rows + [total]:
+        if not row["requests"]:
+            continue
+        check(row["name"], "p95_ms", row["p95_ms"], settings.slo_p95_ms, row["p95_ms"] <= settings.slo_p95_ms)
+        check(row["name"], "p99_ms", row["p99_ms"], settings.slo_p99_ms, row["p99_ms"] <= settings.slo_p99_ms)
+    error_rate = total["failures"] / total["requests"] if total["requests"] else 0.0
+    check(total["name"], "error_rate", error_rate, settings.slo_error_rate, error_rate <= settings.slo_error_rate)
+    check(total["name"], "rps", total["rps"], settings.slo_min_rps, total["rps"] >= settings.slo_min_rps)
+    return checks
+
+def format_slo_report(checks: List[dict]) -> str:
+    lines = [f"{'endpoint':<28}{'métrique':<12}{'mesure':>12}{'objectif':>12}  statut"]
+    for c in checks:
+        comparison = ">=" if c["metric"] == "rps" else "<="
+        lines.append(f"{c['scope']:<28}{c['metric']:<12}{c['value']:>12.3f}{comparison:>4}{c['threshold']:>8.3f}  "
+                     f"{'OK' if c['passed'] else 'ÉCHEC'}")
+    passed = all(c["passed"] for c in checks)
+    lines.append(f"SLO : {'RÉUSSI' if passed else 'ÉCHOUÉ'} ({sum(not c['passed'] for c in checks)} objectif(s) manqué(s))")
+    return "\n".join(lines)
@@ -1,10 +1,10 @@
 # src/scripts/locustfile.py
 
-import random
 import os
 import sys
-from locust import HttpUser, task, between, events
-from sqlalchemy import create_engine, text
+from locust import HttpUser, LoadTestShape, between, events
+from locust.exception import StopUser
+from locust.runners import WorkerRunner
 
 # --- Bloc d'initialisation du chemin ---
 # Permet de lancer le script tout en conservant les imports absolus
@@ -12,76 +12,147 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 sys.path.insert(0, PROJECT_ROOT)
 
 from src.config import settings
+from src.scripts.load_profiles import (
+    LoadTestSettings, ZipfSampler, evaluate_slo, format_slo_report, load_client_ids, parse_task_weights, profile_stages,
+    stage_at,
+)
 
-# --- Variable globale pour stocker les ID clients ---
-# Cette liste sera remplie une seule fois au début du test.
-CLIENT_IDS = []
+# Paramètres du test (variables d'environnement LOAD_*, voir load_profiles.py)
+load_settings = LoadTestSettings()
+
+# --- Tirage des ID clients ---
+# Le tirage est préparé une seule fois au début du test.
+CLIENT_SAMPLER = None
 
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
     """
     Cette fonction est exécutée une seule fois au démarrage du test Locust.
-    Elle se connecte à la BDD pour récupérer tous les ID clients.
+    Elle charge les ID clients depuis la source choisie (BDD, API, fichier ou plage).
     """
-    print("--- Démarrage du test : Récupération des ID clients depuis la BDD ---")
+    print(f"--- Démarrage du test : Récupération des ID clients (source : {load_settings.client_ids}) ---")
     try:
-        engine = create_engine(settings.database_url)
-        with engine.connect() as connection:
-            query = text("SELECT sk_id_curr FROM test_data;")
-            result = connection.execute(query)
-            # On stocke les IDs dans la variable globale
-            global CLIENT_IDS
-            CLIENT_IDS = [row[0] for row in result]
-        
-        if CLIENT_IDS:
-            print(f"--- {len(CLIENT_IDS)} ID clients chargés avec succès. Prêt à lancer le test. ---")
+        client_ids = load_client_ids(
+            load_settings.client_ids, host=environment.host,
+            username=settings.api_user, password=settings.api_password
+        )
+        global CLIENT_SAMPLER
+        if client_ids:
+            CLIENT_SAMPLER = ZipfSampler(client_ids, load_settings.zipf_s, load_settings.zipf_seed)
+            print(f"--- {len(client_ids)} ID clients chargés (loi de Zipf, s={load_settings.zipf_s}). Prêt à lancer le test. ---")
         else:
             print("--- ATTENTION : Aucun ID client n'a été chargé. Le test de prédiction échouera. ---")
 
     except Exception as e:
-        print(f"--- ERREUR CRITIQUE : Impossible de se connecter à la BDD pour charger les ID clients : {e} ---")
+        print(f"--- ERREUR CRITIQUE : Impossible de charger les ID clients : {e} ---")
         # On arrête le test si on ne peut pas charger les données nécessaires
         environment.runner.quit()
 
 
+# --- Tâches ---
+# Chaque tâche reçoit l'utilisateur virtuel ; leur poids se règle avec LOAD_TASK_WEIGHTS.
+
+def predict(user):
+    """Prédiction pour un client (trafic de scoring)."""
+    # On s'assure que la liste des clients a été chargée
+    if CLIENT_SAMPLER is None:
+        return
+    # L'argument `name` permet de regrouper les statistiques dans l'interface Locust
+    user.client.post(f"/predict/{CLIENT_SAMPLER.sample()}", headers=user.headers, name="/predict/[client_id]")
+
+def predict_batch(user):
+    """Scoring d'un lot de clients en un appel."""
+    if CLIENT_SAMPLER is None:
+        return
+    user.client.post(
+        "/predict/batch", json={"client_ids": CLIENT_SAMPLER.sample_many(load_settings.batch_size)},
+        headers=user.headers, name="/predict/batch"
+    )
+
+def read_logs(user):
+    """Lecture du dashboard : dernière page des logs, puis la page suivante."""
+    response = user.client.get("/api-logs?limit=100", headers=user.headers, name="/api-logs")
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor:
+        user.client.get("/api-logs", params={"limit": 100, "cursor": cursor}, headers=user.headers, name="/api-logs")
+
+def read_log_stats(user):
+    """Agrégats de l'onglet Performance du dashboard."""
+    user.client.get("/api-logs/stats", headers=user.headers, name="/api-logs/stats")
+
+def list_clients(user):
+    """Liste des clients (sélecteur du dashboard)."""
+    user.client.get("/clients", headers=user.headers, name="/clients")
+
+TASKS = {"predict": predict, "batch": predict_batch, "logs": read_logs, "stats": read_log_stats, "clients": list_clients}
+
+
 class APIUser(HttpUser):
     """
-    Utilisateur virtuel qui simule le comportement d'un client de l'API.
+    Utilisateur virtuel qui simule le comportement d'un client de l'API et du dashboard.
+    Boucle fermée : chaque utilisateur attend sa réponse, puis un temps de réflexion.
     """
-    wait_time = between(1, 3)  # Temps d'attente aléatoire entre 1 et 3 secondes entre chaque tâche
-    token = None
-    
+    wait_time = between(load_settings.wait_min, load_settings.wait_max)
+    tasks = {TASKS[name]: weight for name, weight in parse_task_weights(load_settings.task_weights).items()}
+    headers = {}
+
     def on_start(self):
         """
         Appelé une fois au démarrage de chaque utilisateur virtuel pour s'authentifier.
         """
         if settings.api_user and settings.api_password:
             response = self.client.post(
-                "/auth", 
+                "/auth",
                 data={"username": settings.api_user, "password": settings.api_password}
             )
             if response.status_code == 200:
-                self.token = response.json()["access_token"]
-            else:
-                print(f"Échec de l'authentification pour un utilisateur Locust. Statut : {response.status_code}")
+                self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+                return
+            print(f"Échec de l'authentification pour un utilisateur Locust. Statut : {response.status_code}")
         else:
             print("API_USER ou API_PASSWORD non configuré. L'utilisateur ne peut pas s'authentifier.")
+        # Un utilisateur non authentifié ne lance aucune tâche
+        raise StopUser()
 
-    @task
-    def get_prediction(self):
-        """
-        Tâche principale : appeler l'endpoint de prédiction avec un ID client aléatoire.
-        """
-        # On s'assure que l'utilisateur est bien authentifié ET que la liste des clients a été chargée
-        if self.token and CLIENT_IDS:
-            # Choisit un ID client au hasard dans la liste globale
-            random_client_id = random.choice(CLIENT_IDS)
-            
-            headers = {"Authorization": f"Bearer {self.token}"}
-            
-            # L'argument `name` permet de regrouper les statistiques dans l'interface Locust
-            self.client.post(
-                f"/predict/{random_client_id}", 
-                headers=headers, 
-                name="/predict/[client_id]"
-            )
+
+# --- Profil de charge (LOAD_PROFILE) ---
+# Sans profil, le nombre d'utilisateurs se règle dans Locust (-u / -r ou interface web).
+if load_settings.profile:
+    class ProfileShape(LoadTestShape):
+        """Enchaîne les étapes du profil choisi, puis arrête le test."""
+        schedule = profile_stages(
+            load_settings.profile, load_settings.users, load_settings.duration_seconds, load_settings.spawn_rate
+        )
+
+        def tick(self):
+            return stage_at(self.schedule, self.get_run_time())
+
+
+# --- Bilan des objectifs de service ---
+
+def stats_row(name, entry) -> dict:
+    return {
+        "name": name,
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "p95_ms": entry.get_response_time_percentile(0.95) or 0.0,
+        "p99_ms": entry.get_response_time_percentile(0.99) or 0.0,
+        "rps": entry.total_rps,
+    }
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    """
+    Affiche le bilan des SLO (p95 / p99 par endpoint, taux d'erreur, débit) et fait
+    échouer le processus Locust (code de sortie 1) si un objectif est manqué.
+    """
+    # En mode distribué, seul le master a les statistiques agrégées
+    stats = environment.stats
+    if isinstance(environment.runner, WorkerRunner) or stats.total.num_requests == 0:
+        return
+    rows = [stats_row(f"{method} {name}", entry) for (name, method), entry in sorted(stats.entries.items())]
+    checks = evaluate_slo(rows, stats_row("Total", stats.total), load_settings)
+    print("\n--- Bilan des objectifs de service (SLO) ---")
+    print(format_slo_report(checks))
+    if not all(check["passed"] for check in checks):
+        environment.process_exit_code = 1
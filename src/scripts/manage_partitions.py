@@ -0,0 +1,51 @@
+# src/scripts/manage_partitions.py
+
+import argparse
+import traceback
+
+from src.database.database import engine
+from src.database import models, partitions
+from src.config import settings
+from src.scripts.init_db import ensure_columns
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming api_logs partitions and apply the retention policy.")
+    parser.add_argument("--convert", action="store_true",
+                        help="Convert an existing unpartitioned api_logs table (rows and ids are kept).")
+    parser.add_argument("--interval", choices=partitions.PARTITION_INTERVALS, default=settings.api_logs_partition_interval)
+    parser.add_argument("--ahead", type=int, default=settings.api_logs_partitions_ahead,
+                        help="Number of upcoming partitions to create.")
+    parser.add_argument("--retention-days", type=int, default=settings.api_logs_retention_days,
+                        help="Drop partitions older than this many days (0 = keep everything).")
+    parser.add_argument("--archive-dir", default=settings.api_logs_archive_dir,
+                        help="Archive partitions to Parquet in this directory before dropping them.")
+    parser.add_argument("--list", action="store_true", help="Only list the existing partitions.")
+    args = parser.parse_args()
+
+    try:
+        if args.convert:
+            # Colonnes ajoutées depuis la création de la table (ex. sample_key), à recopier
+            models.Base.metadata.create_all(bind=engine)
+            ensure_columns()
+            with engine.begin() as connection:
+                if partitions.is_partitioned(connection):
+                    print("La table api_logs est déjà partitionnée.")
+                else:
+                    copied = partitions.convert_to_partitioned(connection, args.interval, args.ahead)
+                    print(f"Table api_logs partitionnée : {copied} lignes recopiées.")
+
+        if not args.list:
+            manager = partitions.LogPartitionManager(
+                engine, args.interval, args.ahead, args.retention_days, args.archive_dir
+            )
+            result = manager.run_once()
+            print(f"{len(result['created'])} partitions créées : {', '.join(result['created']) or '-'}")
+            print(f"{len(result['dropped'])} partitions supprimées : {', '.join(result['dropped']) or '-'}")
+
+        with engine.connect() as connection:
+            for name, start, end in partitions.list_partitions(connection):
+                print(f"{name:24}{start:%Y-%m-%d} -> {end:%Y-%m-%d}")
+    except Exception as e:
+        print(f"\nUNE ERREUR CRITIQUE EST SURVENUE.")
+        print(f"Erreur : {e}")
+        traceback.print_exc()
@@ -0,0 +1,88 @@
+# src/scripts/migrate_features.py
+
+import argparse
+import time
+import traceback
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+
+from src.database.database import engine
+from src.database import models
+from src.database.packed_features import get_or_create_manifest, infer_types_from_records, pack_matrix
+from src.scripts.init_db import ensure_columns
+
+TABLES = {
+    models.TrainingData.__tablename__: models.TrainingData,
+    models.ClientDataForTest.__tablename__: models.ClientDataForTest,
+}
+
+def migrate_table(model, chunk_size=5000) -> dict:
+    """
+    Remplit les colonnes `features` / `manifest_id` à partir du JSON `data`.
+
+    Le manifeste reprend l'ordre des clés du premier client et les types observés
+    sur les premières lignes. Seules les lignes dont `features` est vide sont traitées
+    (par ordre de `sk_id_curr`, chaque chunk dans sa propre transaction) : le script
+    peut être interrompu puis relancé. Une ligne dont les clés diffèrent du manifeste
+    est laissée en JSON, pour ne pas changer la sémantique "feature absente = 0".
+    La colonne `data` est conservée (logs, rapports de dérive, mode FEATURE_STORAGE=json).
+    """
+    table = model.__table__
+    pending = select(table.c.sk_id_curr, table.c.data).where(table.c.features.is_(None)).order_by(table.c.sk_id_curr)
+
+    with engine.connect() as connection:
+        sample = connection.execute(pending.limit(1000)).all()
+    if not sample:
+        return {"migrated": 0, "skipped": 0}
+    records = [data for _, data in sample]
+    feature_names = list(records[0].keys())
+    with engine.begin() as connection:
+        manifest_id = get_or_create_manifest(connection, feature_names, infer_types_from_records(feature_names, records))
+
+    statement = update(table).where(table.c.sk_id_curr == bindparam("client_id")) \
+                             .values(features=bindparam("packed"), manifest_id=manifest_id)
+    migrated, skipped, last_id, start = 0, 0, None, time.perf_counter()
+    key_set = set(feature_names)
+    while True:
+        query = pending.limit(chunk_size)
+        if last_id is not None:
+            query = query.where(table.c.sk_id_curr > last_id)
+        with engine.begin() as connection:
+            rows = connection.execute(query).all()
+            if not rows:
+                break
+            last_id = rows[-1].sk_id_curr
+            read = len(rows)
+            rows = [(client_id, data) for client_id, data in rows if data.keys() == key_set]
+            skipped += read - len(rows)
+            if rows:
+                # None -> NaN, booléens -> 0.0 / 1.0
+                matrix = np.array([[data[name] for name in feature_names] for _, data in rows], dtype=np.float64)
+                connection.execute(statement, [
+                    {"client_id": client_id, "packed": packed}
+                    for (client_id, _), packed in zip(rows, pack_matrix(matrix))
+                ])
+        migrated += len(rows)
+        print(f"[{table.name}] {migrated} lignes migrées ({migrated / (time.perf_counter() - start):,.0f} lignes/s)")
+    return {"migrated": migrated, "skipped": skipped}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate JSON features to the packed binary layout.")
+    parser.add_argument("--table", choices=["all", *TABLES], default="all", help="Table to migrate.")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Number of rows updated per transaction.")
+    args = parser.parse_args()
+
+    try:
+        # Tables (feature_manifests) et colonnes manquantes sur une base créée avant le stockage packed
+        models.Base.metadata.create_all(bind=engine)
+        ensure_columns()
+        for name, model in TABLES.items():
+            if args.table in ("all", name):
+                result = migrate_table(model, args.chunk_size)
+                print(f"[{name}] Migration terminée : {result['migrated']} lignes migrées, "
+                      f"{result['skipped']} laissées en JSON.")
+    except Exception as e:
+        print(f"\nUNE ERREUR CRITIQUE EST SURVENUE.")
+        print(f"Erreur : {e}")
+        traceback.print_exc()
@@ -7,17 +7,41 @@ import re
 import joblib
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
+from sklearn.metrics import roc_auc_score
 import lightgbm as lgb
 
+from src.api.model_registry import publish_model
+
 # Définir les chemins
 DATA_PATH = './data/application_train_rdy.csv'
 MODEL_DIR = 'model_artifacts'
 MODEL_PATH = os.path.join(MODEL_DIR, 'credit_scoring_model.joblib')
+# Registre des versions, servi et rechargé à chaud par l'API (voir src/api/model_registry.py)
+REGISTRY_DIR = os.path.join(MODEL_DIR, 'registry')
+
+# Hyperparamètres optimaux trouvés avec Optuna dans votre notebook
+# (repris par le modèle synthétique de src/scripts/benchmark_scoring.py)
+BEST_PARAMS = {
+    'objective': 'binary',
+    'metric': 'auc',
+    'verbose': -1,
+    'n_jobs': -1,
+    'seed': 42,
+    'boosting_type': 'gbdt',
+    'n_estimators': 1000, # Nombre d'arbres
+    'learning_rate': 0.010241101044512771,
+    'num_leaves': 204,
+    'max_depth': 12,
+    'min_child_samples': 200,
+    'subsample': 0.8843947846459445,
+    'colsample_bytree': 0.7174115065647507,
+}
 
 def train_final_model():
     """
     Charge les données prétraitées, entraîne le modèle LightGBM final avec les 
-    meilleurs hyperparamètres et le sauvegarde.
+    meilleurs hyperparamètres et le sauvegarde, puis l'enregistre comme nouvelle
+    version active du registre.
     """
     print("--- 1. Chargement des données d'entraînement ---")
     df = pd.read_csv(DATA_PATH)
@@ -40,27 +64,10 @@ def train_final_model():
     # --- 3. Définition et Entraînement du Modèle ---
     print("--- 3. Définition et Entraînement du Modèle ---")
     
-    # Hyperparamètres optimaux trouvés avec Optuna dans votre notebook
-    best_params = {
-        'objective': 'binary',
-        'metric': 'auc',
-        'verbose': -1,
-        'n_jobs': -1,
-        'seed': 42,
-        'boosting_type': 'gbdt',
-        'n_estimators': 1000, # Nombre d'arbres
-        'learning_rate': 0.010241101044512771,
-        'num_leaves': 204,
-        'max_depth': 12,
-        'min_child_samples': 200,
-        'subsample': 0.8843947846459445,
-        'colsample_bytree': 0.7174115065647507,
-    }
-
     # Création du pipeline final
     final_pipeline = Pipeline([
         ('imputer', SimpleImputer(strategy='median')),
-        ('classifier', lgb.LGBMClassifier(**best_params))
+        ('classifier', lgb.LGBMClassifier(**BEST_PARAMS))
     ])
 
     print("Entraînement du pipeline final sur toutes les données...")
@@ -73,6 +80,16 @@ def train_final_model():
     joblib.dump(final_pipeline, MODEL_PATH)
     print(f"Modèle sauvegardé avec succès dans : {MODEL_PATH}")
 
+    # --- 5. Enregistrement dans le registre ---
+    print("--- 5. Enregistrement dans le registre des modèles ---")
+    metrics = {
+        "train_auc": float(roc_auc_score(y, final_pipeline.predict_proba(X)[:, 1])),
+        "train_rows": int(len(X)),
+        "positive_rate": float(y.mean()),
+    }
+    metadata = publish_model(REGISTRY_DIR, final_pipeline, metrics=metrics, params=BEST_PARAMS)
+    print(f"Version {metadata['version']} enregistrée et activée (AUC d'entraînement : {metrics['train_auc']:.4f}).")
+
 
 if __name__ == '__main__':
     train_final_model()
\ No newline at end of file
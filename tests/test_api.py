@@ -2,6 +2,7 @@
 
 import pytest
 import requests # On utilise la bibliothèque standard pour les requêtes HTTP
+import time
 
 # On importe uniquement la configuration pour connaître l'URL de l'API
 from src.config import settings
@@ -71,3 +72,118 @@ def test_predict_client_not_found(auth_headers: dict):
     
     assert response.status_code == 404
     assert response.json()["detail"] == f"Client ID {invalid_client_id} non trouvé."
+
+@pytest.mark.filterwarnings("ignore:X does not have valid feature names, but LGBMClassifier was fitted with feature names")
+def test_predict_batch(auth_headers: dict):
+    """
+    Teste l'endpoint de prédiction par lot avec un mélange d'ID valides et inconnus.
+    """
+    client_ids = [100001, 9999999, 100005, 100001]
+
+    response = requests.post(f"{settings.api_url}/predict/batch", json={"client_ids": client_ids}, headers=auth_headers)
+
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    # Un résultat par ID demandé, dans l'ordre de la requête
+    assert [r["client_id"] for r in results] == client_ids
+    assert results[1]["error"] == "Client ID 9999999 non trouvé."
+    assert results[1]["prediction_probability"] is None
+    for result in (results[0], results[2], results[3]):
+        assert result["error"] is None
+        assert 0.0 <= result["prediction_probability"] <= 1.0
+    assert results[0]["prediction_probability"] == results[3]["prediction_probability"]
+
+    # Les probabilités du lot doivent être celles de l'endpoint unitaire
+    single = requests.post(f"{settings.api_url}/predict/100005", headers=auth_headers).json()
+    assert results[2]["prediction_probability"] == single["prediction_probability"]
+
+def test_log_writer_stats(auth_headers: dict):
+    """
+    Teste que les compteurs de la file d'écriture des logs sont exposés.
+    """
+    response = requests.get(f"{settings.api_url}/api-logs/writer-stats", headers=auth_headers)
+
+    assert response.status_code == 200
+    stats = response.json()
+    for counter in ("queued", "flushed", "dropped", "failed", "pending"):
+        assert stats[counter] >= 0
+
+def test_feature_store_stats(auth_headers: dict):
+    """
+    Teste l'endpoint du feature store : 404 s'il est désactivé, statistiques sinon.
+    """
+    response = requests.get(f"{settings.api_url}/feature-store/stats", headers=auth_headers)
+
+    if not settings.feature_store_enabled:
+        assert response.status_code == 404
+    else:
+        assert response.status_code == 200
+        assert response.json()["clients"] > 0
+
+def test_identity_cache_hits(auth_headers: dict):
+    """
+    Teste que les appels authentifiés successifs sont servis par le cache des identités.
+    """
+    requests.get(f"{settings.api_url}/clients", headers=auth_headers)
+    before = requests.get(f"{settings.api_url}/auth/identity-cache", headers=auth_headers).json()
+    requests.get(f"{settings.api_url}/clients", headers=auth_headers)
+    after = requests.get(f"{settings.api_url}/auth/identity-cache", headers=auth_headers).json()
+
+    if after["ttl_seconds"] > 0:
+        assert after["hits"] >= before["hits"] + 2
+        assert after["misses"] == before["misses"]
+
+def test_drift_sketch(auth_headers: dict):
+    """
+    Teste que les prédictions alimentent les histogrammes de dérive.
+    """
+    # Une prédiction servie par le cache n'a pas de features à compter
+    requests.delete(f"{settings.api_url}/predict/cache", headers=auth_headers)
+    requests.post(f"{settings.api_url}/predict/100001", headers=auth_headers)
+
+    # Les logs sont écrits en arrière-plan : on attend qu'ils soient comptés
+    for _ in range(20):
+        response = requests.get(f"{settings.api_url}/drift-sketch?hours=1", headers=auth_headers)
+        assert response.status_code == 200
+        if response.json()["current_rows"] > 0:
+            break
+        time.sleep(0.25)
+
+    data = response.json()
+    assert data["current_rows"] > 0
+    assert len(data["features"]) > 0
+    assert {"feature", "psi", "ks", "js", "drifted"} <= set(data["features"][0])
+
+def test_drift_report_job(auth_headers: dict):
+    """
+    Teste que la génération d'un rapport de dérive répond immédiatement avec un job à suivre.
+    """
+    requests.post(f"{settings.api_url}/predict/100001", headers=auth_headers)
+
+    response = requests.post(f"{settings.api_url}/drift-reports", headers=auth_headers)
+
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("pending", "running")
+
+    status_response = requests.get(f"{settings.api_url}/drift-reports/jobs/{job['id']}", headers=auth_headers)
+    assert status_response.status_code == 200
+    assert status_response.json()["id"] == job["id"]
+
+    assert requests.get(f"{settings.api_url}/drift-reports/jobs/999999", headers=auth_headers).status_code == 404
+
+def test_drift_report_parameters_are_validated(auth_headers: dict):
+    """
+    Teste le refus d'une méthode d'échantillonnage inconnue et d'une période sans logs.
+    """
+    url = f"{settings.api_url}/drift-reports"
+
+    unknown_method = requests.post(url, headers=auth_headers, json={"sampling": "systematic"})
+    empty_window = requests.post(url, headers=auth_headers, json={"start": "1990-01-01T00:00:00", "end": "1990-01-02T00:00:00"})
+    reversed_window = requests.post(url, headers=auth_headers, json={"start": "2030-01-02T00:00:00", "end": "2030-01-01T00:00:00"})
+
+    assert unknown_method.status_code == 400
+    assert empty_window.status_code == 400
+    assert "période" in empty_window.json()["detail"]
+    assert reversed_window.status_code == 400
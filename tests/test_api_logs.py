@@ -0,0 +1,142 @@
+# tests/test_api_logs.py
+
+import pytest
+import requests
+import time
+from datetime import datetime, timedelta
+
+from src.config import settings
+from src.database.database import SessionLocal
+from src.database import models
+
+# Période réservée aux logs de test, loin des logs écrits par l'API
+WINDOW_START = datetime(2001, 1, 1)
+WINDOW = {"start": WINDOW_START.isoformat(), "end": (WINDOW_START + timedelta(days=1)).isoformat()}
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def window_logs():
+    """
+    5 logs dans la période de test, dont deux à la même seconde (servis par le cache) et
+    un en erreur (supprimés après le test). La latence vaut la minute + 1.
+    """
+    minutes = [0, 10, 10, 20, 30]
+    with SessionLocal() as db:
+        db.add_all([
+            models.ApiLog(
+                request_timestamp=WINDOW_START + timedelta(minutes=minute), client_id=-1, input_data={"minute": minute},
+                prediction_proba=0.5, prediction_decision="Crédit Refusé" if minute == 20 else "Crédit Accordé",
+                inference_time_ms=minute + 1.0, http_status_code=500 if minute == 30 else 200, cached=minute == 10
+            )
+            for minute in minutes
+        ])
+        db.commit()
+    yield
+    with SessionLocal() as db:
+        db.query(models.ApiLog).filter(models.ApiLog.request_timestamp < WINDOW_START + timedelta(days=1),
+                                       models.ApiLog.request_timestamp >= WINDOW_START).delete()
+        db.commit()
+
+
+# --- Tests ---
+
+def test_api_logs_keyset_pagination(auth_headers, window_logs):
+    """
+    Teste que les pages successives couvrent tous les logs de la période, sans doublon.
+    """
+    url = f"{settings.api_url}/api-logs"
+    pages, cursor = [], None
+
+    while True:
+        params = {**WINDOW, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = requests.get(url, headers=auth_headers, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    logs = [log for page in pages for log in page]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert len({log["id"] for log in logs}) == 5
+    keys = [(log["request_timestamp"], log["id"]) for log in logs]
+    assert keys == sorted(keys, reverse=True)
+
+def test_api_logs_fields(auth_headers, window_logs):
+    """
+    Teste que `input_data` n'est renvoyé que s'il est demandé, et que `fields` limite les colonnes.
+    """
+    url = f"{settings.api_url}/api-logs"
+
+    default = requests.get(url, headers=auth_headers, params=WINDOW).json()
+    selected = requests.get(url, headers=auth_headers, params={**WINDOW, "fields": "input_data,client_id"}).json()
+
+    assert len(default) == 5
+    assert "input_data" not in default[0]
+    assert "inference_time_ms" in default[0]
+    assert set(selected[0]) == {"id", "request_timestamp", "client_id", "input_data"}
+    assert selected[0]["input_data"] == {"minute": 30}
+
+def test_api_logs_resolve_feature_snapshots(auth_headers):
+    """
+    Teste que les features des logs écrits par /predict, stockées en snapshot, sont renvoyées par /api-logs.
+    """
+    params = {"start": datetime.now().isoformat(), "fields": "client_id,input_data"}
+    requests.post(f"{settings.api_url}/predict/100005", headers=auth_headers)
+
+    # Les logs sont écrits en arrière-plan : on attend celui de la prédiction
+    for _ in range(20):
+        logs = requests.get(f"{settings.api_url}/api-logs", headers=auth_headers, params=params).json()
+        if logs:
+            break
+        time.sleep(0.25)
+
+    assert [log["client_id"] for log in logs] == [100005]
+    assert len(logs[0]["input_data"]) > 100
+
+def test_api_logs_stats(auth_headers, window_logs):
+    """
+    Teste les percentiles, le taux d'erreur et la répartition des décisions, au total et par tranche.
+    """
+    url = f"{settings.api_url}/api-logs/stats"
+
+    response = requests.get(url, headers=auth_headers, params={**WINDOW, "bucket": "hour"})
+    auto = requests.get(url, headers=auth_headers, params=WINDOW).json()
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["requests"] == 5
+    assert stats["error_rate"] == pytest.approx(0.2)
+    assert (stats["cached"], stats["cache_hit_ratio"]) == (2, pytest.approx(0.4))
+    assert stats["p50_ms"] == pytest.approx(11.0)
+    assert stats["mean_ms"] == pytest.approx(15.0)
+    assert stats["decisions"] == {"Crédit Accordé": 4, "Crédit Refusé": 1}
+    assert len(stats["buckets"]) == 24
+    first = stats["buckets"][0]
+    assert (first["requests"], first["errors"], first["cached"]) == (5, 1, 2)
+    assert all(bucket["requests"] == 0 for bucket in stats["buckets"][1:])
+    # 1 jour / minute = 1440 tranches > 500 : l'API choisit l'heure
+    assert auto["bucket"] == "hour"
+
+def test_api_logs_invalid_parameters(auth_headers):
+    """
+    Teste le refus d'un champ inconnu, d'un curseur invalide et d'une granularité inadaptée.
+    """
+    url = f"{settings.api_url}/api-logs"
+
+    assert requests.get(url, headers=auth_headers, params={"fields": "password"}).status_code == 400
+    assert requests.get(url, headers=auth_headers, params={"cursor": "pas-un-curseur"}).status_code == 400
+    stats_url = f"{settings.api_url}/api-logs/stats"
+    assert requests.get(stats_url, headers=auth_headers, params={"bucket": "year"}).status_code == 400
+    assert requests.get(stats_url, headers=auth_headers, params={**WINDOW, "bucket": "minute"}).status_code == 400
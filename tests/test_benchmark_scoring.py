@@ -0,0 +1,80 @@
+# tests/test_benchmark_scoring.py
+
+import itertools
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+from src.scripts.benchmark_scoring import compare_results, measure, synthetic_frame, to_records
+
+# --- Fonctions utilitaires ---
+
+def results(*timings):
+    return {"results": [{"name": name, "size": size, "median_s": median} for name, size, median in timings]}
+
+
+# --- Tests ---
+
+def test_synthetic_frame_is_reproducible():
+    """
+    Teste que les données synthétiques sont identiques pour une même graine et
+    reproduisent le JSON de `test_data` (entiers, valeurs manquantes à None).
+    """
+    first, second = synthetic_frame(200, 40, seed=1), synthetic_frame(200, 40, seed=1)
+
+    assert np.array_equal(first.to_numpy(), second.to_numpy(), equal_nan=True)
+    assert list(first.columns) == list(synthetic_frame(10, 40, seed=2).columns)
+    assert first.isna().all().any()
+    record = to_records(first)[0]
+    flags = [name for name in first.columns if name.endswith("_FLAG") and record[name] is not None]
+    assert flags and all(isinstance(record[name], int) for name in flags)
+
+def test_measure_reports_per_operation_statistics():
+    """
+    Teste que les statistiques sont données par opération, avec au moins 3 tours.
+    """
+    calls = itertools.count()
+    result = measure(lambda: next(calls), size=10, max_rounds=5, max_seconds=0)
+
+    assert result["rounds"] == 3
+    assert result["loops"] > 1
+    assert next(calls) >= result["rounds"] * result["loops"]
+    assert result["min_s"] <= result["median_s"] <= result["p95_s"]
+    assert result["items_per_s"] == 10 / result["median_s"]
+
+def test_compare_results_flags_regressions():
+    """
+    Teste le statut de chaque benchmark par rapport à la référence, selon la tolérance.
+    """
+    baseline = results(("model", 1, 1.0), ("log_write", 100, 1.0), ("frame_build", 1, 1.0), ("drift", 10, 1.0))
+    current = results(("model", 1, 1.5), ("log_write", 100, 0.5), ("frame_build", 1, 1.1), ("endpoint", 1, 2.0))
+
+    statuses = {(row["name"], row["size"]): row["status"] for row in compare_results(current, baseline, tolerance=0.25)}
+
+    assert statuses == {
+        ("model", 1): "regression", ("log_write", 100): "improvement", ("frame_build", 1): "ok",
+        ("endpoint", 1): "new", ("drift", 10): "missing",
+    }
+
+def test_benchmark_script_runs_without_database(tmp_path):
+    """
+    Teste le script de bout en bout sur un petit modèle : résultats JSON et comparaison
+    avec une référence (ici bien plus lente : aucune régression).
+    """
+    output, baseline = tmp_path / "results.json", tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results(("predict_endpoint", 1, 1000.0), ("drift_evidently", 100, 1.0))))
+    command = [
+        sys.executable, "-m", "src.scripts.benchmark_scoring", "--features", "30", "--estimators", "5",
+        "--train-rows", "500", "--sizes", "1,20", "--max-rounds", "3", "--max-seconds", "0", "--requests", "3",
+        "--drift-columns", "0", "--cache-dir", str(tmp_path), "--output", str(output), "--baseline", str(baseline),
+    ]
+    run = subprocess.run(command, capture_output=True, text=True, timeout=300)
+
+    assert run.returncode == 0, run.stdout + run.stderr
+    assert "improvement" in run.stdout and "missing" in run.stdout
+    payload = json.loads(output.read_text())
+    names = {(result["name"], result["size"]) for result in payload["results"]}
+    assert {("predict_endpoint", 1), ("predict_batch_endpoint", 20), ("log_write", 20), ("drift_sketch", 20)} <= names
+    assert payload["parameters"]["features"] == 30
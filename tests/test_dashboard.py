@@ -6,7 +6,7 @@ from unittest.mock import patch
 
 # --- CORRECTION APPLIQUÉE ICI ---
 # On importe la fonction avec son nom correct
-from src.dashboard.app_dashboard import get_client_ids
+from src.dashboard.app_dashboard import get_client_ids, get_api_logs
 from src.config import settings
 
 # --- Fixture pour nettoyer le cache de Streamlit avant chaque test ---
@@ -66,3 +66,22 @@ def test_get_client_ids_unauthorized():
 
     # 3. Vérification (Assert)
     assert client_ids == []
+
+def test_get_api_logs_follows_cursor(requests_mock):
+    """
+    Teste que get_api_logs lit les pages suivantes grâce à l'en-tête X-Next-Cursor.
+    """
+    # 1. Préparation (Arrange)
+    url = f"{settings.api_url}/api-logs"
+    requests_mock.get(url, [
+        {"json": [{"id": 3}, {"id": 2}], "headers": {"X-Next-Cursor": "page2"}},
+        {"json": [{"id": 1}]},
+    ])
+
+    with patch('streamlit.session_state', {'token': 'fake_token'}):
+        # 2. Action (Act)
+        logs_df = get_api_logs(limit=10)
+
+    # 3. Vérification (Assert)
+    assert logs_df["id"].tolist() == [3, 2, 1]
+    assert requests_mock.request_history[1].qs["cursor"] == ["page2"]
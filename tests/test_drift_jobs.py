@@ -0,0 +1,89 @@
+# tests/test_drift_jobs.py
+
+import pytest
+from unittest.mock import patch
+
+from src.api import drift_jobs, report_storage
+from src.database.database import SessionLocal
+from src.database import models
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture
+def db():
+    """Session BDD qui supprime les jobs (et rapports) créés par le test."""
+    session = SessionLocal()
+    created = []
+    yield session, created
+    for job_id in created:
+        job = session.get(models.DriftReportJob, job_id)
+        report_id = job.report_id
+        session.delete(job)
+        if report_id is not None:
+            session.query(models.DriftReport).filter(models.DriftReport.id == report_id).delete()
+    session.commit()
+    session.close()
+
+def make_job(session, created) -> int:
+    job = models.DriftReportJob(status=drift_jobs.PENDING, progress=0, created_at=drift_jobs.datetime.now())
+    session.add(job)
+    session.commit()
+    created.append(job.id)
+    return job.id
+
+
+# --- Tests ---
+
+def test_run_drift_job_stores_report(db):
+    """
+    Teste qu'un job réussi enregistre le rapport et passe à 100 %.
+    """
+    session, created = db
+    job_id = make_job(session, created)
+
+    with patch.object(drift_jobs, "build_report_html", return_value="<html>rapport</html>"):
+        drift_jobs.run_drift_job(job_id)
+
+    session.expire_all()
+    job = session.get(models.DriftReportJob, job_id)
+    assert job.status == drift_jobs.SUCCEEDED
+    assert job.progress == 100
+    assert job.finished_at is not None
+    report = session.get(models.DriftReport, job.report_id)
+    assert report_storage.report_html(report, report_storage.load_segments(session, report)) == "<html>rapport</html>"
+
+def test_run_drift_job_records_error(db):
+    """
+    Teste qu'une erreur pendant le calcul marque le job en échec avec son message.
+    """
+    session, created = db
+    job_id = make_job(session, created)
+
+    with patch.object(drift_jobs, "build_report_html", side_effect=ValueError("Aucun log de production trouvé.")):
+        drift_jobs.run_drift_job(job_id)
+
+    session.expire_all()
+    job = session.get(models.DriftReportJob, job_id)
+    assert job.status == drift_jobs.FAILED
+    assert job.error == "Aucun log de production trouvé."
+    assert job.report_id is None
+
+def test_reap_only_expired_jobs(db):
+    """
+    Teste que seuls les jobs dont le bail a expiré sont marqués en échec, pas ceux
+    d'un autre processus de l'API encore actif.
+    """
+    session, created = db
+    alive, expired = make_job(session, created), make_job(session, created)
+    now = drift_jobs.datetime.now()
+    session.get(models.DriftReportJob, alive).owner = "autre-hote:42:actif"
+    session.get(models.DriftReportJob, alive).heartbeat_at = now
+    session.get(models.DriftReportJob, expired).owner = "autre-hote:43:arrete"
+    session.get(models.DriftReportJob, expired).heartbeat_at = now - drift_jobs.timedelta(hours=1)
+    session.commit()
+
+    drift_jobs.DriftJobManager(lease_seconds=60).reap_expired_jobs()
+
+    session.expire_all()
+    assert session.get(models.DriftReportJob, alive).status == drift_jobs.PENDING
+    assert session.get(models.DriftReportJob, expired).status == drift_jobs.FAILED
@@ -0,0 +1,110 @@
+# tests/test_drift_sampling.py
+
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func
+
+from src.api.drift_sampling import bucket_cap, resolve_parameters, sample_logs, sample_reference, stratified_quotas
+from src.database.database import SessionLocal
+from src.database import models
+
+# Période réservée aux logs de test, loin des logs écrits par l'API
+WINDOW_START = datetime(2000, 1, 1)
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def window_logs(db):
+    """10 logs dans la 1re heure, 1 dans la 2e, 2 dans la 3e (supprimés après le test)."""
+    minutes = [5 * i for i in range(10)] + [70] + [130, 140]
+    db.add_all([
+        models.ApiLog(
+            request_timestamp=WINDOW_START + timedelta(minutes=minute), client_id=-1, input_data={"minute": minute},
+            prediction_proba=0.5, prediction_decision="Accepté", inference_time_ms=1.0, http_status_code=200
+        )
+        for minute in minutes
+    ])
+    db.commit()
+    yield
+    db.query(models.ApiLog).filter(models.ApiLog.request_timestamp < WINDOW_START + timedelta(days=1)).delete()
+    db.commit()
+
+
+# --- Tests des répartitions ---
+
+def test_stratified_quotas_keep_class_shares():
+    """
+    Teste que les quotas respectent les proportions des classes et la taille demandée.
+    """
+    assert stratified_quotas({0: 900, 1: 100}, 50) == {0: 45, 1: 5}
+    assert sum(stratified_quotas({0: 7, 1: 2, 2: 1}, 4).values()) == 4
+    assert stratified_quotas({0: 3, 1: 1}, 10) == {0: 3, 1: 1}
+
+def test_bucket_cap_balances_buckets():
+    """
+    Teste que les tranches peu remplies sont prises entières et que les autres se partagent le reste.
+    """
+    assert bucket_cap([10, 1, 2], 6) == 3
+    assert bucket_cap([10, 10], 7) == 3
+    assert bucket_cap([4, 2], 100) == 4
+    assert bucket_cap([], 10) == 0
+
+
+# --- Tests de l'échantillonnage en SQL ---
+
+def test_reservoir_sample_wraps_around(db):
+    """
+    Teste qu'un départ proche de 1 repart au début des clés et ne renvoie pas de doublon.
+    """
+    total = db.query(func.count(models.TrainingData.sk_id_curr)).scalar()
+    parameters = resolve_parameters({"sample_size": total - 1, "sampling": "reservoir", "offset": 0.999})
+
+    rows = sample_reference(db, [models.TrainingData.sk_id_curr], parameters)
+
+    client_ids = [client_id for (client_id,) in rows]
+    assert len(client_ids) == total - 1
+    assert len(set(client_ids)) == total - 1
+
+def test_stratified_sample_keeps_every_class(db):
+    """
+    Teste que l'échantillon stratifié reprend les effectifs de chaque classe de TARGET.
+    """
+    counts = dict(db.query(models.TrainingData.target, func.count()).group_by(models.TrainingData.target).all())
+    parameters = resolve_parameters({"sample_size": sum(counts.values()), "sampling": "stratified"})
+
+    rows = sample_reference(db, [models.TrainingData.target], parameters)
+
+    assert Counter(target for (target,) in rows) == counts
+
+def test_time_bucket_sample_balances_hours(db, window_logs):
+    """
+    Teste la fenêtre de temps et la répartition uniforme des logs entre les heures.
+    """
+    parameters = resolve_parameters({
+        "start": WINDOW_START, "end": WINDOW_START + timedelta(hours=3),
+        "sample_size": 6, "sampling": "time_bucket", "bucket_minutes": 60,
+    })
+
+    rows = sample_logs(db, [models.ApiLog.input_data], parameters)
+
+    hours = Counter(data["minute"] // 60 for (data,) in rows)
+    assert hours == {0: 3, 1: 1, 2: 2}
+
+def test_window_excludes_logs_outside_period(db, window_logs):
+    """
+    Teste que seuls les logs de la période [start, end[ sont échantillonnés.
+    """
+    parameters = resolve_parameters({
+        "start": WINDOW_START + timedelta(hours=1), "end": WINDOW_START + timedelta(hours=2), "sample_size": 100,
+    })
+
+    rows = sample_logs(db, [models.ApiLog.input_data], parameters)
+
+    assert [data["minute"] for (data,) in rows] == [70]
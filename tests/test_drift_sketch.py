@@ -0,0 +1,90 @@
+# tests/test_drift_sketch.py
+
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+from src.api.drift_sketch import SketchLayout, DriftSketcher
+from src.database.database import engine, SessionLocal
+from src.database import models
+
+# --- Tests du découpage en classes ---
+
+def test_layout_counts_every_value_once():
+    """
+    Teste le découpage quantile / modalités, avec les classes "autre" et "manquant".
+    """
+    # Arrange
+    rng = np.random.default_rng(0)
+    reference = np.column_stack([rng.normal(size=1000), rng.integers(0, 2, size=1000)]).astype(np.float64)
+    layout = SketchLayout.fit(["continue", "binaire"], reference, bins=10)
+    current = np.array([[0.0, 1.0], [np.nan, 5.0], [100.0, np.nan]])
+
+    # Act
+    counts = layout.count(current)
+
+    # Assert
+    assert layout.kinds == ["quantile", "category"]
+    assert counts.sum() == current.size
+    binary = counts[layout.offsets[1]:]
+    # Classes : 0, 1, autre, manquant
+    assert binary.tolist() == [0, 1, 1, 1]
+    assert counts[layout.offsets[1] - 1] == 1  # valeur manquante de la feature continue
+
+def test_compare_detects_shift():
+    """
+    Teste que PSI, KS et JS sont nuls sans dérive et élevés après un décalage.
+    """
+    rng = np.random.default_rng(1)
+    reference = rng.normal(size=(5000, 2))
+    layout = SketchLayout.fit(["a", "b"], reference)
+    reference_counts = layout.count(reference)
+
+    shifted = reference.copy()
+    shifted[:, 1] += 3
+
+    same = layout.compare(reference_counts, reference_counts)
+    drift = layout.compare(reference_counts, layout.count(shifted))
+
+    np.testing.assert_allclose([same["psi"], same["ks"], same["js"]], 0, atol=1e-12)
+    assert drift["psi"][0] == pytest.approx(0, abs=1e-12)
+    assert drift["psi"][1] > 1
+    assert drift["ks"][1] > 0.8
+    assert 0.5 < drift["js"][1] <= 1
+
+# --- Test de bout en bout avec la BDD ---
+
+def test_sketcher_report_from_persisted_windows():
+    """
+    Teste que les logs observés sont enregistrés par fenêtre horaire puis relus pour le calcul,
+    sans compter les logs sans features (prédictions servies par le cache sans snapshots).
+    """
+    db = SessionLocal()
+    reference_id = None
+    try:
+        # Arrange : référence construite sur les données d'entraînement
+        feature_names = list(db.query(models.TrainingData.data).first()[0].keys())[:30]
+        sketcher = DriftSketcher(engine, feature_names, persist_interval=3600, writer_id="test-writer")
+        reference_id = sketcher.build_reference(db, sample_size=100, bins=5)
+        records = [data for (data,) in db.query(models.TrainingData.data).limit(4)]
+        now = datetime.now()
+
+        # Act
+        sketcher.observe([{"request_timestamp": now, "input_data": r} for r in records])
+        sketcher.observe([{"request_timestamp": now - timedelta(hours=2), "input_data": records[0]}])
+        sketcher.observe([{"request_timestamp": now, "input_data": None, "cached": True}])
+        sketcher.persist()
+        recent = sketcher.report(db, now - timedelta(minutes=1), now + timedelta(minutes=1))
+        full = sketcher.report(db, now - timedelta(hours=3), now + timedelta(minutes=1))
+
+        # Assert
+        assert recent["current_rows"] == 4
+        assert full["current_rows"] == 5
+        assert len(full["features"]) == 30
+        assert db.query(models.DriftSketchWindow).filter_by(reference_id=reference_id).count() == 2
+    finally:
+        if reference_id is not None:
+            db.query(models.DriftSketchWindow).filter_by(reference_id=reference_id).delete()
+            db.query(models.DriftSketchReference).filter_by(id=reference_id).delete()
+            db.commit()
+        db.close()
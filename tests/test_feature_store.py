@@ -0,0 +1,92 @@
+# tests/test_feature_store.py
+
+import pytest
+import numpy as np
+
+from src.api.feature_store import FeatureStore
+from src.database.database import SessionLocal
+from src.database import models
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def clients(db):
+    """Données de `test_data` telles que chargées par init_db."""
+    return {row.sk_id_curr: row.data for row in db.query(models.ClientDataForTest).all()}
+
+@pytest.fixture
+def feature_names(clients):
+    # Une feature absente du JSON est ajoutée pour vérifier qu'elle vaut 0
+    names = list(next(iter(clients.values())).keys())[:50]
+    return names + ["FEATURE_ABSENTE"]
+
+
+# --- Tests ---
+
+def test_load_matches_database(db, clients, feature_names):
+    """
+    Teste que le store contient tous les clients, avec la sémantique des moteurs
+    d'inférence (None -> NaN, feature absente -> 0).
+    """
+    store = FeatureStore(feature_names)
+
+    assert store.load(db) == len(clients)
+    assert store.client_ids() == sorted(clients)
+
+    for client_id, data in clients.items():
+        expected = np.array([data.get(f, 0) for f in feature_names], dtype=np.float64)
+        np.testing.assert_array_equal(store.get_row(client_id), expected)
+    assert store.get_row(9999999) is None
+
+    usage = store.memory_usage()
+    assert usage["clients"] == len(clients)
+    assert usage["matrix_bytes"] == len(clients) * len(feature_names) * 8
+
+def test_get_rows_and_to_record(db, clients, feature_names):
+    """
+    Teste la lecture par lot et le JSON d'origine gardé pour les logs (mêmes clés et mêmes types).
+    """
+    store = FeatureStore(feature_names)
+    store.load(db)
+    client_id = next(iter(clients))
+
+    found, rows, records = store.get_rows([9999999, client_id], with_records=True)
+
+    assert found == [client_id]
+    record = store.to_record(records[0])
+    assert record == clients[client_id]
+    assert list(record) == list(clients[client_id])
+    assert [type(value) for value in record.values()] == [type(value) for value in clients[client_id].values()]
+    row, packed_record = store.get_row(client_id, with_record=True)
+    np.testing.assert_array_equal(row, rows[0])
+    assert store.to_record(packed_record) == record
+
+def test_refresh_only_reloads_changed_rows(db, clients, feature_names):
+    """
+    Teste que le rafraîchissement incrémental ne relit que la ligne modifiée.
+    """
+    store = FeatureStore(feature_names)
+    store.load(db)
+    client_id = next(iter(clients))
+    original = dict(clients[client_id])
+
+    assert store.refresh(db) == {"updated": 0, "removed": 0, "clients": len(clients)}
+
+    try:
+        db.query(models.ClientDataForTest).filter(models.ClientDataForTest.sk_id_curr == client_id) \
+          .update({"data": {**original, feature_names[0]: 123456.0}})
+        db.commit()
+
+        assert store.refresh(db) == {"updated": 1, "removed": 0, "clients": len(clients)}
+        assert store.get_row(client_id)[0] == 123456.0
+        assert store.to_record(store.get_row(client_id, with_record=True)[1])[feature_names[0]] == 123456.0
+    finally:
+        db.query(models.ClientDataForTest).filter(models.ClientDataForTest.sk_id_curr == client_id) \
+          .update({"data": original})
+        db.commit()
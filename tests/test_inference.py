@@ -0,0 +1,93 @@
+# tests/test_inference.py
+
+import pytest
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+
+from src.api.inference import NumpyEngine, PipelineEngine, load_inference_engine
+
+FIXTURES = "tests/fixtures"
+
+# Le SimpleImputer signale à chaque transform les colonnes vides supprimées à l'entraînement
+pytestmark = pytest.mark.filterwarnings("ignore:Skipping features without any observed values")
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def model():
+    """
+    Entraîne un petit Pipeline (SimpleImputer + LGBMClassifier) ayant la même
+    structure que le modèle de production, sur des données dérivées des fixtures.
+    """
+    df = pd.read_csv(f"{FIXTURES}/sample_train.csv")
+    rng = np.random.default_rng(42)
+    df = df.sample(500, replace=True, random_state=42).reset_index(drop=True)
+    numeric_cols = df.select_dtypes("float64").columns
+    df[numeric_cols] = df[numeric_cols] * rng.normal(1, 0.3, size=(len(df), len(numeric_cols)))
+    df.loc[rng.random(len(df)) < 0.2, numeric_cols[:10]] = np.nan
+    df["TARGET"] = (rng.random(len(df)) < 0.3).astype(int)
+
+    X = df.drop(columns=["TARGET", "SK_ID_CURR"])
+    pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("classifier", lgb.LGBMClassifier(n_estimators=30, num_leaves=15, min_child_samples=10, verbose=-1)),
+    ])
+    with pytest.warns(UserWarning, match="Skipping features without any observed values"):
+        pipeline.fit(X, df["TARGET"])
+    return pipeline
+
+@pytest.fixture(scope="module")
+def records():
+    """Reproduit le JSON stocké en base par init_db pour chaque client de test."""
+    df = pd.read_csv(f"{FIXTURES}/sample_test.csv")
+    return [row.drop(["SK_ID_CURR"]).where(pd.notna(row), None).to_dict() for _, row in df.iterrows()]
+
+
+# --- Tests ---
+
+def test_numpy_engine_matches_pipeline_single_row(model, records):
+    """
+    Teste que le moteur rapide donne exactement (bit à bit) la probabilité du Pipeline.
+    """
+    engine = NumpyEngine(model)
+    for record in records:
+        expected = float(model.predict_proba(pd.DataFrame([record]).reindex(columns=model.feature_names_in_, fill_value=0))[:, 1][0])
+        assert engine.predict_record(record) == expected
+
+def test_numpy_engine_matches_pipeline_batch(model, records):
+    """
+    Teste que la prédiction par lot est identique entre les deux moteurs.
+    """
+    numpy_engine, pipeline_engine = NumpyEngine(model), PipelineEngine(model)
+
+    expected = pipeline_engine.predict_proba(pipeline_engine.build_matrix(records))
+    result = numpy_engine.predict_proba(numpy_engine.build_matrix(records))
+
+    np.testing.assert_array_equal(result, expected)
+
+def test_numpy_engine_missing_feature_defaults_to_zero(model, records):
+    """
+    Teste qu'une feature absente du JSON vaut 0 (comme `reindex(fill_value=0)`),
+    alors qu'une valeur `None` est imputée par la médiane.
+    """
+    engine = NumpyEngine(model)
+    feature = model.feature_names_in_[0]
+    record = {k: v for k, v in records[0].items() if k != feature}
+
+    expected = float(model.predict_proba(pd.DataFrame([record]).reindex(columns=model.feature_names_in_, fill_value=0))[:, 1][0])
+
+    assert engine.predict_record(record) == expected
+
+def test_load_inference_engine_fallback():
+    """
+    Teste le repli sur le moteur 'pipeline' quand le modèle n'a pas la structure attendue.
+    """
+    X = pd.DataFrame({"a": [0.0, 1.0, 2.0, 3.0], "b": [1.0, 0.0, 1.0, 0.0]})
+    model = Pipeline([("classifier", lgb.LGBMClassifier(n_estimators=2, verbose=-1))]).fit(X, [0, 1, 0, 1])
+
+    assert isinstance(load_inference_engine(model, "numpy"), PipelineEngine)
+    with pytest.raises(ValueError):
+        load_inference_engine(model, "inconnu")
@@ -0,0 +1,78 @@
+# tests/test_init_db.py
+
+import json
+import numpy as np
+import pandas as pd
+
+from src.scripts.init_db import build_json_records, upsert_csv
+from src.database.database import SessionLocal
+from src.database import models
+
+def test_build_json_records_matches_row_by_row_serialization():
+    """
+    Teste que la sérialisation vectorisée produit le même JSON que l'ancienne boucle
+    `iterrows` sur un fichier avec des colonnes texte (types natifs, NaN -> null, ordre des colonnes).
+    """
+    # Arrange
+    chunk = pd.read_csv("tests/fixtures/sample_train.csv")
+    chunk.iloc[0, 5] = np.nan
+    drop_columns = ['SK_ID_CURR', 'TARGET']
+
+    expected = [
+        json.dumps(row.drop(drop_columns).where(pd.notna(row), None).to_dict())
+        for _, row in chunk.iterrows()
+    ]
+
+    # Act
+    records = build_json_records(chunk, drop_columns)
+
+    # Assert
+    assert records == expected
+    assert json.loads(records[0])[chunk.columns[5]] is None
+
+def test_build_json_records_on_numeric_chunk():
+    """
+    Teste un chunk entièrement numérique (entiers et flottants) : les entiers restent des
+    entiers et les valeurs manquantes donnent `null` (JSON valide pour PostgreSQL).
+    """
+    # Arrange
+    chunk = pd.DataFrame({"SK_ID_CURR": [1, 2], "CNT_CHILDREN": [0, 3], "AMT_CREDIT": [1.5, np.nan]})
+
+    # Act
+    records = build_json_records(chunk, ['SK_ID_CURR'])
+
+    # Assert
+    assert records == ['{"CNT_CHILDREN": 0, "AMT_CREDIT": 1.5}', '{"CNT_CHILDREN": 3, "AMT_CREDIT": null}']
+
+def test_upsert_only_rewrites_changed_rows(tmp_path):
+    """
+    Teste que le mode upsert insère les nouveaux clients, ne réécrit que les
+    lignes modifiées et supprime son point de reprise une fois le fichier traité.
+    """
+    # Arrange : deux clients réservés au test, avec des ID négatifs
+    chunk = pd.read_csv("tests/fixtures/sample_test.csv").head(2)
+    chunk["SK_ID_CURR"] = [-1, -2]
+    csv_path = tmp_path / "clients.csv"
+    chunk.to_csv(csv_path, index=False)
+
+    db = SessionLocal()
+    try:
+        first = upsert_csv("test_data", str(csv_path), chunk_size=1)
+        unchanged_hash = db.get(models.ClientDataForTest, -1).content_hash
+
+        chunk.loc[1, "AMT_CREDIT"] = 1.5
+        chunk.to_csv(csv_path, index=False)
+
+        # Act
+        second = upsert_csv("test_data", str(csv_path), chunk_size=1)
+        db.expire_all()
+
+        # Assert
+        assert first == second == 2
+        assert db.get(models.ClientDataForTest, -1).content_hash == unchanged_hash
+        assert db.get(models.ClientDataForTest, -2).data["AMT_CREDIT"] == 1.5
+        assert db.get(models.LoadCheckpoint, "test_data") is None
+    finally:
+        db.query(models.ClientDataForTest).filter(models.ClientDataForTest.sk_id_curr < 0).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,105 @@
+# tests/test_load_profiles.py
+
+from collections import Counter
+
+import pytest
+
+from src.config import settings
+from src.scripts.load_profiles import (
+    LoadTestSettings, ZipfSampler, evaluate_slo, format_slo_report, load_client_ids, parse_task_weights, profile_stages,
+    stage_at,
+)
+
+# --- Fonctions utilitaires ---
+
+def row(name, requests=100, failures=0, p95_ms=100.0, p99_ms=200.0, rps=10.0):
+    return {"name": name, "requests": requests, "failures": failures, "p95_ms": p95_ms, "p99_ms": p99_ms, "rps": rps}
+
+
+# --- Tests des profils ---
+
+def test_spike_profile_stages():
+    """
+    Teste le profil "spike" : charge de fond, pic au milieu du test, retour au fond, puis fin.
+    """
+    stages = profile_stages("spike", users=100, duration=100)
+
+    assert stage_at(stages, 10) == (20, 10.0)
+    assert stage_at(stages, 50) == (100, 100.0)
+    assert stage_at(stages, 90) == (20, 10.0)
+    assert stage_at(stages, 100) is None
+
+def test_ramp_profile_increases_by_steps():
+    """
+    Teste que le profil "ramp" monte par paliers jusqu'au pic sur toute la durée.
+    """
+    stages = profile_stages("ramp", users=50, duration=500, spawn_rate=2)
+
+    assert [stage_at(stages, t)[0] for t in (0, 150, 250, 350, 499)] == [10, 20, 30, 40, 50]
+    assert stage_at(stages, 10)[1] == 2
+    with pytest.raises(ValueError):
+        profile_stages("burst", users=10)
+
+
+# --- Tests du tirage des ID clients ---
+
+def test_zipf_sampler_skews_toward_few_clients():
+    """
+    Teste que le tirage de Zipf concentre les requêtes sur quelques clients, et que s=0 est uniforme.
+    """
+    ids = list(range(1000))
+    counts = Counter(ZipfSampler(ids, s=1.1, seed=1).sample_many(20000))
+    top_share = sum(count for _, count in counts.most_common(10)) / 20000
+    uniform = Counter(ZipfSampler(ids, s=0, seed=1).sample_many(20000))
+
+    assert top_share > 0.3
+    assert set(counts) <= set(ids)
+    assert sum(count for _, count in uniform.most_common(10)) / 20000 < 0.05
+    assert ZipfSampler(ids, seed=7).sample_many(50) == ZipfSampler(ids, seed=7).sample_many(50)
+
+def test_client_ids_without_database(tmp_path):
+    """
+    Teste les sources d'ID sans accès à la BDD : plage, fichier d'ID et CSV avec SK_ID_CURR.
+    """
+    plain = tmp_path / "ids.txt"
+    plain.write_text("100001\n100005\n\n")
+
+    assert load_client_ids("range:100001-100003") == [100001, 100002, 100003]
+    assert load_client_ids(f"file:{plain}") == [100001, 100005]
+    assert load_client_ids("file:tests/fixtures/sample_test.csv")[:2] == [100001, 100005]
+    with pytest.raises(ValueError):
+        load_client_ids("redis:localhost")
+
+def test_client_ids_from_api():
+    """
+    Teste la source "api" : ID lus par GET /clients, sans connexion de l'injecteur à la BDD.
+    """
+    ids = load_client_ids("api", host=settings.api_url, username=settings.api_user, password=settings.api_password)
+
+    assert 100001 in ids
+
+def test_parse_task_weights():
+    """
+    Teste la lecture des poids des tâches (les poids nuls désactivent la tâche).
+    """
+    assert parse_task_weights("predict=20, batch=2,logs=0") == {"predict": 20, "batch": 2}
+
+
+# --- Tests des SLO ---
+
+def test_evaluate_slo_reports_each_objective():
+    """
+    Teste le bilan des SLO : latence par endpoint et totale, taux d'erreur et débit du total.
+    """
+    settings = LoadTestSettings(slo_p95_ms=300, slo_p99_ms=500, slo_error_rate=0.01, slo_min_rps=5)
+    rows = [row("POST /predict/[client_id]"), row("GET /api-logs", p95_ms=450.0, p99_ms=480.0)]
+
+    checks = evaluate_slo(rows, row("Total", requests=200, failures=1, p95_ms=280.0, p99_ms=470.0), settings)
+    failed = [(c["scope"], c["metric"]) for c in checks if not c["passed"]]
+
+    assert failed == [("GET /api-logs", "p95_ms")]
+    assert len(checks) == 8
+    assert "SLO : ÉCHOUÉ (1 objectif(s) manqué(s))" in format_slo_report(checks)
+
+    checks = evaluate_slo(rows[:1], row("Total", failures=5, rps=2.0), settings)
+    assert {c["metric"] for c in checks if not c["passed"]} == {"error_rate", "rps"}
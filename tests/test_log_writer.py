@@ -0,0 +1,144 @@
+# tests/test_log_writer.py
+
+import threading
+
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from src.api.log_writer import ApiLogWriter
+from src.database.feature_snapshots import FeatureSnapshotStore, load_snapshots, snapshot_hash
+from src.database.database import engine, SessionLocal
+from src.database import models
+
+# Identifiant client réservé aux logs écrits par ces tests
+TEST_CLIENT_ID = -424242
+
+def make_log(i: int) -> dict:
+    return {
+        "request_timestamp": datetime.now(),
+        "client_id": TEST_CLIENT_ID,
+        "input_data": {"feature": i},
+        "prediction_proba": 0.5,
+        "prediction_decision": "Crédit Accordé",
+        "inference_time_ms": 1.0,
+        "http_status_code": 200,
+    }
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture
+def db():
+    """Session BDD qui nettoie les logs de test avant et après chaque test."""
+    session = SessionLocal()
+    session.query(models.ApiLog).filter(models.ApiLog.client_id == TEST_CLIENT_ID).delete()
+    session.commit()
+    yield session
+    session.query(models.ApiLog).filter(models.ApiLog.client_id == TEST_CLIENT_ID).delete()
+    session.commit()
+    session.close()
+
+
+# --- Tests ---
+
+def test_writer_flushes_in_batches(db):
+    """
+    Teste que les logs déposés dans la file sont écrits en BDD par lots.
+    """
+    writer = ApiLogWriter(engine, max_queue_size=100, batch_size=10, flush_interval=5.0)
+    writer.start()
+    try:
+        assert writer.submit_many([make_log(i) for i in range(25)]) == 25
+        writer.flush()
+    finally:
+        writer.stop()
+
+    assert db.query(models.ApiLog).filter(models.ApiLog.client_id == TEST_CLIENT_ID).count() == 25
+    assert writer.stats() == {"queued": 25, "flushed": 25, "dropped": 0, "failed": 0, "pending": 0}
+
+def test_writer_drops_when_queue_is_full():
+    """
+    Teste que la politique "drop" abandonne les logs au-delà de la capacité de la file.
+    """
+    writer = ApiLogWriter(MagicMock(), max_queue_size=2, batch_size=10, full_policy="drop")
+
+    accepted = [writer.submit(make_log(i)) for i in range(3)]
+
+    assert accepted == [True, True, False]
+    assert writer.stats()["dropped"] == 1
+    assert writer.stats()["pending"] == 2
+
+def test_writer_stop_writes_pending_logs(db):
+    """
+    Teste que l'arrêt du writer écrit les logs encore en file.
+    """
+    writer = ApiLogWriter(engine, max_queue_size=100, batch_size=50, flush_interval=60.0)
+    writer.start()
+    writer.submit_many([make_log(i) for i in range(5)])
+
+    writer.stop()
+
+    assert db.query(models.ApiLog).filter(models.ApiLog.client_id == TEST_CLIENT_ID).count() == 5
+    assert writer.stats()["flushed"] == 5
+
+def test_writer_deduplicates_features(db):
+    """
+    Teste que des logs aux features identiques référencent un seul snapshot, écrit une fois.
+    """
+    features = {"feature": -424242, "autre": None}
+    listener = MagicMock()
+    writer = ApiLogWriter(engine, batch_size=10, snapshots=FeatureSnapshotStore(), listeners=[listener])
+    writer.submit_many([{**make_log(0), "input_data": features} for _ in range(3)])
+    writer.flush()
+    writer.submit({**make_log(0), "input_data": dict(features)})
+    writer.flush()
+
+    logs = db.query(models.ApiLog.input_data, models.ApiLog.feature_hash) \
+             .filter(models.ApiLog.client_id == TEST_CLIENT_ID).all()
+    digest = snapshot_hash(features)
+    assert logs == [(None, digest)] * 4
+    assert load_snapshots(db, {digest}) == {digest: features}
+    # Les listeners (histogrammes de dérive) reçoivent toujours les features
+    assert listener.call_args.args[0][0]["input_data"] == features
+    db.query(models.FeatureSnapshot).filter(models.FeatureSnapshot.hash == digest).delete()
+
+def test_cached_log_keeps_only_written_snapshot(db):
+    """
+    Teste qu'un log servi par le cache ne garde sa référence au snapshot que si celui-ci a été
+    écrit (ici dans le même lot), et non si le log du calcul n'a jamais été écrit.
+    """
+    features = {"feature": -424243}
+    digest = snapshot_hash(features)
+    writer = ApiLogWriter(engine, batch_size=10, snapshots=FeatureSnapshotStore())
+    writer.submit_many([
+        {**make_log(0), "input_data": features},
+        {**make_log(1), "input_data": None, "feature_hash": digest, "cached": True},
+        {**make_log(2), "input_data": None, "feature_hash": "snapshot-jamais-ecrit", "cached": True},
+    ])
+    writer.flush()
+
+    logs = db.query(models.ApiLog.feature_hash).filter(models.ApiLog.client_id == TEST_CLIENT_ID) \
+             .order_by(models.ApiLog.id).all()
+    assert [feature_hash for (feature_hash,) in logs] == [digest, digest, None]
+    db.query(models.FeatureSnapshot).filter(models.FeatureSnapshot.hash == digest).delete()
+
+def test_flush_gives_up_after_timeout():
+    """
+    Teste que `flush` n'attend pas indéfiniment une écriture bloquée, puis aboutit une fois débloquée.
+    """
+    release = threading.Event()
+    writer = ApiLogWriter(MagicMock(), batch_size=10, flush_interval=0.01)
+    writer._write = lambda rows: release.wait()
+    writer.start()
+    try:
+        writer.submit(make_log(0))
+        assert writer.flush(timeout=0.1) is False
+        release.set()
+        assert writer.flush(timeout=5.0) is True
+    finally:
+        release.set()
+        writer.stop()
+
+def test_writer_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        ApiLogWriter(MagicMock(), full_policy="inconnue")
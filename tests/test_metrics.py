@@ -0,0 +1,104 @@
+# tests/test_metrics.py
+
+import pytest
+import requests
+
+from src.api.metrics import MetricsRegistry, StageTimer
+from src.config import settings
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def parse_samples(text: str) -> dict:
+    """{nom{labels}: valeur} des lignes d'échantillons du format texte de Prometheus."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+# --- Tests du registre ---
+
+def test_histogram_is_cumulative():
+    """
+    Teste l'export d'un histogramme : classes cumulées, +Inf, somme et nombre d'observations.
+    """
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Durées.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="model")
+
+    samples = parse_samples(registry.render())
+
+    assert samples['test_seconds_bucket{stage="model",le="0.1"}'] == 1
+    assert samples['test_seconds_bucket{stage="model",le="1"}'] == 3
+    assert samples['test_seconds_bucket{stage="model",le="+Inf"}'] == 4
+    assert samples['test_seconds_sum{stage="model"}'] == pytest.approx(4.25)
+    assert samples['test_seconds_count{stage="model"}'] == 4
+
+def test_counter_gauge_and_labels():
+    """
+    Teste les compteurs, les jauges calculées à l'export et l'échappement des labels.
+    """
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Compteur.", ["route"])
+    registry.gauge("test_pool", "Jauge.", ["state"], callback=lambda: {("idle",): 3, ("used",): 1})
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+
+    text = registry.render()
+    samples = parse_samples(text)
+
+    assert "# TYPE test_total counter" in text
+    assert samples['test_total{route="/a\\"b"}'] == 3
+    assert samples['test_pool{state="idle"}'] == 3
+    with pytest.raises(ValueError):
+        counter.inc(status=200)
+    with pytest.raises(ValueError):
+        registry.counter("test_total", "Doublon.")
+
+def test_stage_timer_records_each_lap():
+    """
+    Teste que chaque étape chronométrée est enregistrée sous son nom.
+    """
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_stage_seconds", "Étapes.", ["route", "stage"])
+    timer = StageTimer(histogram, route="/predict")
+
+    timer.lap("feature_fetch")
+    timer.lap("model")
+
+    assert histogram.count(route="/predict", stage="feature_fetch") == 1
+    assert histogram.count(route="/predict", stage="model") == 1
+
+
+# --- Test de l'endpoint ---
+
+def test_metrics_endpoint(auth_headers):
+    """
+    Teste que /metrics expose les étapes de /predict, les requêtes par statut et les pools de connexions.
+    """
+    requests.post(f"{settings.api_url}/predict/100001", headers=auth_headers)
+    requests.post(f"{settings.api_url}/predict/999999999", headers=auth_headers)
+
+    response = requests.get(f"{settings.api_url}/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    samples = parse_samples(response.text)
+    for stage in ("auth", "feature_fetch", "frame_build", "model", "log_write"):
+        assert samples[f'api_request_stage_duration_seconds_count{{route="/predict/{{client_id}}",stage="{stage}"}}'] >= 1
+    assert samples['api_http_requests_total{method="POST",route="/predict/{client_id}",status="404"}'] >= 1
+    assert samples['api_model_load_seconds'] > 0
+    assert 'api_db_pool_connections{engine="async",state="idle"}' in samples
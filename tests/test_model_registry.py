@@ -0,0 +1,200 @@
+# tests/test_model_registry.py
+
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+import lightgbm as lgb
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+
+from src.api.model_registry import (
+    MODEL_FILE, ModelManager, activate_version, active_version, list_versions, load_version, publish_model,
+)
+from src.config import settings
+
+# --- Fonctions utilitaires ---
+
+def small_model(columns=("feature_1", "feature_2", "feature_3"), seed=0):
+    """Pipeline de la forme du modèle de production, entraîné sur quelques lignes aléatoires."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(200, len(columns))), columns=list(columns))
+    y = (X.iloc[:, 0] + rng.normal(scale=0.5, size=200) > 0).astype(int)
+    model = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("classifier", lgb.LGBMClassifier(n_estimators=5, verbose=-1, seed=seed)),
+    ])
+    return model.fit(X, y)
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+# --- Tests du registre ---
+
+def test_publish_and_load_versions(tmp_path):
+    """
+    Teste l'enregistrement de versions, la version active et la vérification de l'empreinte au chargement.
+    """
+    registry = str(tmp_path)
+    first = publish_model(registry, small_model(), metrics={"train_auc": 0.9})
+    second = publish_model(registry, small_model(seed=1), activate=False)
+
+    assert [metadata["version"] for metadata in list_versions(registry)] == [first["version"], second["version"]]
+    assert active_version(registry) == first["version"]
+    model, metadata = load_version(registry, second["version"])
+    assert metadata["feature_names"] == ["feature_1", "feature_2", "feature_3"]
+    assert hasattr(model, "predict_proba")
+
+    with open(os.path.join(registry, second["version"], MODEL_FILE), "ab") as f:
+        f.write(b"corrompu")
+    with pytest.raises(ValueError):
+        load_version(registry, second["version"])
+    with pytest.raises(ValueError):
+        activate_version(registry, "../inconnue")
+
+def test_reload_swaps_version_and_keeps_previous_usable(tmp_path):
+    """
+    Teste le rechargement à chaud : nouvelle version servie, ancienne version toujours
+    utilisable par les requêtes en cours, listeners appelés, features différentes refusées.
+    """
+    registry = str(tmp_path)
+    publish_model(registry, small_model())
+    swaps = []
+    manager = ModelManager(registry, model_path="", engine_name="numpy", warmup_predictions=2,
+                           listeners=[lambda previous, loaded: swaps.append((previous, loaded))])
+    manager.reload()
+    previous = manager.current
+
+    second = publish_model(registry, small_model(seed=1))
+    loaded = manager.reload()
+
+    assert manager.current is loaded and loaded.version == second["version"]
+    assert swaps == [(None, previous), (previous, loaded)]
+    assert 0 <= previous.scorer.predict_record({"feature_1": 1.0}) <= 1
+
+    publish_model(registry, small_model(columns=("feature_1", "feature_4")))
+    with pytest.raises(ValueError):
+        manager.reload()
+    assert manager.current is loaded
+
+def test_watcher_follows_active_version(tmp_path):
+    """
+    Teste que la surveillance du registre recharge le modèle quand la version active change.
+    """
+    registry = str(tmp_path)
+    publish_model(registry, small_model())
+    second = publish_model(registry, small_model(seed=1), activate=False)
+    manager = ModelManager(registry, model_path="", engine_name="numpy")
+    manager.reload()
+    manager.start_watching(0.05)
+    try:
+        activate_version(registry, second["version"])
+        for _ in range(100):
+            if manager.current.version == second["version"]:
+                break
+            time.sleep(0.05)
+    finally:
+        manager.stop_watching()
+
+    assert manager.current.version == second["version"]
+
+def test_concurrent_background_reloads(tmp_path):
+    """
+    Teste que deux demandes de rechargement simultanées ne lancent qu'un seul rechargement.
+    """
+    registry = str(tmp_path)
+    publish_model(registry, small_model())
+    manager = ModelManager(registry, model_path="", engine_name="numpy", warmup_predictions=200)
+    barrier = threading.Barrier(8)
+    outcomes = []
+
+    def request_reload():
+        barrier.wait()
+        try:
+            outcomes.append(manager.reload_in_background())
+        except RuntimeError:
+            outcomes.append(None)
+
+    threads = [threading.Thread(target=request_reload) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len([status for status in outcomes if status is not None]) == 1
+
+def test_model_file_without_registry(tmp_path):
+    """
+    Teste le chargement de MODEL_PATH sans registre : la version est l'empreinte du fichier.
+    """
+    model_path = str(tmp_path / "model.joblib")
+    joblib.dump(small_model(), model_path)
+    manager = ModelManager("", model_path, engine_name="pipeline")
+
+    loaded = manager.reload()
+
+    assert (loaded.source, len(loaded.version)) == ("file", 12)
+    assert loaded.feature_names == ["feature_1", "feature_2", "feature_3"]
+
+def test_load_with_max_threads(tmp_path):
+    """
+    Teste le chargement d'un modèle limité à un thread (modèles chronométrés par le scoring fantôme).
+    """
+    registry = str(tmp_path)
+    version = publish_model(registry, small_model())["version"]
+    manager = ModelManager(registry, model_path="", engine_name="numpy", warmup_predictions=1)
+
+    loaded = manager.load(version, max_threads=1)
+    copy = manager.load_copy(manager.reload(), max_threads=1)
+
+    assert loaded.scorer.model.get_params()["classifier__n_jobs"] == 1
+    assert loaded.scorer._predict_params["num_threads"] == 1
+    assert copy.version == version and copy is not manager.current
+    assert copy.scorer._predict_params["num_threads"] == 1
+
+
+# --- Tests de l'API ---
+
+def test_admin_model_reload(auth_headers):
+    """
+    Teste le rechargement à chaud par l'API : même version rechargée, logs marqués avec la version servie.
+    """
+    url = f"{settings.api_url}/admin/model"
+    before = requests.get(url, headers=auth_headers).json()
+
+    response = requests.post(f"{url}/reload", headers=auth_headers)
+    for _ in range(100):
+        reload = requests.get(url, headers=auth_headers).json()["reload"]
+        if reload["status"] != "running":
+            break
+        time.sleep(0.1)
+
+    assert response.status_code == 202
+    assert reload["status"] == "succeeded"
+    assert reload["version"] == before["current"]["version"]
+    assert before["current"]["features"] > 100
+    assert requests.post(f"{url}/reload", headers=auth_headers, json={"version": "inconnue"}).status_code == 404
+
+    start = {"start": time.strftime("%Y-%m-%dT%H:%M:%S"), "fields": "client_id,model_version"}
+    requests.post(f"{settings.api_url}/predict/100001", headers=auth_headers)
+    for _ in range(20):
+        logs = requests.get(f"{settings.api_url}/api-logs", headers=auth_headers, params=start).json()
+        if logs:
+            break
+        time.sleep(0.25)
+    assert logs[0]["model_version"] == before["current"]["version"]
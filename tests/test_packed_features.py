@@ -0,0 +1,54 @@
+# tests/test_packed_features.py
+
+import numpy as np
+
+from src.database import models
+from src.database.packed_features import PackedFeatureDecoder, pack_matrix, unpack_row
+
+def make_manifest(manifest_id=1):
+    return models.FeatureManifest(
+        id=manifest_id,
+        feature_names=["AMT_CREDIT", "CNT_CHILDREN", "FLAG_OWN_CAR"],
+        feature_types=["float", "int", "bool"],
+    )
+
+def test_unpack_row_is_zero_copy():
+    """
+    Teste qu'un vecteur packed est relu sans copie ni perte (NaN compris).
+    """
+    blob = pack_matrix(np.array([[1.5, np.nan, 3.0]]))[0]
+
+    row = unpack_row(blob)
+
+    assert len(blob) == 3 * 8
+    assert not row.flags.owndata
+    np.testing.assert_array_equal(row, [1.5, np.nan, 3.0])
+
+def test_decoder_reorders_to_model_features():
+    """
+    Teste que les vecteurs sont remis dans l'ordre du modèle,
+    avec 0 pour une feature absente du manifeste (même sémantique que le JSON).
+    """
+    # Arrange
+    decoder = PackedFeatureDecoder(["FLAG_OWN_CAR", "FEATURE_ABSENTE", "AMT_CREDIT"])
+    decoder.register(make_manifest())
+    blobs = pack_matrix(np.array([[1000.0, 2.0, 1.0], [np.nan, 0.0, 0.0]]))
+
+    # Act
+    matrix = decoder.decode(1, blobs)
+
+    # Assert
+    np.testing.assert_array_equal(matrix, [[1.0, 0.0, 1000.0], [0.0, 0.0, np.nan]])
+
+def test_decoder_rebuilds_original_record():
+    """
+    Teste que le dictionnaire reconstruit pour les logs retrouve les types d'origine.
+    """
+    decoder = PackedFeatureDecoder(["AMT_CREDIT", "CNT_CHILDREN", "FLAG_OWN_CAR"])
+    decoder.register(make_manifest())
+    blob = pack_matrix(np.array([[np.nan, 2.0, 1.0]]))[0]
+
+    assert decoder.to_record(1, blob) == {"AMT_CREDIT": None, "CNT_CHILDREN": 2, "FLAG_OWN_CAR": True}
+
+    frame = decoder.to_frame(1, [blob])
+    assert frame.dtypes.tolist() == [np.float64, np.int64, bool]
@@ -0,0 +1,151 @@
+# tests/test_partitions.py
+
+import threading
+
+import pytest
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.database import partitions
+from src.database.database import engine
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture
+def connection():
+    """Connexion dans une transaction annulée à la fin du test (le DDL PostgreSQL est transactionnel)."""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
+
+def insert_log(connection, timestamp: datetime):
+    connection.execute(text(
+        "INSERT INTO api_logs (request_timestamp, client_id, input_data, prediction_proba, prediction_decision, "
+        "inference_time_ms, http_status_code) VALUES (:timestamp, -1, '{\"a\": 1}', 0.5, 'Crédit Accordé', 1.0, 200)"
+    ), {"timestamp": timestamp})
+
+
+# --- Tests des plages ---
+
+def test_partition_ranges():
+    """
+    Teste les bornes et les noms des partitions mensuelles et journalières.
+    """
+    moment = datetime(2024, 12, 31, 23, 59)
+
+    assert partitions.partition_start(moment, "month") == datetime(2024, 12, 1)
+    assert partitions.next_start(datetime(2024, 12, 1), "month") == datetime(2025, 1, 1)
+    assert partitions.next_start(datetime(2024, 1, 31), "day") == datetime(2024, 2, 1)
+    assert partitions.partition_name(datetime(2024, 12, 1), "month") == "api_logs_p202412"
+    assert partitions.parse_partition_name("api_logs_p20241231") == (datetime(2024, 12, 31), datetime(2025, 1, 1))
+    assert partitions.parse_partition_name("api_logs_default") is None
+
+
+# --- Tests en base ---
+
+def test_ensure_partitions_moves_default_rows(connection):
+    """
+    Teste la création des partitions à venir, y compris quand la partition par défaut contient déjà leurs lignes.
+    """
+    insert_log(connection, datetime(2090, 2, 10))
+
+    created = partitions.ensure_partitions(connection, "month", ahead=1, now=datetime(2090, 1, 15))
+
+    assert created == ["api_logs_p209001", "api_logs_p209002"]
+    location = connection.execute(text(
+        "SELECT tableoid::regclass::text FROM api_logs WHERE request_timestamp = '2090-02-10'"
+    )).scalar()
+    assert location == "api_logs_p209002"
+    assert partitions.ensure_partitions(connection, "month", ahead=1, now=datetime(2090, 1, 15)) == []
+
+class PausingConnection:
+    """Connexion qui s'arrête avant l'ATTACH d'une partition, jusqu'à ce que le test la relance."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.moved = threading.Event()
+        self.resume = threading.Event()
+
+    def execute(self, statement, *args):
+        if "ATTACH PARTITION" in str(statement):
+            self.moved.set()
+            self.resume.wait(5)
+        return self.connection.execute(statement, *args)
+
+def test_create_partition_blocks_default_writes(connection):
+    """
+    Teste qu'un log de la plage écrit entre le déplacement des lignes de la partition par
+    défaut et l'ATTACH attend la fin de la création (sinon l'ATTACH échouerait).
+    """
+    pausing = PausingConnection(connection)
+    errors = []
+
+    def create():
+        try:
+            partitions.create_partition(pausing, datetime(2091, 1, 1), "month")
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=create)
+    thread.start()
+    try:
+        assert pausing.moved.wait(5)
+        with engine.connect() as other:
+            other.execute(text("SET lock_timeout = '200ms'"))
+            with pytest.raises(OperationalError, match="lock timeout"):
+                insert_log(other, datetime(2091, 1, 10))
+    finally:
+        pausing.resume.set()
+        thread.join()
+
+    assert errors == []
+
+def test_retention_archives_then_drops(connection, tmp_path):
+    """
+    Teste que la rétention archive une partition expirée en Parquet avant de la supprimer.
+    """
+    insert_log(connection, datetime(2001, 1, 5))
+    # Log dont les features sont dans un snapshot (supprimé avec la partition qui le référence)
+    connection.execute(text(
+        "INSERT INTO feature_snapshots (hash, data, created_at) VALUES ('test-retention', '{\"b\": 2}', '2001-01-06')"
+    ))
+    connection.execute(text(
+        "INSERT INTO api_logs (request_timestamp, client_id, feature_hash, prediction_proba, prediction_decision, "
+        "inference_time_ms, http_status_code) VALUES ('2001-01-06', -1, 'test-retention', 0.5, 'Crédit Accordé', 1.0, 200)"
+    ))
+    partitions.create_partition(connection, datetime(2001, 1, 1), "month")
+
+    dropped = partitions.apply_retention(connection, 20, str(tmp_path), now=datetime(2001, 3, 1))
+
+    assert dropped == ["api_logs_p200101"]
+    archive = pd.read_parquet(tmp_path / "api_logs_p200101.parquet")
+    assert len(archive) == 2
+    assert archive["input_data"].tolist() == ['{"a": 1}', '{"b": 2}']
+    assert connection.execute(text("SELECT count(*) FROM feature_snapshots WHERE hash = 'test-retention'")).scalar() == 0
+    assert connection.execute(text(
+        "SELECT count(*) FROM api_logs WHERE request_timestamp < '2001-02-01' AND request_timestamp >= '2001-01-01'"
+    )).scalar() == 0
+
+def test_archive_with_null_only_first_chunk(connection, tmp_path):
+    """
+    Teste l'archivage d'une partition dont le premier lot n'a que des NULL dans les colonnes
+    ajoutées depuis (logs écrits avant leur ajout), suivi d'un lot qui les renseigne.
+    """
+    insert_log(connection, datetime(2001, 1, 5))
+    connection.execute(text(
+        "INSERT INTO api_logs (request_timestamp, client_id, input_data, feature_hash, prediction_proba, "
+        "prediction_decision, inference_time_ms, http_status_code, cached, model_version) VALUES "
+        "('2001-01-06', -1, '{\"a\": 2}', 'test-archive', 0.5, 'Crédit Accordé', 1.0, 200, true, 'v1')"
+    ))
+    partitions.create_partition(connection, datetime(2001, 1, 1), "month")
+
+    path = partitions.archive_partition(connection, "api_logs_p200101", str(tmp_path), chunk_size=1)
+
+    archive = pd.read_parquet(path)
+    assert archive["model_version"].tolist() == [None, "v1"]
+    assert archive["feature_hash"].tolist() == [None, "test-archive"]
+    assert archive["cached"].tolist() == [False, True]
+    assert [path.name for path in tmp_path.iterdir()] == ["api_logs_p200101.parquet"]
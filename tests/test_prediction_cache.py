@@ -0,0 +1,120 @@
+# tests/test_prediction_cache.py
+
+import time
+
+import pytest
+import requests
+from sqlalchemy import text
+
+from src.api.prediction_cache import PredictionCache
+from src.config import settings
+from src.database.database import SessionLocal
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+# --- Tests du cache ---
+
+def test_cache_entry_requires_same_key():
+    """
+    Teste qu'une entrée n'est servie que pour la même empreinte, version du modèle et seuil,
+    et qu'une clé différente la remplace.
+    """
+    cache = PredictionCache(ttl_seconds=60, max_size=10)
+    cache.set(1, ("hash-a", "v1", 0.5), 0.3)
+
+    assert cache.key(1) == ("hash-a", "v1", 0.5)
+    assert cache.get(1, ("hash-a", "v1", 0.5)) == 0.3
+    assert cache.get(1, ("hash-a", "v2", 0.5)) is None
+    # L'entrée de l'ancienne version a été retirée
+    assert cache.get(1, ("hash-a", "v1", 0.5)) is None
+    assert cache.stats()["hit_ratio"] == pytest.approx(1 / 3)
+
+def test_cache_ttl_and_lru_bounds():
+    """
+    Teste l'expiration des entrées et l'éviction de la moins récemment utilisée.
+    """
+    cache = PredictionCache(ttl_seconds=0.05, max_size=2)
+    cache.set(1, "k", "a")
+    cache.set(2, "k", "b")
+    cache.get(1, "k")
+    cache.set(3, "k", "c")
+
+    assert cache.get(2, "k") is None
+    assert cache.get(1, "k") == "a"
+    time.sleep(0.06)
+    assert cache.get(3, "k") is None
+    assert not PredictionCache(ttl_seconds=0, max_size=10).enabled
+
+
+# --- Tests de l'API ---
+
+def cache_stats(auth_headers):
+    return requests.get(f"{settings.api_url}/predict/cache", headers=auth_headers).json()
+
+def predict(auth_headers, client_id=100005):
+    return requests.post(f"{settings.api_url}/predict/{client_id}", headers=auth_headers).json()
+
+@pytest.mark.skipif(settings.prediction_cache_ttl_seconds <= 0, reason="Cache des prédictions désactivé.")
+def test_repeated_prediction_is_cached(auth_headers):
+    """
+    Teste qu'une prédiction répétée est servie par le cache, avec le même résultat et un log marqué
+    `cached` qui référence les features du calcul.
+    """
+    start = {"start": time.strftime("%Y-%m-%dT%H:%M:%S"), "fields": "client_id,cached,input_data"}
+    first = predict(auth_headers)
+    before = cache_stats(auth_headers)
+    second = predict(auth_headers)
+    after = cache_stats(auth_headers)
+
+    assert second == first
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+    assert len(after["model_version"]) == 12
+
+    # Les logs sont écrits en arrière-plan : on attend ceux des deux prédictions
+    for _ in range(20):
+        logs = requests.get(f"{settings.api_url}/api-logs", headers=auth_headers, params=start).json()
+        if len(logs) >= 2:
+            break
+        time.sleep(0.25)
+    assert (logs[0]["client_id"], logs[0]["cached"]) == (100005, True)
+    if settings.log_feature_snapshots:
+        assert logs[0]["input_data"] == logs[1]["input_data"] is not None
+
+@pytest.mark.skipif(settings.prediction_cache_ttl_seconds <= 0, reason="Cache des prédictions désactivé.")
+def test_changed_client_row_invalidates_cache(auth_headers):
+    """
+    Teste qu'une modification de la ligne du client dans `test_data` invalide son entrée.
+    """
+    predict(auth_headers)
+    with SessionLocal() as db:
+        original = db.execute(text("SELECT data::text FROM test_data WHERE sk_id_curr = 100005")).scalar()
+        # Même contenu, texte différent : l'empreinte change
+        db.execute(text("UPDATE test_data SET data = CAST(data AS jsonb)::json WHERE sk_id_curr = 100005"))
+        db.commit()
+    try:
+        if settings.feature_store_enabled:
+            requests.post(f"{settings.api_url}/feature-store/refresh", headers=auth_headers)
+        before = cache_stats(auth_headers)
+        predict(auth_headers)
+        after = cache_stats(auth_headers)
+    finally:
+        with SessionLocal() as db:
+            db.execute(text("UPDATE test_data SET data = CAST(:data AS json) WHERE sk_id_curr = 100005"), {"data": original})
+            db.commit()
+        if settings.feature_store_enabled:
+            requests.post(f"{settings.api_url}/feature-store/refresh", headers=auth_headers)
+
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"]
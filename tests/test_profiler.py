@@ -0,0 +1,145 @@
+# tests/test_profiler.py
+
+import pstats
+import threading
+import time
+
+import pytest
+import requests
+
+from src.api import security
+from src.api.profiler import SamplingProfiler
+from src.config import settings
+from src.database.database import SessionLocal
+from src.database import models
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def guest_headers():
+    """Jeton d'un utilisateur qui n'est pas administrateur (supprimé après le test)."""
+    with SessionLocal() as db:
+        db.add(models.User(username="profiler_guest_test", hashed_password="hash", disabled=False))
+        db.commit()
+    yield {"Authorization": f"Bearer {security.create_access_token({'sub': 'profiler_guest_test'})}"}
+    with SessionLocal() as db:
+        db.query(models.User).filter(models.User.username == "profiler_guest_test").delete()
+        db.commit()
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+def idle_loop(stop: threading.Event):
+    stop.wait()
+
+
+# --- Tests du profiler ---
+
+def test_profiler_samples_focused_threads(tmp_path):
+    """
+    Teste que seules les piles passant par une fonction du focus sont gardées,
+    et que les formats collapsed et pstats sont lisibles.
+    """
+    stop = threading.Event()
+    threads = [threading.Thread(target=target, args=(stop,)) for target in (busy_loop, idle_loop)]
+    for thread in threads:
+        thread.start()
+    profiler = SamplingProfiler()
+    try:
+        profiler.start(duration=None, interval=0.002, focus=["busy_loop"])
+        time.sleep(0.2)
+        profiler.stop()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    status = profiler.status()
+    assert not status["active"] and status["samples"] > 0
+    collapsed = profiler.collapsed()
+    assert "busy_loop" in collapsed and "idle_loop" not in collapsed
+    stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+    assert stack.split(";")[0].endswith(":_bootstrap") and int(count) > 0
+
+    path = tmp_path / "profile.pstats"
+    path.write_bytes(profiler.pstats_dump())
+    stats = pstats.Stats(str(path))
+    busy = [value for (_, _, name), value in stats.stats.items() if name == "busy_loop"]
+    assert len(busy) == 1
+    # Temps cumulé estimé : échantillons x intervalle
+    assert busy[0][3] == pytest.approx(sum(
+        count for stack, count in profiler.stacks().items() if any(name == "busy_loop" for _, _, name in stack)
+    ) * 0.002)
+
+def test_profiler_stops_after_max_requests_and_merges():
+    """
+    Teste l'arrêt après `max_requests` requêtes et l'ajout des piles d'un job à la bonne session.
+    """
+    profiler = SamplingProfiler()
+    session = profiler.start(duration=None, interval=0.01, max_requests=2)
+    profiler.count_request()
+    assert profiler.active
+    profiler.count_request()
+    profiler._thread.join(timeout=1)
+    assert not profiler.active
+
+    stack = (("job.py", 1, "run_drift_job"),)
+    profiler.merge({stack: 3}, session, prefix="drift_job")
+    profiler.merge({stack: 5}, session - 1, prefix="drift_job")
+    assert profiler.stacks() == {(("<drift_job>", 0, "drift_job"),) + stack: 3}
+    with pytest.raises(RuntimeError):
+        profiler.start(duration=None)
+        profiler.start(duration=None)
+    profiler.stop()
+
+
+# --- Tests des endpoints ---
+
+def test_profiler_endpoints(auth_headers):
+    """
+    Teste une session sur l'API : démarrage, requêtes profilées, arrêt automatique et profils.
+    """
+    response = requests.post(
+        f"{settings.api_url}/admin/profiler/start", headers=auth_headers,
+        json={"max_requests": 20, "interval_ms": 1, "duration_seconds": 30}
+    )
+    assert response.status_code == 200
+    assert response.json()["active"] and response.json()["max_requests"] == 20
+    assert requests.post(f"{settings.api_url}/admin/profiler/start", headers=auth_headers).status_code == 409
+
+    for _ in range(20):
+        requests.post(f"{settings.api_url}/predict/100001", headers=auth_headers)
+    for _ in range(20):
+        status = requests.get(f"{settings.api_url}/admin/profiler", headers=auth_headers).json()
+        if not status["active"]:
+            break
+        time.sleep(0.05)
+    assert not status["active"] and status["requests"] == 20 and status["samples"] > 0
+
+    collapsed = requests.get(f"{settings.api_url}/admin/profiler/profile", headers=auth_headers)
+    assert collapsed.status_code == 200
+    # Les piles gardées passent toutes par un endpoint profilé (leur nombre dépend de l'échantillonnage)
+    assert all("src/api/main.py:" in line for line in collapsed.text.splitlines())
+    profile = requests.get(f"{settings.api_url}/admin/profiler/profile?format=pstats", headers=auth_headers)
+    assert profile.status_code == 200
+    assert profile.headers["Content-Type"] == "application/octet-stream"
+
+def test_profiler_requires_admin(auth_headers, guest_headers):
+    """
+    Teste que les endpoints du profiler sont refusés aux utilisateurs non administrateurs.
+    """
+    assert requests.get(f"{settings.api_url}/admin/profiler", headers=guest_headers).status_code == 403
+    assert requests.post(f"{settings.api_url}/admin/profiler/start", headers=guest_headers).status_code == 403
+    response = requests.get(f"{settings.api_url}/admin/profiler/profile?format=svg", headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,112 @@
+# tests/test_report_storage.py
+
+import gzip
+import pytest
+import requests
+
+from src.api import report_storage
+from src.config import settings
+from src.database.database import SessionLocal
+from src.database import models
+
+BUNDLE = "<script>" + "var bundle = 1;\n" * 10000 + "</script>"
+
+def make_html(data: str) -> str:
+    return f"<html><head>{BUNDLE}</head><body><script>var data = {data!r};</script>é</body></html>"
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture
+def db():
+    """Session BDD qui supprime les rapports et segments créés par le test."""
+    session = SessionLocal()
+    known = {segment_hash for (segment_hash,) in session.query(models.DriftReportSegment.hash)}
+    created = []
+    yield session, created
+    session.rollback()
+    session.query(models.DriftReport).filter(models.DriftReport.id.in_(created)).delete()
+    session.query(models.DriftReportSegment).filter(models.DriftReportSegment.hash.notin_(known)).delete()
+    session.commit()
+    session.close()
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+# --- Tests ---
+
+def test_gzip_stream_rebuilds_html(db):
+    """
+    Teste que le flux gzip assemblé à partir des segments stockés redonne le HTML d'origine.
+    """
+    session, created = db
+    html = make_html("a")
+
+    report = report_storage.store_report(session, html)
+    created.append(report.id)
+    deflated = report_storage.load_segments(session, report)
+    stream = b"".join(report_storage.gzip_stream(report, deflated))
+
+    assert len(report.segments) == 3  # texte, bundle, texte
+    assert gzip.decompress(stream).decode("utf-8") == html
+    assert len(stream) == report_storage.gzip_length(report, deflated)
+    assert report_storage.report_html(report, deflated) == html
+
+def test_shared_bundle_is_stored_once(db):
+    """
+    Teste que deux rapports partageant le même bundle ne le stockent qu'une fois.
+    """
+    session, created = db
+
+    first = report_storage.store_report(session, make_html("a"))
+    second = report_storage.store_report(session, make_html("b"))
+    session.commit()
+    created += [first.id, second.id]
+
+    assert first.segments[1] == second.segments[1]
+    assert first.segments[2] != second.segments[2]
+    assert first.etag != second.etag
+    stored = session.query(models.DriftReportSegment.hash) \
+                    .filter(models.DriftReportSegment.hash.in_(first.segments + second.segments)).count()
+    assert stored == 4
+
+def test_etag_matches():
+    """
+    Teste la comparaison de l'en-tête If-None-Match (liste, ETag faible, "*").
+    """
+    assert report_storage.etag_matches('"abc"', "abc")
+    assert report_storage.etag_matches('"x", W/"abc"', "abc")
+    assert report_storage.etag_matches("*", "abc")
+    assert not report_storage.etag_matches('"abd"', "abc")
+    assert not report_storage.etag_matches(None, "abc")
+
+def test_raw_report_endpoint_uses_etag(db, auth_headers):
+    """
+    Teste que /drift-reports/{id}/html envoie le rapport compressé puis répond 304 s'il est inchangé.
+    """
+    session, created = db
+    html = make_html("api")
+    report = report_storage.store_report(session, html)
+    session.commit()
+    created.append(report.id)
+    url = f"{settings.api_url}/drift-reports/{report.id}/html"
+
+    response = requests.get(url, headers=auth_headers)
+    not_modified = requests.get(url, headers={**auth_headers, "If-None-Match": response.headers["ETag"]})
+    identity = requests.get(url, headers={**auth_headers, "Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text == html
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert "Content-Encoding" not in identity.headers
+    assert identity.text == html
+    assert requests.get(f"{settings.api_url}/drift-reports/999999/html", headers=auth_headers).status_code == 404
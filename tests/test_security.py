@@ -0,0 +1,113 @@
+# tests/test_security.py
+
+import pytest
+import time
+import anyio
+from unittest.mock import patch
+
+from src.api import security
+from src.api.security import IdentityCache, identity_cache
+from src.database.database import SessionLocal
+from src.database import models
+from src.config import settings
+
+def make_user(username: str = "alice") -> models.User:
+    return models.User(id=1, username=username, hashed_password="hash", disabled=False)
+
+# --- Tests du cache des identités ---
+
+def test_identity_cache_hit_and_miss():
+    """
+    Teste qu'une identité mise en cache est retrouvée et que les compteurs évoluent.
+    """
+    cache = IdentityCache(ttl_seconds=60, max_size=10)
+
+    assert cache.get(("alice", 1)) is None
+    cache.set(("alice", 1), make_user())
+    cached = cache.get(("alice", 1))
+
+    assert cached.username == "alice"
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "ttl_seconds": 60}
+
+def test_identity_cache_expires_with_token():
+    """
+    Teste qu'une entrée n'est jamais servie au-delà de l'expiration du token.
+    """
+    cache = IdentityCache(ttl_seconds=60, max_size=10)
+
+    cache.set(("alice", 1), make_user(), token_exp=time.time() - 1)
+
+    assert cache.get(("alice", 1)) is None
+
+def test_identity_cache_lru_eviction():
+    """
+    Teste que l'entrée la moins récemment utilisée est évincée quand le cache est plein.
+    """
+    cache = IdentityCache(ttl_seconds=60, max_size=2)
+    cache.set(("alice", 1), make_user("alice"))
+    cache.set(("bob", 1), make_user("bob"))
+    cache.get(("alice", 1))
+
+    cache.set(("carol", 1), make_user("carol"))
+
+    assert cache.get(("bob", 1)) is None
+    assert cache.get(("alice", 1)) is not None
+
+def test_identity_cache_invalidated_when_user_disabled():
+    """
+    Teste que désactiver un utilisateur via l'ORM retire ses entrées du cache global.
+    """
+    identity_cache.clear()
+    db = SessionLocal()
+    try:
+        # Utilisateur persistant, jamais validé en BDD (rollback à la fin)
+        user = models.User(username="dave_test", hashed_password="hash", disabled=False)
+        db.add(user)
+        db.flush()
+        identity_cache.set(("dave_test", 1), user)
+        identity_cache.set(("dave_test", 2), user)
+
+        user.disabled = True
+
+        assert identity_cache.get(("dave_test", 1)) is None
+        assert identity_cache.get(("dave_test", 2)) is None
+    finally:
+        db.rollback()
+        db.close()
+
+def test_identity_cache_disabled_with_zero_ttl():
+    cache = IdentityCache(ttl_seconds=0, max_size=10)
+
+    cache.set(("alice", 1), make_user())
+
+    assert cache.get(("alice", 1)) is None
+
+# --- Tests de la connexion non bloquante ---
+
+def test_authenticate_user_async_uses_credential_cache():
+    """
+    Teste qu'une connexion répétée avec les mêmes identifiants évite bcrypt,
+    et qu'un mauvais mot de passe n'est jamais servi par le cache.
+    """
+    cache = IdentityCache(ttl_seconds=60, max_size=10)
+    db = SessionLocal()
+    try:
+        with patch.object(security, "credential_cache", cache), \
+             patch.object(security, "verify_password", wraps=security.verify_password) as verify:
+            first = anyio.run(security.authenticate_user_async, db, settings.api_user, settings.api_password)
+            second = anyio.run(security.authenticate_user_async, db, settings.api_user, settings.api_password)
+            wrong = anyio.run(security.authenticate_user_async, db, settings.api_user, "mauvais_mot_de_passe")
+    finally:
+        db.close()
+
+    assert first.username == second.username == settings.api_user
+    assert wrong is None
+    # Une vérification pour la première connexion, une pour le mauvais mot de passe
+    assert verify.call_count == 2
+
+def test_credentials_key_does_not_contain_password():
+    key = security.credentials_key("alice", "secret")
+
+    assert b"secret" not in key
+    assert key == security.credentials_key("alice", "secret")
+    assert key != security.credentials_key("alice", "autre")
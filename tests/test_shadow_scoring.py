@@ -0,0 +1,192 @@
+# tests/test_shadow_scoring.py
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from src.api.model_registry import ModelManager, publish_model
+from src.api.shadow_scoring import ChallengerManager, ShadowScorer
+from src.config import settings
+from src.database import models
+from src.database.database import SessionLocal
+from tests.test_model_registry import small_model
+
+# Période réservée aux comparaisons de test, loin des prédictions de l'API
+WINDOW_START = datetime(2001, 1, 2)
+WINDOW = {"start": WINDOW_START.isoformat(), "end": (WINDOW_START + timedelta(days=1)).isoformat()}
+
+# --- Fixtures Pytest ---
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    response = requests.post(
+        f"{settings.api_url}/auth",
+        data={"username": settings.api_user, "password": settings.api_password}
+    )
+    if response.status_code != 200:
+        pytest.fail(f"L'authentification a échoué. Assurez-vous que l'API est démarrée. Status: {response.status_code}")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def champion_and_challenger(tmp_path):
+    """Deux versions d'un petit modèle, chargées depuis un registre temporaire."""
+    registry = str(tmp_path)
+    champion = publish_model(registry, small_model())["version"]
+    challenger = publish_model(registry, small_model(seed=1), activate=False)["version"]
+    manager = ModelManager(registry, model_path="", engine_name="numpy", warmup_predictions=1)
+    return manager.load(champion), manager.load(challenger, max_threads=1)
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.ShadowPrediction.__table__.create(engine)
+    return engine
+
+
+# --- Tests du scoring fantôme ---
+
+def test_challenger_scores_sampled_predictions(champion_and_challenger, sqlite_engine):
+    """
+    Teste que les prédictions tirées au sort sont scorées par lots avec le challenger et
+    enregistrées à côté de celles du champion, avec le temps par prédiction de chaque modèle
+    sur le même lot (champion chronométré avec sa copie de référence, chargée une fois).
+    """
+    champion, challenger = champion_and_challenger
+    references = []
+    scorer = ShadowScorer(sqlite_engine, decision_threshold=0.5, sample_rate=1.0, batch_size=4,
+                          reference_loader=lambda model: references.append(model) or model)
+
+    assert not scorer.submit_sample(champion, 1, {"feature_1": 0.0}, 0.5)
+    scorer.set_challenger(challenger)
+    records = [{"feature_1": i / 10, "feature_2": None, "feature_3": 1.0} for i in range(10)]
+    for client_id, record in enumerate(records):
+        scorer.submit_sample(champion, client_id, record, champion.scorer.predict_record(record))
+    scorer.flush()
+
+    with sqlite_engine.connect() as connection:
+        rows = connection.execute(select(models.ShadowPrediction).order_by(models.ShadowPrediction.client_id)).all()
+    assert len(rows) == 10
+    assert scorer.stats()["flushed"] == 10
+    assert {(row.champion_version, row.challenger_version) for row in rows} == {(champion.version, challenger.version)}
+    assert rows[3].challenger_proba == pytest.approx(challenger.scorer.predict_record(records[3]))
+    assert rows[3].challenger_decision == ("Crédit Accordé" if rows[3].challenger_proba < 0.5 else "Crédit Refusé")
+    assert all(row.champion_time_ms > 0 and row.challenger_time_ms > 0 for row in rows)
+    # Temps du lot divisé par sa taille : identique pour les prédictions d'un même lot
+    assert len({(row.champion_time_ms, row.challenger_time_ms) for row in rows[:4]}) == 1
+    assert references == [champion]
+
+def test_sampling_rate_and_full_queue(champion_and_challenger, sqlite_engine):
+    """
+    Teste le tirage d'une part du trafic et l'abandon (sans attente) quand la file est pleine.
+    """
+    champion, challenger = champion_and_challenger
+    scorer = ShadowScorer(sqlite_engine, decision_threshold=0.5, sample_rate=0.2, seed=3)
+    scorer.set_challenger(challenger)
+
+    sampled = sum(scorer.submit_sample(champion, i, {}, 0.5) for i in range(1000))
+    assert 150 < sampled < 250
+
+    full = ShadowScorer(sqlite_engine, decision_threshold=0.5, sample_rate=1.0, max_queue_size=2)
+    full.set_challenger(challenger)
+    assert [full.submit_sample(champion, i, {}, 0.5) for i in range(3)] == [True, True, False]
+    assert full.stats()["dropped"] == 1
+    with pytest.raises(ValueError):
+        full.set_challenger(challenger, sample_rate=1.5)
+
+
+def test_challenger_follows_registry(tmp_path, sqlite_engine):
+    """
+    Teste qu'un changement de challenger lancé sur un worker est chargé en arrière-plan,
+    puis suivi par un autre worker qui surveille le registre.
+    """
+    registry = str(tmp_path)
+    publish_model(registry, small_model())
+    challenger = publish_model(registry, small_model(seed=1), activate=False)["version"]
+    workers = []
+    for _ in range(2):
+        manager = ModelManager(registry, model_path="", engine_name="numpy", warmup_predictions=1)
+        scorer = ShadowScorer(sqlite_engine, decision_threshold=0.5, sample_rate=0.1)
+        workers.append(ChallengerManager(scorer, manager, default_version="", default_sample_rate=0.1))
+    first, second = workers
+    for worker in workers:
+        worker.apply()
+    # Chargement retenu sur le premier worker tant que le second changement n'a pas été refusé
+    release = threading.Event()
+    load = first.models.load
+    first.models.load = lambda *args, **kwargs: release.wait(5) and load(*args, **kwargs)
+    second.start_watching(0.05)
+    try:
+        status = first.configure_in_background(challenger, sample_rate=0.5)
+        with pytest.raises(RuntimeError):
+            first.configure_in_background(sample_rate=0.2)
+        release.set()
+        for _ in range(100):
+            if status["status"] != "running" and second.scorer.challenger is not None:
+                break
+            time.sleep(0.05)
+    finally:
+        release.set()
+        second.stop_watching()
+
+    assert status["status"] == "succeeded"
+    for worker in workers:
+        assert (worker.scorer.challenger.version, worker.scorer.sample_rate) == (challenger, 0.5)
+    with pytest.raises(ValueError):
+        first.configure_in_background("inconnue")
+
+
+# --- Tests de l'API ---
+
+def test_shadow_stats(auth_headers):
+    """
+    Teste la comparaison champion / challenger : taux d'accord, écart des probabilités et de latence.
+    """
+    with SessionLocal() as db:
+        db.add_all([
+            models.ShadowPrediction(
+                request_timestamp=WINDOW_START + timedelta(minutes=i), client_id=-1,
+                champion_version="test-champion", challenger_version="test-challenger",
+                champion_proba=0.2, challenger_proba=0.6 if i == 0 else 0.3,
+                champion_decision="Crédit Accordé", challenger_decision="Crédit Refusé" if i == 0 else "Crédit Accordé",
+                champion_time_ms=1.0, challenger_time_ms=1.5,
+            )
+            for i in range(4)
+        ])
+        db.commit()
+    try:
+        response = requests.get(f"{settings.api_url}/shadow/stats", headers=auth_headers, params=WINDOW)
+    finally:
+        with SessionLocal() as db:
+            db.query(models.ShadowPrediction).filter(models.ShadowPrediction.challenger_version == "test-challenger").delete()
+            db.commit()
+
+    assert response.status_code == 200
+    [comparison] = response.json()["comparisons"]
+    assert comparison["predictions"] == 4
+    assert comparison["agreement_rate"] == pytest.approx(0.75)
+    assert comparison["mean_abs_diff"] == pytest.approx(0.175)
+    assert comparison["latency_delta_ms"] == pytest.approx(0.5)
+
+def test_admin_shadow_validation(auth_headers):
+    """
+    Teste le réglage du challenger en arrière-plan : version inconnue ou part du trafic invalide refusées.
+    """
+    url = f"{settings.api_url}/admin/shadow"
+
+    assert requests.post(url, headers=auth_headers, json={"version": "inconnue"}).status_code == 404
+    assert requests.post(url, headers=auth_headers, json={"sample_rate": 2}).status_code == 400
+    response = requests.post(url, headers=auth_headers, json={"sample_rate": settings.challenger_sample_rate})
+    for _ in range(100):
+        change = requests.get(f"{settings.api_url}/shadow/stats", headers=auth_headers, params=WINDOW).json()["change"]
+        if change["status"] != "running":
+            break
+        time.sleep(0.1)
+
+    assert response.status_code == 202
+    assert change["status"] == "succeeded"
+    assert change["sample_rate"] == pytest.approx(settings.challenger_sample_rate)
@@ -8,6 +8,7 @@ from sklearn.pipeline import Pipeline
 
 # On importe la fonction à tester
 from src.train import train_final_model
+from src.api.model_registry import active_version, list_versions
 
 def test_train_final_model(tmp_path):
     """
@@ -31,13 +32,15 @@ def test_train_final_model(tmp_path):
     # On définit des chemins temporaires pour les données et le modèle
     fake_data_path = tmp_path / "fake_train_data.csv"
     fake_model_path = tmp_path / "fake_model.joblib"
+    fake_registry_dir = tmp_path / "registry"
     
     train_df.to_csv(fake_data_path, index=False)
 
     # On "patch" (remplace) les constantes de chemin dans le script train.py
     # pour utiliser nos fichiers temporaires
     with patch('src.train.DATA_PATH', fake_data_path), \
-         patch('src.train.MODEL_PATH', fake_model_path):
+         patch('src.train.MODEL_PATH', fake_model_path), \
+         patch('src.train.REGISTRY_DIR', str(fake_registry_dir)):
         
         # 2. Action (Act)
         # On exécute la fonction d'entraînement
@@ -53,3 +56,9 @@ def test_train_final_model(tmp_path):
     
     # On vérifie que le pipeline contient bien un classifieur
     assert 'classifier' in loaded_model.named_steps
+
+    # La version enregistrée est active et décrit ses features et métriques
+    [metadata] = list_versions(str(fake_registry_dir))
+    assert active_version(str(fake_registry_dir)) == metadata["version"]
+    assert metadata["feature_names"] == ['feature_1', 'feature_2']
+    assert 0 <= metadata["metrics"]["train_auc"] <= 1